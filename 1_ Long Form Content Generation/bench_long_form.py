@@ -0,0 +1,67 @@
+'''
+Offline benchmark of the long form pipeline on MockProvider: the iterative mode with the full and the rolling
+context, and the outline mode at several section concurrencies. No network or API keys are needed.
+
+Reports wall-clock time, calls, and input and output tokens per run. --latency and --tokens-per-second set the
+simulated call time; --rate-limit-rate and --failure-rate inject 429 responses and errors.
+
+Usage:
+    python bench_long_form.py [--latency 0.2] [--tokens-per-second 2000] [--concurrency 1 4 16]
+'''
+
+import argparse
+import asyncio
+from time import time
+
+import long_form_content
+from outline_generation import generate_sectioned_content
+from providers import MockProvider
+
+
+def mock_provider(args) -> MockProvider:
+    return MockProvider(latency=args.latency, tokens_per_second=args.tokens_per_second, output_tokens=args.output_tokens,
+                        rate_limit_rate=args.rate_limit_rate, failure_rate=args.failure_rate, retry_after=0.01,
+                        concurrency=max(args.concurrency), seed=args.seed)
+
+
+async def bench_iterative(args, mode: str):
+    provider=mock_provider(args)
+    start_time=time()
+    research=await long_form_content.generate_research_material(provider, args.prompt)
+    await long_form_content.generate_long_form_content(provider, args.prompt, research, mode=mode)
+    return time()-start_time, provider
+
+
+async def bench_outline(args, concurrency: int):
+    provider=mock_provider(args)
+    start_time=time()
+    research=await long_form_content.generate_research_material(provider, args.prompt)
+    await generate_sectioned_content(provider, args.prompt, research, sections=args.sections, concurrency=concurrency,
+                                     max_tokens=long_form_content.max_tokens_per_generation)
+    return time()-start_time, provider
+
+
+def print_row(name: str, elapsed: float, provider: MockProvider):
+    stats=provider.stats
+    print(f"{name:<22} {elapsed:>9.2f} {stats['calls']:>6} {stats['input_tokens']:>13} {stats['output_tokens']:>14} "
+          f"{provider.limiter.stats['rate_limited']:>5}")
+
+
+if __name__ == "__main__":
+    parser=argparse.ArgumentParser(description="Benchmark the long form pipeline offline on the mock provider")
+    parser.add_argument("--prompt", default="A podcast episode about the history of the printing press")
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated seconds per call")
+    parser.add_argument("--tokens-per-second", type=float, help="Simulated output speed, added to the latency")
+    parser.add_argument("--output-tokens", type=int, default=3000, help="Tokens the mock generates per call")
+    parser.add_argument("--sections", type=int, default=long_form_content.max_iterations, help="Sections of the outline mode")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Section concurrencies to run")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of calls answered with a 429")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of calls that fail")
+    parser.add_argument("--seed", type=int, default=0)
+    args=parser.parse_args()
+
+    print(f"{'Run':<22} {'Wall (s)':>9} {'Calls':>6} {'Input tokens':>13} {'Output tokens':>14} {'429s':>5}")
+    for mode in ("full", "rolling"):
+        print_row(f"iterative, {mode}", *asyncio.run(bench_iterative(args, mode)))
+    for concurrency in args.concurrency:
+        print_row(f"outline, {concurrency} at a time", *asyncio.run(bench_outline(args, concurrency)))
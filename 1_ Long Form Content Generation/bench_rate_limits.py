@@ -0,0 +1,112 @@
+'''
+Offline benchmark of the pacing of a long form run: the fixed 45 second sleep before every call against the
+token-bucket RateLimiter, on a simulated clock.
+
+The stub provider enforces its own requests and tokens per minute over a sliding window and answers 429 with a
+Retry-After hint when a call exceeds them, the way the real APIs do. Every call takes --latency simulated
+seconds. A run is the research call plus --iterations continuation calls, with prompts growing as in the full
+context mode or capped as in the rolling one.
+
+Usage:
+    python bench_rate_limits.py [--rpm 2 --tpm 32000] [--provider-rpm ... --provider-tpm ...] [--context rolling]
+'''
+
+import argparse
+from collections import deque
+
+from rate_limiter import ManualClock, RateLimiter
+
+
+class StubRateLimitError(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("429 Too Many Requests")
+        self.status_code=429
+        self.headers={"retry-after": f"{retry_after:.3f}"}
+
+
+class StubProvider:
+    '''
+    Provider with sliding-window rate limits on a simulated clock.
+    '''
+
+    def __init__(self, clock: ManualClock, requests_per_minute: float, tokens_per_minute: float, latency: float):
+        self.clock=clock
+        self.requests_per_minute=requests_per_minute
+        self.tokens_per_minute=tokens_per_minute
+        self.latency=latency
+        self.window=deque()
+        self.calls=0
+        self.rejected=0
+
+    def generate(self, tokens: int) -> int:
+        now=self.clock.time()
+        while self.window and self.window[0][0]<=now-60:
+            self.window.popleft()
+        self.calls+=1
+        over_requests=self.requests_per_minute and len(self.window)+1>self.requests_per_minute
+        over_tokens=self.tokens_per_minute and self.window and sum(t for _, t in self.window)+tokens>self.tokens_per_minute
+        if over_requests or over_tokens:
+            self.rejected+=1
+            raise StubRateLimitError(self.window[0][0]+60-now)
+        self.window.append((now, tokens))
+        self.clock.sleep(self.latency)
+        return tokens
+
+
+def call_tokens(iterations: int, context: str, research_tokens: int, output_tokens: int, budget: int) -> list:
+    tokens=[research_tokens]
+    for iteration in range(iterations):
+        draft=iteration*output_tokens
+        tokens.append(research_tokens+(draft if context=="full" else min(draft, budget))+output_tokens)
+    return tokens
+
+
+def run_fixed_sleep(provider: StubProvider, clock: ManualClock, tokens: list, delay: float=45.0):
+    for i, call in enumerate(tokens):
+        # The original script slept before every continuation call, not before the research call
+        if i>0:
+            clock.sleep(delay)
+        while True:
+            try:
+                provider.generate(call)
+                break
+            except StubRateLimitError as e:
+                # Without a limiter, a rate limited call can only be retried after the hint
+                clock.sleep(float(e.headers["retry-after"]))
+
+
+def run_limited(provider: StubProvider, limiter: RateLimiter, tokens: list):
+    for call in tokens:
+        limiter.call(lambda: provider.generate(call), tokens=call, usage=lambda used: used)
+
+
+if __name__ == "__main__":
+    parser=argparse.ArgumentParser(description="Simulated pacing of a long form run: fixed sleep against the rate limiter")
+    parser.add_argument("--rpm", type=float, default=2, help="Requests per minute configured in the limiter")
+    parser.add_argument("--tpm", type=float, default=32000, help="Tokens per minute configured in the limiter (0: no limit)")
+    parser.add_argument("--provider-rpm", type=float, help="Requests per minute the provider enforces (default: --rpm)")
+    parser.add_argument("--provider-tpm", type=float, help="Tokens per minute the provider enforces (default: --tpm)")
+    parser.add_argument("--iterations", type=int, default=15)
+    parser.add_argument("--latency", type=float, default=20.0, help="Simulated seconds per call")
+    parser.add_argument("--context", choices=("full", "rolling"), default="rolling")
+    parser.add_argument("--research-tokens", type=int, default=3000)
+    parser.add_argument("--output-tokens", type=int, default=4000)
+    parser.add_argument("--budget", type=int, default=7000, help="Draft tokens sent per call in rolling mode")
+    args=parser.parse_args()
+
+    provider_rpm=args.rpm if args.provider_rpm is None else args.provider_rpm
+    provider_tpm=args.tpm if args.provider_tpm is None else args.provider_tpm
+    tokens=call_tokens(args.iterations, args.context, args.research_tokens, args.output_tokens, args.budget)
+    print(f"{len(tokens)} calls, {sum(tokens)} tokens; provider limits: {provider_rpm:g} RPM, {provider_tpm:g} TPM; "
+          f"{args.latency:g} seconds per call")
+
+    clock=ManualClock()
+    provider=StubProvider(clock, provider_rpm, provider_tpm, args.latency)
+    run_fixed_sleep(provider, clock, tokens)
+    print(f"Fixed 45 second sleep: {clock.time():8.1f} simulated seconds, {provider.rejected} rate limited (429)")
+
+    clock=ManualClock()
+    provider=StubProvider(clock, provider_rpm, provider_tpm, args.latency)
+    limiter=RateLimiter("stub", args.rpm, args.tpm, clock=clock.time, sleep=clock.sleep)
+    run_limited(provider, limiter, tokens)
+    print(f"Rate limiter:          {clock.time():8.1f} simulated seconds, {limiter.report()}")
@@ -0,0 +1,197 @@
+'''
+Streaming, checkpointed output for the iterative long form mode.
+
+Each iteration's text is appended to the output file as the provider streams it, instead of being collected in one
+string and written at the end. After every completed iteration, a line is appended to a JSON lines checkpoint next
+to the output (<output>.checkpoint) with the iteration number, the byte offset the output had reached and the context
+state (the rolling summary and the length of the verbatim tail). The first line holds the prompt hash, the user
+prompt and the research material.
+
+Resuming truncates the output to the last checkpointed offset, dropping the text of an iteration that did not
+complete, rebuilds the context from the checkpoint and the tail of the output file, and carries on with the next
+iteration. Only the context is ever held in memory, never the whole document.
+'''
+
+import hashlib
+import json
+import os
+
+
+class CheckpointError(Exception):
+    '''
+    Raised when a checkpoint is missing, unreadable or belongs to a different run.
+    '''
+
+
+def checkpoint_path_for(output_path: str) -> str:
+    return f"{output_path}.checkpoint"
+
+
+def run_hash(user_prompt: str, settings: dict) -> str:
+    '''
+    Hash of the prompt and the settings a resumed run has to share with the original one.
+    '''
+    return hashlib.sha256(json.dumps({"user_prompt": user_prompt, "settings": settings}, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class MemoryOutput:
+    '''
+    Collects the generated text in memory, for callers that want it returned as a string.
+    '''
+
+    def __init__(self):
+        self.chunks=[]
+        self.chunk_start=0
+
+    def start_chunk(self, prefix: str=""):
+        self.chunks.append(prefix)
+        self.chunk_start=len(self.chunks)
+
+    def restart_chunk(self):
+        del self.chunks[self.chunk_start:]
+
+    def write(self, text: str):
+        self.chunks.append(text)
+
+    def commit(self, iteration: int, context_state: dict, stats: dict):
+        pass
+
+    def getvalue(self) -> str:
+        return "".join(self.chunks)
+
+
+class CheckpointedOutput:
+    '''
+    Output file that text is streamed into, with an append-only checkpoint of the completed iterations.
+
+    Attributes:
+        output_path (str): Generated document
+        checkpoint_path (str): JSON lines checkpoint
+        content_start (int): Byte offset where the generated content starts, after the header
+    '''
+
+    def __init__(self, output_path: str, checkpoint_path: str=None):
+        self.output_path=output_path
+        self.checkpoint_path=checkpoint_path or checkpoint_path_for(output_path)
+        self.content_start=0
+        self.chunk_start=0
+        self.file=None
+
+    def start(self, prompt_hash: str, settings: dict, user_prompt: str, research_material: str, header: str):
+        '''
+        Begin a new run: write the header to a fresh output file and a fresh checkpoint.
+        '''
+        self.file=open(self.output_path, "wb")
+        self.file.write(header.encode("utf-8"))
+        self.file.flush()
+        self.content_start=self.chunk_start=self.file.tell()
+        with open(self.checkpoint_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "event": "start", "prompt_hash": prompt_hash, "settings": settings, "user_prompt": user_prompt,
+                "research_material": research_material, "offset": self.content_start
+            })+"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self) -> dict:
+        '''
+        Read the checkpoint of an interrupted run and reopen the output at its last completed iteration.
+
+        Returns:
+            dict: start (the first record), iteration (completed iterations), context_state, recent (the
+                verbatim draft tail the context needs), report (stats of the completed iterations), complete (bool)
+        '''
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                lines=f.read().splitlines()
+        except FileNotFoundError:
+            raise CheckpointError(f"No checkpoint at {self.checkpoint_path}; run without --resume first")
+
+        records=[]
+        for number, line in enumerate(lines):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Only the last line can be cut short by a crash while it was written
+                if number!=len(lines)-1:
+                    raise CheckpointError(f"Corrupt checkpoint line {number+1} in {self.checkpoint_path}")
+        if not records or records[0].get("event")!="start":
+            raise CheckpointError(f"{self.checkpoint_path} does not start with a start record")
+
+        start=records[0]
+        iterations=[record for record in records if record.get("event")=="iteration"]
+        last=iterations[-1] if iterations else None
+        offset=last["offset"] if last else start["offset"]
+
+        self.file=open(self.output_path, "r+b")
+        self.file.seek(0, os.SEEK_END)
+        if self.file.tell()<offset:
+            raise CheckpointError(f"{self.output_path} is shorter than its checkpoint; it was modified after the run")
+        # Drop the text of an iteration that was cut off
+        self.file.truncate(offset)
+        self.file.seek(offset)
+        self.content_start=start["offset"]
+        self.chunk_start=offset
+
+        context_state=last["context_state"] if last else {}
+        recent=self.read_tail(context_state.get("recent_bytes", 0))
+        return {
+            "start": start,
+            "iteration": last["iteration"] if last else 0,
+            "context_state": context_state,
+            "recent": recent,
+            "report": [record["stats"] for record in iterations],
+            "complete": any(record.get("event")=="complete" for record in records)
+        }
+
+    def read_tail(self, size: int) -> str:
+        '''
+        Read the last `size` bytes of the generated content.
+        '''
+        end=self.file.tell()
+        start=max(self.content_start, end-size)
+        self.file.seek(start)
+        tail=self.file.read(end-start)
+        self.file.seek(end)
+        return tail.decode("utf-8")
+
+    def start_chunk(self, prefix: str=""):
+        self.write(prefix)
+        self.chunk_start=self.file.tell()
+
+    def restart_chunk(self):
+        '''
+        Drop what a failed attempt streamed of the current chunk, before it is retried.
+        '''
+        self.file.truncate(self.chunk_start)
+        self.file.seek(self.chunk_start)
+
+    def write(self, text: str):
+        if text:
+            self.file.write(text.encode("utf-8"))
+            self.file.flush()
+
+    def commit(self, iteration: int, context_state: dict, stats: dict):
+        '''
+        Record a completed iteration; its text is made durable before the checkpoint line that points past it.
+        '''
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._append({"event": "iteration", "iteration": iteration, "offset": self.file.tell(),
+                      "context_state": context_state, "stats": stats})
+
+    def complete(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._append({"event": "complete", "offset": self.file.tell()})
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file=None
+
+    def _append(self, record: dict):
+        with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record)+"\n")
+            f.flush()
+            os.fsync(f.fileno())
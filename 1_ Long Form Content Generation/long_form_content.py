@@ -16,19 +16,36 @@ Output length was kept same across the two for fairer comparison.
 The long form content is generated recursively, up to a limit of max_iterations current_iteration.
 
 So, the maximum output token length would then be 4k * max_iterations, which has to be kept smaller than input token context (128k for Command R+ and 1 million+ for Gemini-1.5 at the time of writing)
+when the whole draft is resent on every iteration (context_mode "full"). The default "rolling" mode keeps the prompt within a fixed budget instead:
+the last recent_context_tokens of the draft are sent verbatim along with a rolling summary of everything before them, which a cheaper model
+updates as text falls out of the verbatim window (see rolling_context.py). Per-iteration input tokens and latency are reported for either mode.
 
 While the generated content would not be good enough for a quality standalone creative work, it would surely expedite the creation of
 such creative works by giving humans a broader canvas to play with.
 
-I have also artificially added a 45 second delay prior to each generation to avoid hitting the free API rate limits because for this use case
-latency isn't really a concern.
+Calls are paced by a per-provider token-bucket rate limiter (rate_limiter.py) set to the provider's requests and tokens per minute,
+instead of a fixed 45 second delay before each generation. It waits only as long as the limits require, backs off on 429 responses
+(honouring Retry-After), and reports the time spent throttled. The defaults are the free tier limits; raise them for paid tiers.
+
+Gemini, Cohere and an offline mock are used through one async provider interface (providers.py), so every code path below
+is written once. Clients are created on first use, so the module imports without API keys, and the script only runs when executed:
+
+    python long_form_content.py [--provider cohere|gemini|mock] [--mode iterative|outline] [--prompt "..."] [--resume]
+
+In the iterative mode the content is streamed to the output file as it is generated and checkpointed after every
+iteration (checkpoint.py), so an interrupted run continues with --resume instead of starting over.
 '''
 
-import google.generativeai as genai
-import cohere
+import argparse
+import asyncio
 import os
 from dotenv import load_dotenv
-from time import time, sleep
+from time import time
+
+from checkpoint import CheckpointError, CheckpointedOutput, MemoryOutput, run_hash
+from outline_generation import SectionError, generate_sectioned_content, print_sectioned_report
+from providers import create_provider
+from rolling_context import FullContext, RollingContext
 
 load_dotenv()
 
@@ -36,6 +53,30 @@ load_dotenv()
 max_tokens_per_generation=4096
 max_iterations=15
 temperature=0.75
+generation_mode=os.getenv("LONGFORM_MODE", "iterative") # "iterative" or "outline"
+context_mode=os.getenv("LONGFORM_CONTEXT", "rolling") # "rolling" or "full", for the iterative mode
+section_count=int(os.getenv("LONGFORM_SECTIONS", max_iterations)) # Sections of the outline mode
+section_concurrency=int(os.getenv("LONGFORM_CONCURRENCY", 4)) # Sections written at once in the outline mode
+recent_context_tokens=6000 # Draft sent verbatim in rolling mode
+summary_tokens=1000 # Maximum length of the rolling summary
+summary_temperature=0.2
+provider_name=os.getenv("LONGFORM_PROVIDER", "cohere") # "cohere", "gemini" or "mock"
+# Rate limits per provider; 0 disables a limit. The defaults are the free tiers (Gemini-1.5-Pro, Cohere trial keys)
+provider_settings={
+    "gemini": {
+        "requests_per_minute": float(os.getenv("GEMINI_RPM", 2)),
+        "tokens_per_minute": float(os.getenv("GEMINI_TPM", 32000)),
+        "concurrency": int(os.getenv("GEMINI_CONCURRENCY", 4))
+    },
+    "cohere": {
+        "requests_per_minute": float(os.getenv("COHERE_RPM", 20)),
+        "tokens_per_minute": float(os.getenv("COHERE_TPM", 0)),
+        "concurrency": int(os.getenv("COHERE_CONCURRENCY", 4))
+    },
+    "mock": {
+        "concurrency": int(os.getenv("MOCK_CONCURRENCY", 16))
+    }
+}
 research_instruction="""
 1. Generate research material based on user's query for generating long form content. Your generated content would be used by another LLM to expand on your response.
 
@@ -74,137 +115,241 @@ AI Response generated so far:
 11. If the system instruction specifies that your response is the last iteration in iterative generation, then you must end the content with a closing message. This would be an ending context for a story, or closing messages in a podcast.
 """
 
+last_iteration_instruction="\n\n 10. This is the last iteration, include a coherent closing message in your response based on the content generated so far."
+
+rolling_context_instruction="""
 
+12. "AI Response generated so far" holds a summary of the earlier sections, followed by the most recent text verbatim. Continue directly from the end of the verbatim text, and use the summary to stay consistent with everything written before it.
+"""
+
+summary_instruction="""
+1. You maintain a running summary of a long form piece of content that another LLM is writing in parts.
+
+2. You will get the summary so far and the next part of the content. Return the updated summary covering both.
+
+3. Keep chapter/section titles already covered, characters and their relationships, plot points, key facts and arguments, tone, and any open threads the content still has to resolve.
+
+4. Be dense and factual. Do not add commentary or anything that is not in the content. Output only the summary.
+"""
 
-# API configuration
-genai.configure(api_key=os.getenv("GEMINI_KEY"))
-co=cohere.ClientV2(os.getenv("COHERE_KEY"))
+
+
+# Providers are created on first use and shared by all calls, so their clients and rate limits are too
+providers={}
+
+def get_provider(name: str=None):
+    name=name or provider_name
+    if name not in providers:
+        providers[name]=create_provider(name, **provider_settings.get(name, {}))
+    return providers[name]
+
+def user_message(content: str) -> list:
+    return [{"role": "user", "content": content}]
+
+async def generate_research_material(provider, user_prompt: str) -> str:
+    generation=await provider.generate(research_instruction, user_message(user_prompt), max_tokens_per_generation, temperature)
+    return generation.text
 
 def generate_research_material_gemini(user_prompt: str) -> str:
-    research_model=genai.GenerativeModel(
-        model_name="gemini-1.5-pro-002",
-        system_instruction=research_instruction,
-        generation_config=genai.GenerationConfig(
-            max_output_tokens=max_tokens_per_generation,
-            temperature=temperature
-        )
-        )
-    
-    return research_model.generate_content(user_prompt).text
+    return asyncio.run(generate_research_material(get_provider("gemini"), user_prompt))
 
 def generate_research_material_cohere(user_prompt:str) -> str:
-    research_model=co.chat(
-        model="command-r-plus-08-2024",
-        temperature=temperature,
-        messages=[
-            {
-                "role":"system",
-                "content":research_instruction
-            },
-            {
-                "role":"user",
-                "content":user_prompt
-            }
-        ]
-    )
-    return research_model.message.content[0].text
-
-def generate_long_form_content_gemini(user_prompt:str, research_material:str, ai_response:str) -> str:
-    for current_iteration in range(max_iterations):
-        sleep(45) # to avoid hitting rate limits
-        if current_iteration==max_iterations-1:
-            last_iteration_instruction=long_form_content_instruction+"\n\n 10. This is the last iteration, include a coherent closing message in your response based on the content generated so far."
-            gemini_model=genai.GenerativeModel(
-                model_name="gemini-1.5-pro-002",  
-                system_instruction=last_iteration_instruction,
-                generation_config=genai.GenerationConfig(
-                    max_output_tokens=max_tokens_per_generation,
-                    temperature=temperature
-                )
-            )
-            gemini_input=f"User Prompt:\n {user_prompt}\nResearch Material:\n {research_material}\nAI Response generated so far: "
-            final_response_iteration= gemini_model.generate_content(gemini_input).text
-            ai_response+="\n" + final_response_iteration
-        else:
-            gemini_model=genai.GenerativeModel(
-                model_name="gemini-1.5-pro-002", 
-                system_instruction=long_form_content_instruction,
-                generation_config=genai.GenerationConfig(
-                    max_output_tokens=max_tokens_per_generation,
-                    temperature=temperature
-                )
-            )
-            gemini_input=f"User Prompt:\n {user_prompt}\nResearch Material:\n {research_material}\nAI Response generated so far: {ai_response}"
-            more_ai_response= gemini_model.generate_content(gemini_input).text
-            ai_response+="\n" + more_ai_response
-    
-    return ai_response
-
-def generate_long_form_content_cohere(user_prompt:str, research_material:str, ai_response:str) -> str:
-    for current_iteration in range(max_iterations):
-        sleep(45) # to avoid hitting rate limits
-        if current_iteration==max_iterations-1:
-            last_iteration_instruction=long_form_content_instruction+"\n\n 10. This is the last iteration, include a coherent closing message in your response based on the content generated so far."
-            cohere_model=co.chat(
-                model="command-r-plus-08-2024",
-                temperature=temperature,
-                messages=[
-                    {
-                        "role":"system",
-                        "content":last_iteration_instruction
-                    },
-                    {
-                        "role":"user",
-                        "content":f"User Prompt:\n {user_prompt}\nResearch Material:\n {research_material}\nAI Response generated so far: {ai_response}"
-                    }
-                ]
-            )
-            final_response_iteration= cohere_model.message.content[0].text
-            ai_response=ai_response+"\n" + final_response_iteration
+    return asyncio.run(generate_research_material(get_provider("cohere"), user_prompt))
+
+def summarizer(provider):
+    async def summarize(previous_summary: str, new_text: str, max_tokens: int):
+        summary_input=f"Summary so far:\n {previous_summary or '(none yet)'}\nNext part of the content:\n {new_text}"
+        generation=await provider.generate(summary_instruction, user_message(summary_input), max_tokens,
+                                           summary_temperature, model=provider.summary_model)
+        return generation.text, generation.input_tokens, generation.latency
+    return summarize
+
+def make_context(mode: str, summarize):
+    if mode=="full":
+        return FullContext()
+    elif mode=="rolling":
+        return RollingContext(summarize, recent_tokens=recent_context_tokens, summary_tokens=summary_tokens)
+    raise ValueError(f"Unknown context mode: {mode}")
+
+def iteration_instruction(mode: str, current_iteration: int) -> str:
+    instruction=long_form_content_instruction
+    if mode=="rolling":
+        instruction+=rolling_context_instruction
+    if current_iteration==max_iterations-1:
+        instruction+=last_iteration_instruction
+    return instruction
+
+def iteration_stats(current_iteration: int, input_tokens: int, latency: float, throttled: float, context) -> dict:
+    return {
+        "iteration": current_iteration+1,
+        "input_tokens": input_tokens,
+        "latency": latency,
+        "throttled": throttled,
+        "summary_input_tokens": sum(call["input_tokens"] for call in context.summary_calls),
+        "summary_latency": sum(call["latency"] for call in context.summary_calls)
+    }
+
+def print_report(mode: str, report: list, provider=None):
+    print(f"\nContext mode: {mode}")
+    print(f"{'Iteration':>9} {'Input tokens':>13} {'Latency (s)':>12} {'Throttled (s)':>14} {'Summary tokens':>15} {'Summary (s)':>12}")
+    previous_tokens, previous_latency=0, 0.0
+    for stats in report:
+        # Summary stats are cumulative; show what each iteration added
+        print(f"{stats['iteration']:>9} {stats['input_tokens']:>13} {stats['latency']:>12.2f} {stats['throttled']:>14.2f} "
+              f"{stats['summary_input_tokens']-previous_tokens:>15} {stats['summary_latency']-previous_latency:>12.2f}")
+        previous_tokens, previous_latency=stats["summary_input_tokens"], stats["summary_latency"]
+    if report:
+        total_tokens=sum(stats["input_tokens"] for stats in report)+report[-1]["summary_input_tokens"]
+        total_latency=sum(stats["latency"] for stats in report)+report[-1]["summary_latency"]
+        print(f"Total: {total_tokens} input tokens, {total_latency:.2f} seconds of model calls")
+    if provider is not None:
+        print(provider.report())
+
+async def generate_long_form_content(provider, user_prompt: str, research_material: str, ai_response: str="", mode: str=None,
+                                     output=None, resume: dict=None):
+    '''
+    Generate long form content with max_iterations continuation calls.
+
+    With an output (a CheckpointedOutput), each iteration is streamed into it and checkpointed when complete, and only
+    the context is kept in memory. With resume (as returned by CheckpointedOutput.load), generation continues after
+    the last completed iteration. mode is the context mode, context_mode when not given.
+
+    Returns:
+        tuple: (content, report); content is None when it was streamed to output
+    '''
+    mode=mode or context_mode
+    streamed=output is not None
+    output=output or MemoryOutput()
+    context=make_context(mode, summarizer(provider))
+    report=[]
+    first_iteration=0
+    if resume:
+        context.restore(resume["context_state"], resume["recent"])
+        report=list(resume["report"])
+        first_iteration=resume["iteration"]
+        if report:
+            # Summary stats in the report are cumulative; carry on from those of the interrupted run
+            context.summary_calls=[{"input_tokens": report[-1]["summary_input_tokens"], "latency": report[-1]["summary_latency"]}]
+    elif ai_response:
+        output.write(ai_response)
+        await context.add(ai_response)
+
+    for current_iteration in range(first_iteration, max_iterations):
+        output.start_chunk("\n")
+        generation=await provider.generate(
+            iteration_instruction(mode, current_iteration),
+            user_message(f"User Prompt:\n {user_prompt}\nResearch Material:\n {research_material}\nAI Response generated so far: {context.render()}"),
+            max_tokens_per_generation,
+            temperature,
+            stream=output
+        )
+        await context.add(generation.text)
+        stats=iteration_stats(current_iteration, generation.input_tokens, generation.latency, generation.throttled, context)
+        report.append(stats)
+        output.commit(current_iteration+1, context.checkpoint_state(), stats)
+
+    return (None if streamed else output.getvalue()), report
+
+def generate_long_form_content_sync(provider_name: str, user_prompt: str, research_material: str, ai_response: str,
+                                    mode: str=None, report: list=None) -> str:
+    # Pass a list as report to get the per-iteration stats (see print_report) as well as the content
+    content, stats=asyncio.run(generate_long_form_content(get_provider(provider_name), user_prompt, research_material, ai_response, mode))
+    if report is not None:
+        report.extend(stats)
+    return content
+
+def generate_long_form_content_gemini(user_prompt:str, research_material:str, ai_response:str, mode:str=None, report:list=None) -> str:
+    return generate_long_form_content_sync("gemini", user_prompt, research_material, ai_response, mode, report)
+
+def generate_long_form_content_cohere(user_prompt:str, research_material:str, ai_response:str, mode:str=None, report:list=None) -> str:
+    return generate_long_form_content_sync("cohere", user_prompt, research_material, ai_response, mode, report)
+
+def run_settings(provider, mode: str=None) -> dict:
+    # What a resumed run must share with the interrupted one for the checkpointed context to stay valid
+    return {
+        "provider": provider.name,
+        "model": provider.model,
+        "context_mode": mode or context_mode,
+        "max_iterations": max_iterations,
+        "max_tokens_per_generation": max_tokens_per_generation,
+        "recent_context_tokens": recent_context_tokens,
+        "summary_tokens": summary_tokens
+    }
+
+async def run_outline(provider, user_prompt: str, output_path: str):
+    research_response=await generate_research_material(provider, user_prompt)
+    header=f"User prompt:\n\n {user_prompt}\n\nResearch Material:\n\n {research_response}\n\nAI long form content generated:\n\n "
+    try:
+        long_form_content, report=await generate_sectioned_content(
+            provider, user_prompt, research_response, sections=section_count,
+            concurrency=section_concurrency, max_tokens=max_tokens_per_generation, temperature=temperature
+        )
+    except SectionError as e:
+        # Keep the sections that were written, so a failed run does not throw away all of its model calls
+        with open(output_path, "w") as f:
+            f.write(header)
+            f.write("\n\n".join(text if text is not None else f"[Section {number} failed: {e.failed[number-1]}]"
+                                  for number, text in enumerate(e.texts, start=1)))
+        print(f"Wrote the sections that were generated to {output_path}")
+        raise
+    with open(output_path, "w") as f:
+        f.write(header+long_form_content)
+    print_sectioned_report(report)
+    print(provider.report())
+
+async def run_iterative(provider, user_prompt: str, output_path: str, resume: bool=False):
+    # Resolved once, so the settings, the generation and the report agree on the context mode
+    mode=context_mode
+    settings=run_settings(provider, mode)
+    output=CheckpointedOutput(output_path)
+    try:
+        state=None
+        if resume:
+            state=output.load()
+            user_prompt=user_prompt or state["start"]["user_prompt"]
+            if run_hash(user_prompt, settings)!=state["start"]["prompt_hash"]:
+                raise CheckpointError(f"{output.checkpoint_path} was written for a different prompt or settings")
+            research_response=state["start"]["research_material"]
+            if state["complete"]:
+                print(f"{output_path} is already complete")
+                return
+            print(f"Resuming after iteration {state['iteration']} of {max_iterations}")
         else:
-            cohere_model=co.chat(
-            model="command-r-plus-08-2024",
-            temperature=temperature,
-            messages=[
-                {
-                    "role":"system",
-                    "content":long_form_content_instruction
-                },
-                {
-                    "role":"user",
-                    "content":f"User Prompt: {user_prompt}\nResearch Material: {research_material}\nAI Response generated so far: {ai_response}"
-                }
-            ]
-            )
-            more_ai_response= cohere_model.message.content[0].text
-            ai_response=ai_response+"\n" + more_ai_response
-
-    return ai_response
-
-# Cohere generation
-cohere_response=open("cohere_longform.txt","w")
-
-user_prompt=input("What kind of long form content do you want to generate today?\n\n")
-start_time=time()
-research_response=generate_research_material_cohere(user_prompt=user_prompt)
-
-cohere_response.write(f"User prompt:\n\n {user_prompt}\n]nResearch Material:\n\n {research_response}\n")
-
-long_form_content=generate_long_form_content_cohere(user_prompt=user_prompt, research_material=research_response, ai_response="")
-cohere_response.write(f"AI long form content generated: {long_form_content}")
-end_time=time()
-print(f"Total time taken to generate your content: {end_time-start_time} seconds")
-
-# # Gemini generation
-# gemini_response=open("gemini_longform.txt","w")
-
-# user_prompt=input("What kind of long form content do you want to generate today?\n\n")
-# start_time=time()
-# research_response=generate_research_material_gemini(user_prompt=user_prompt)
-
-# gemini_response.write(f"User prompt:\n\n {user_prompt}\n\nResearch Material:\n\n {research_response}\n\n")
-
-# long_form_content=generate_long_form_content_gemini(user_prompt=user_prompt, research_material=research_response, ai_response="")
-# gemini_response.write(f"AI long form content generated:\n\n {long_form_content}")
-# end_time=time()
-# print(f"Total time taken to generate your content: {end_time-start_time} seconds")
\ No newline at end of file
+            research_response=await generate_research_material(provider, user_prompt)
+            output.start(run_hash(user_prompt, settings), settings, user_prompt, research_response,
+                         f"User prompt:\n\n {user_prompt}\n\nResearch Material:\n\n {research_response}\n\nAI long form content generated:\n\n ")
+
+        _, report=await generate_long_form_content(provider, user_prompt, research_response, mode=mode, output=output, resume=state)
+        output.complete()
+    finally:
+        output.close()
+    print_report(mode, report, provider)
+
+async def run(provider, user_prompt: str, output_path: str, mode: str=generation_mode, resume: bool=False):
+    start_time=time()
+    if mode=="outline":
+        if resume:
+            raise CheckpointError("--resume continues the iterative mode; the outline mode is not checkpointed")
+        await run_outline(provider, user_prompt, output_path)
+    else:
+        await run_iterative(provider, user_prompt, output_path, resume)
+    end_time=time()
+    print(f"Total time taken to generate your content: {end_time-start_time} seconds")
+
+if __name__ == "__main__":
+    parser=argparse.ArgumentParser(description="Generate long form content beyond the output limit of one model call")
+    parser.add_argument("--provider", default=provider_name, help="Model provider: cohere, gemini or mock")
+    parser.add_argument("--mode", default=generation_mode, choices=("iterative", "outline"), help="Continuation calls or outline-first sections")
+    parser.add_argument("--prompt", help="What to generate (asked for when missing; taken from the checkpoint with --resume)")
+    parser.add_argument("--output", help="Output file (default: <provider>_longform.txt)")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted iterative run from its last completed iteration")
+    args=parser.parse_args()
+
+    user_prompt=args.prompt
+    if not user_prompt and not args.resume:
+        user_prompt=input("What kind of long form content do you want to generate today?\n\n")
+    output_path=args.output or f"{args.provider}_longform.txt"
+    try:
+        asyncio.run(run(get_provider(args.provider), user_prompt, output_path, args.mode, args.resume))
+    except CheckpointError as e:
+        parser.exit(1, f"{str(e)}\n")
@@ -0,0 +1,248 @@
+'''
+Outline-first long form generation with sections written in parallel.
+
+The iterative mode chains max_iterations continuation calls, each waiting for the previous one, so the run
+takes max_iterations times the latency of one call. Here the research material is first turned into a
+structured outline of chapters/sections. Every section is then written concurrently, at most `concurrency`
+at a time, from the outline, the research material and the synopses of its neighbors. A final stitching pass
+writes a short bridge at each section boundary (also concurrently), and everything is assembled in outline
+order. Wall-clock time grows with sections / concurrency instead of with the number of sections.
+
+The pipeline works with any Provider (providers.py), whose concurrency and rate limits apply on top of the
+section concurrency cap.
+'''
+
+import asyncio
+import json
+import re
+from time import time
+
+from rolling_context import CHARS_PER_TOKEN, tail_tokens
+
+outline_instruction="""
+1. Plan long form content based on user's query and the research material. Infer the type of long form content based on user's query: story, article, podcast or movie script.
+
+2. Split the content into exactly {sections} chapters/sections, in order. If the user's requested content is a story, movie or a podcast, follow the characters, plot and chapter/section titles suggested by the research material.
+
+3. For each chapter/section give a title and a synopsis of 2 to 4 sentences covering what happens or what is discussed in it. Each chapter/section will be written independently by another LLM from your outline, so the synopses must together cover the whole content without overlapping.
+
+4. Respond only with JSON in this format: {"title": "...", "sections": [{"title": "...", "synopsis": "..."}]}
+"""
+
+section_instruction="""
+1. You write one chapter/section of long form content, based on user's query, the research material and the outline. The other chapters/sections are written at the same time by other LLMs from the same outline.
+
+2. Write only your chapter/section, starting with its title. Cover what its synopsis describes, and do not write what belongs to other chapters/sections.
+
+3. Keep characters, facts and tone consistent with the outline and the research material. The synopses of the previous and next chapters/sections tell you where to pick up and where to lead to.
+
+4. Do not include any salutation message at the beginning of your response, directly generate the content. Do not include any closing message, unless you write the last chapter/section, which must end the content with a coherent closing.
+
+5. Be as detailed as possible, and write in a tone based on user's requested content format, which could be story, article, podcast or movie script.
+"""
+
+transition_instruction="""
+1. You get the end of one chapter/section of long form content and the beginning of the next, written independently.
+
+2. Write a short bridging passage of 2 to 4 sentences that leads from the first into the second, in the same tone and format. Do not repeat or summarize either of them.
+
+3. Output only the bridging passage.
+"""
+
+# Text of each side of a section boundary shown to the stitching pass
+transition_context_tokens=400
+
+
+class SectionError(Exception):
+    '''
+    Raised when sections still fail after their retries. texts holds the text of every section, None for the failed ones.
+    '''
+
+    def __init__(self, failed: dict, texts: list):
+        first=min(failed)
+        super().__init__(f"{len(failed)} of {len(texts)} sections failed; section {first+1}: {failed[first]}")
+        self.failed=failed
+        self.texts=texts
+
+
+def parse_outline(text: str, sections: int=None) -> dict:
+    '''
+    Parse the outline from a model response: JSON as requested, or a numbered list as a fallback.
+
+    Returns:
+        dict: {"title": str, "sections": [{"title": str, "synopsis": str}]}
+    '''
+    cleaned=re.sub(r"^```(?:json)?|```$", "", text.strip(), flags=re.MULTILINE).strip()
+    start, end=cleaned.find("{"), cleaned.rfind("}")
+    outline=None
+    if start!=-1 and end>start:
+        try:
+            data=json.loads(cleaned[start:end+1])
+            outline={
+                "title": str(data.get("title", "")),
+                "sections": [{"title": str(section.get("title", "")).strip(), "synopsis": str(section.get("synopsis", "")).strip()}
+                             for section in data.get("sections", []) if isinstance(section, dict)]
+            }
+        except (ValueError, AttributeError):
+            outline=None
+
+    if outline is None:
+        outline={"title": "", "sections": []}
+        for line in cleaned.splitlines():
+            match=re.match(r"^\s*(?:\d+[.)]|[-*])\s+(.+)$", line)
+            if match:
+                title, _, synopsis=match.group(1).partition(":")
+                outline["sections"].append({"title": title.strip(" *#"), "synopsis": synopsis.strip()})
+
+    outline["sections"]=[section for section in outline["sections"] if section["title"] or section["synopsis"]]
+    if not outline["sections"]:
+        raise ValueError("Could not parse an outline from the model response")
+    if sections is not None:
+        outline["sections"]=outline["sections"][:sections]
+    return outline
+
+
+def format_outline(outline: dict) -> str:
+    lines=[outline["title"]] if outline["title"] else []
+    for number, section in enumerate(outline["sections"], start=1):
+        lines.append(f"{number}. {section['title']}: {section['synopsis']}")
+    return "\n".join(lines)
+
+
+def section_prompt(user_prompt: str, research_material: str, outline: dict, index: int) -> str:
+    sections=outline["sections"]
+    previous_section=f"{sections[index-1]['title']}: {sections[index-1]['synopsis']}" if index>0 else "(none, yours is the first)"
+    next_section=f"{sections[index+1]['title']}: {sections[index+1]['synopsis']}" if index+1<len(sections) else "(none, yours is the last)"
+    return (f"User Prompt:\n {user_prompt}\nResearch Material:\n {research_material}\nOutline:\n {format_outline(outline)}\n"
+            f"Previous chapter/section:\n {previous_section}\nNext chapter/section:\n {next_section}\n"
+            f"Write chapter/section {index+1} of {len(sections)}: {sections[index]['title']}\nSynopsis: {sections[index]['synopsis']}")
+
+
+def transition_prompt(previous_text: str, next_text: str) -> str:
+    head=next_text[:transition_context_tokens*CHARS_PER_TOKEN]
+    return f"End of the previous chapter/section:\n {tail_tokens(previous_text, transition_context_tokens)}\nBeginning of the next chapter/section:\n {head}"
+
+
+async def _timed(semaphore: asyncio.Semaphore, provider, system: str, prompt: str, max_tokens: int, temperature: float):
+    async with semaphore:
+        generation=await provider.generate(system, [{"role": "user", "content": prompt}], max_tokens, temperature)
+        return generation.text.strip(), generation.latency
+
+
+async def _gather_retrying(calls: list, retries: int):
+    '''
+    Await every call concurrently, then call the failed ones again, up to `retries` more rounds.
+
+    A failure never cancels the other calls, so the finished ones are kept and only the failed ones are repeated.
+
+    Returns:
+        tuple: (results, with None for the calls that failed every round, dict of index -> last exception, retries made)
+    '''
+    results=[None]*len(calls)
+    pending=list(range(len(calls)))
+    failed={}
+    retried=0
+    for attempt in range(retries+1):
+        if attempt:
+            retried+=len(pending)
+        outcomes=await asyncio.gather(*[calls[index]() for index in pending], return_exceptions=True)
+        failed={}
+        for index, outcome in zip(pending, outcomes):
+            if isinstance(outcome, Exception):
+                failed[index]=outcome
+            else:
+                results[index]=outcome
+        pending=sorted(failed)
+        if not pending:
+            break
+    return results, failed, retried
+
+
+async def generate_outline(provider, user_prompt: str, research_material: str, sections: int, max_tokens: int=4096,
+                           temperature: float=0.75) -> dict:
+    prompt=f"User Prompt:\n {user_prompt}\nResearch Material:\n {research_material}"
+    generation=await provider.generate(outline_instruction.replace("{sections}", str(sections)),
+                                       [{"role": "user", "content": prompt}], max_tokens, temperature)
+    return parse_outline(generation.text, sections)
+
+
+async def generate_sectioned_content(provider, user_prompt: str, research_material: str, sections: int=15,
+                                     concurrency: int=4, max_tokens: int=4096, temperature: float=0.75, stitch: bool=True,
+                                     retries: int=2):
+    '''
+    Generate long form content from an outline, writing the sections concurrently.
+
+    Args:
+        provider (Provider): Model provider
+        user_prompt (str): User's query
+        research_material (str): Output of generate_research_material_*
+        sections (int): Number of chapters/sections in the outline
+        concurrency (int): Maximum number of generate calls in flight at once
+        max_tokens (int): Maximum output tokens of each section
+        temperature (float): Sampling temperature
+        stitch (bool): Write a bridging passage at each section boundary
+        retries (int): Rounds in which failed sections and bridges are written again; a bridge that still fails is left out
+
+    Returns:
+        tuple: (content, report), with report a dict of the outline, the per-call latencies and the stage times
+
+    Raises:
+        SectionError: When a section still fails after its retries, with the text of the sections that were written
+    '''
+    semaphore=asyncio.Semaphore(concurrency)
+    start_time=time()
+    outline=await generate_outline(provider, user_prompt, research_material, sections, max_tokens, temperature)
+    outline_time=time()-start_time
+
+    section_start=time()
+    results, failed, section_retries=await _gather_retrying([
+        lambda index=index: _timed(semaphore, provider, section_instruction, section_prompt(user_prompt, research_material, outline, index),
+                                   max_tokens, temperature)
+        for index in range(len(outline["sections"]))
+    ], retries)
+    if failed:
+        raise SectionError(failed, [result[0] if result else None for result in results])
+    section_time=time()-section_start
+    texts=[text for text, _ in results]
+
+    transitions=[]
+    transition_retries=0
+    stitch_start=time()
+    if stitch and len(texts)>1:
+        transitions, _, transition_retries=await _gather_retrying([
+            lambda i=i: _timed(semaphore, provider, transition_instruction, transition_prompt(texts[i], texts[i+1]), 512, temperature)
+            for i in range(len(texts)-1)
+        ], retries)
+    stitch_time=time()-stitch_start
+
+    parts=[texts[0]]
+    for i, text in enumerate(texts[1:]):
+        if transitions and transitions[i]:
+            parts.append(transitions[i][0])
+        parts.append(text)
+
+    report={
+        "outline": outline,
+        "section_latencies": [latency for _, latency in results],
+        "transition_latencies": [transition[1] for transition in transitions if transition],
+        "retries": section_retries+transition_retries,
+        "outline_time": outline_time,
+        "section_time": section_time,
+        "stitch_time": stitch_time,
+        "wall_time": time()-start_time,
+        "concurrency": concurrency
+    }
+    return "\n\n".join(parts), report
+
+
+def print_sectioned_report(report: dict):
+    sections=report["outline"]["sections"]
+    print(f"\nOutline: {len(sections)} sections, written {report['concurrency']} at a time")
+    print(f"{'Section':>7} {'Latency (s)':>12}  Title")
+    for number, (section, latency) in enumerate(zip(sections, report["section_latencies"]), start=1):
+        print(f"{number:>7} {latency:>12.2f}  {section['title']}")
+    call_time=sum(report["section_latencies"])+sum(report["transition_latencies"])
+    print(f"Outline {report['outline_time']:.2f} s, sections {report['section_time']:.2f} s, stitching {report['stitch_time']:.2f} s; "
+          f"{report['wall_time']:.2f} s wall-clock for {call_time+report['outline_time']:.2f} s of model calls")
+    if report["retries"]:
+        print(f"{report['retries']} section/bridge calls retried")
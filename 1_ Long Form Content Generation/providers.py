@@ -0,0 +1,350 @@
+'''
+Async model providers for the long form pipeline.
+
+Every provider exposes the same call, generate(system, messages, max_tokens, temperature), so the research,
+iterative, summary and outline code paths are written once instead of once per API. Clients are created on the
+first call and reused (Gemini models are cached per model and system instruction, since the system instruction
+is fixed when a model is built), so importing this module or building a provider needs no API key. The async
+clients are bound to the event loop they were created on, so they are kept per loop: each asyncio.run() of the
+sync wrappers gets its own instead of reusing one whose loop has been closed. Each provider has its own
+concurrency limit and its own RateLimiter, shared by all of its calls.
+
+Given a stream (see checkpoint.py), generate() uses the provider's streaming API and writes the text to it as it
+arrives; a retried attempt first calls stream.restart_chunk() so the text of a failed attempt is dropped.
+
+MockProvider runs the whole pipeline offline: deterministic text, configurable latency and token counts, and
+injected failures and 429 responses.
+'''
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+from time import time
+
+from rate_limiter import RateLimiter
+from rolling_context import CHARS_PER_TOKEN, estimate_tokens
+
+
+class ProviderError(Exception):
+    '''
+    Raised when a provider cannot be set up, or returns no usable response.
+    '''
+
+
+class Generation:
+    '''
+    Result of one generate call.
+
+    Attributes:
+        text (str): Generated text
+        input_tokens (int): Prompt tokens, as reported by the API or estimated
+        output_tokens (int): Generated tokens, as reported by the API or estimated
+        latency (float): Seconds the successful API call took
+        throttled (float): Seconds spent waiting for the concurrency and rate limits, and on retries
+    '''
+
+    def __init__(self, text: str, input_tokens: int, output_tokens: int):
+        self.text=text
+        self.input_tokens=input_tokens
+        self.output_tokens=output_tokens
+        self.latency=0.0
+        self.throttled=0.0
+
+
+class Provider:
+    '''
+    Base class: concurrency and rate limiting around the provider specific _generate().
+
+    Attributes:
+        name (str): Provider name
+        model (str): Model for generation
+        summary_model (str): Cheaper model for summaries
+        concurrency (int): Maximum number of calls in flight at once
+        limiter (RateLimiter): Requests and tokens per minute limits of the provider
+        stats (dict): calls, input_tokens, output_tokens and call_seconds of the successful calls
+    '''
+    name="provider"
+    default_model=None
+    default_summary_model=None
+
+    def __init__(self, model: str=None, summary_model: str=None, concurrency: int=4,
+                 requests_per_minute: float=None, tokens_per_minute: float=None, limiter: RateLimiter=None):
+        self.model=model or self.default_model
+        self.summary_model=summary_model or self.default_summary_model or self.model
+        self.concurrency=concurrency
+        self.limiter=limiter or RateLimiter(self.name, requests_per_minute, tokens_per_minute)
+        self.stats={"calls": 0, "input_tokens": 0, "output_tokens": 0, "call_seconds": 0.0}
+        self._loop_states={}
+
+    def _loop_state(self) -> dict:
+        # Semaphores and async API clients belong to one event loop, and each asyncio.run() starts a new one
+        loop=asyncio.get_running_loop()
+        if loop not in self._loop_states:
+            self._loop_states={loop: {}}
+        return self._loop_states[loop]
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        state=self._loop_state()
+        if "semaphore" not in state:
+            state["semaphore"]=asyncio.Semaphore(self.concurrency)
+        return state["semaphore"]
+
+    async def generate(self, system: str, messages: list, max_tokens: int=4096, temperature: float=0.75,
+                       model: str=None, stream=None) -> Generation:
+        '''
+        Generate a response.
+
+        Args:
+            system (str): System instruction
+            messages (list): Conversation as {"role": "user" or "assistant", "content": str} dicts
+            max_tokens (int): Maximum output tokens
+            temperature (float): Sampling temperature
+            model (str, optional): Model to use instead of the provider's default, e.g. its summary_model
+            stream (optional): Receives the text as it is generated, through write(text) and restart_chunk()
+
+        Returns:
+            Generation: The generated text with its token counts and timings
+        '''
+        model=model or self.model
+        request_start=time()
+        attempt_start=request_start
+
+        async def attempt():
+            nonlocal attempt_start
+            attempt_start=time()
+            if stream is not None:
+                stream.restart_chunk()
+            return await self._generate(system, messages, max_tokens, temperature, model, stream)
+
+        # Reserved against the tokens per minute limit up front, and corrected with the real usage afterwards
+        tokens=estimate_tokens(system)+sum(estimate_tokens(message["content"]) for message in messages)+max_tokens
+        async with self._semaphore():
+            generation=await self.limiter.call_async(
+                attempt, tokens=tokens, usage=lambda generation: generation.input_tokens+generation.output_tokens
+            )
+        end_time=time()
+        generation.latency=end_time-attempt_start
+        generation.throttled=attempt_start-request_start
+        self.stats["calls"]+=1
+        self.stats["input_tokens"]+=generation.input_tokens
+        self.stats["output_tokens"]+=generation.output_tokens
+        self.stats["call_seconds"]+=generation.latency
+        return generation
+
+    async def _generate(self, system: str, messages: list, max_tokens: int, temperature: float, model: str,
+                        stream=None) -> Generation:
+        raise NotImplementedError
+
+    def report(self) -> str:
+        stats=self.stats
+        return (f"{self.limiter.report()}; {stats['calls']} successful with {stats['input_tokens']} input and "
+                f"{stats['output_tokens']} output tokens, {stats['call_seconds']:.1f} seconds of calls")
+
+
+def _input_tokens(system: str, messages: list) -> int:
+    return estimate_tokens(system)+sum(estimate_tokens(message["content"]) for message in messages)
+
+
+def _api_key(variable: str) -> str:
+    key=os.getenv(variable)
+    if not key:
+        raise ProviderError(f"{variable} is not set; add it to the environment or the .env file")
+    return key
+
+
+class GeminiProvider(Provider):
+    name="gemini"
+    default_model="gemini-1.5-pro-002"
+    default_summary_model="gemini-1.5-flash-002"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._genai=None
+
+    def _get_model(self, model: str, system: str):
+        if self._genai is None:
+            import google.generativeai as genai
+            genai.configure(api_key=_api_key("GEMINI_KEY"))
+            self._genai=genai
+        # A model creates its async client on first use, bound to the running loop
+        models=self._loop_state().setdefault("models", {})
+        key=(model, system)
+        if key not in models:
+            models[key]=self._genai.GenerativeModel(model_name=model, system_instruction=system)
+        return models[key]
+
+    async def _generate(self, system, messages, max_tokens, temperature, model, stream=None):
+        gemini_model=self._get_model(model, system)
+        contents=[{"role": "model" if message["role"]=="assistant" else "user", "parts": [message["content"]]}
+                  for message in messages]
+        generation_config=self._genai.GenerationConfig(max_output_tokens=max_tokens, temperature=temperature)
+        if stream is None:
+            response=await gemini_model.generate_content_async(contents, generation_config=generation_config)
+            try:
+                text=response.text
+            except ValueError as e:
+                # Raised when the candidate was blocked or has no text parts
+                raise ProviderError(f"Gemini returned no text: {str(e)}") from e
+        else:
+            response=await gemini_model.generate_content_async(contents, generation_config=generation_config, stream=True)
+            parts=[]
+            async for chunk in response:
+                try:
+                    part=chunk.text
+                except ValueError:
+                    continue
+                stream.write(part)
+                parts.append(part)
+            text="".join(parts)
+            if not text:
+                raise ProviderError("Gemini returned no text")
+        usage=getattr(response, "usage_metadata", None)
+        input_tokens=getattr(usage, "prompt_token_count", None)
+        output_tokens=getattr(usage, "candidates_token_count", None)
+        return Generation(
+            text,
+            input_tokens if input_tokens is not None else _input_tokens(system, messages),
+            output_tokens if output_tokens is not None else estimate_tokens(text)
+        )
+
+
+class CohereProvider(Provider):
+    name="cohere"
+    default_model="command-r-plus-08-2024"
+    default_summary_model="command-r-08-2024"
+
+    def _get_client(self):
+        state=self._loop_state()
+        if "client" not in state:
+            import cohere
+            state["client"]=cohere.AsyncClientV2(_api_key("COHERE_KEY"))
+        return state["client"]
+
+    async def _generate(self, system, messages, max_tokens, temperature, model, stream=None):
+        request={
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "system", "content": system}]+list(messages)
+        }
+        if stream is None:
+            response=await self._get_client().chat(**request)
+            if not response.message.content:
+                raise ProviderError("Cohere returned no content")
+            text=response.message.content[0].text
+            usage=getattr(response, "usage", None)
+        else:
+            parts, usage=[], None
+            async for event in self._get_client().chat_stream(**request):
+                if event.type=="content-delta":
+                    part=event.delta.message.content.text
+                    stream.write(part)
+                    parts.append(part)
+                elif event.type=="message-end":
+                    usage=getattr(event.delta, "usage", None)
+            text="".join(parts)
+            if not text:
+                raise ProviderError("Cohere returned no content")
+        input_tokens, output_tokens=None, None
+        for units in (getattr(usage, "tokens", None), getattr(usage, "billed_units", None)):
+            if getattr(units, "input_tokens", None) is not None:
+                input_tokens, output_tokens=int(units.input_tokens), int(getattr(units, "output_tokens", None) or 0)
+                break
+        return Generation(
+            text,
+            input_tokens if input_tokens is not None else _input_tokens(system, messages),
+            output_tokens if output_tokens is not None else estimate_tokens(text)
+        )
+
+
+class MockRateLimitError(Exception):
+    '''
+    429 response injected by MockProvider; looks like the real clients' errors to the rate limiter.
+    '''
+
+    def __init__(self, retry_after: float):
+        super().__init__("429 Too Many Requests (mock)")
+        self.status_code=429
+        self.headers={"retry-after": str(retry_after)}
+
+
+class MockProvider(Provider):
+    '''
+    Deterministic offline provider.
+
+    The same system instruction and messages always give the same text. Outline requests (a system
+    instruction asking for JSON with "exactly N" sections) get a valid JSON outline, so the outline mode runs too.
+
+    Args:
+        latency (float): Seconds per call
+        tokens_per_second (float, optional): Adds output_tokens / tokens_per_second seconds to each call
+        output_tokens (int): Tokens generated per call, capped by max_tokens
+        failure_rate (float): Share of calls that raise ProviderError
+        fail_at_call (int, optional): Call number (from 1) that fails halfway through its text, like a dropped connection
+        rate_limit_rate (float): Share of calls answered with a 429 and a Retry-After of retry_after seconds
+        seed (int): Seed of the failure injection
+        async_sleep (callable): Sleep used for the latency, e.g. ManualClock.sleep_async
+    '''
+    name="mock"
+    default_model="mock-large"
+    default_summary_model="mock-small"
+
+    def __init__(self, *args, latency: float=0.05, tokens_per_second: float=None, output_tokens: int=3000,
+                 failure_rate: float=0.0, fail_at_call: int=None, rate_limit_rate: float=0.0, retry_after: float=1.0,
+                 seed: int=0, async_sleep=asyncio.sleep, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latency=latency
+        self.tokens_per_second=tokens_per_second
+        self.output_tokens=output_tokens
+        self.failure_rate=failure_rate
+        self.fail_at_call=fail_at_call
+        self.call_count=0
+        self.rate_limit_rate=rate_limit_rate
+        self.retry_after=retry_after
+        self.random=random.Random(seed)
+        self.async_sleep=async_sleep
+
+    def _text(self, system: str, messages: list, tokens: int) -> str:
+        sections=re.search(r"exactly (\d+) chapters", system)
+        if sections and "JSON" in system:
+            return json.dumps({"title": "Mock outline", "sections": [
+                {"title": f"Section {number}", "synopsis": f"What section {number} covers."}
+                for number in range(1, int(sections.group(1))+1)
+            ]})
+        digest=hashlib.sha256((system+"".join(m["content"] for m in messages)).encode("utf-8")).hexdigest()
+        words=[digest[i:i+6] for i in range(0, len(digest), 6)]
+        text=" ".join(words[i%len(words)] for i in range(tokens*CHARS_PER_TOKEN//7+1))
+        return f"[{digest[:8]}] {text}"
+
+    async def _generate(self, system, messages, max_tokens, temperature, model, stream=None):
+        self.call_count+=1
+        draw=self.random.random()
+        if draw<self.rate_limit_rate:
+            raise MockRateLimitError(self.retry_after)
+        if draw<self.rate_limit_rate+self.failure_rate:
+            raise ProviderError("Injected mock failure")
+
+        tokens=min(max_tokens, self.output_tokens)
+        text=self._text(system, messages, tokens)
+        delay=self.latency+(tokens/self.tokens_per_second if self.tokens_per_second else 0.0)
+        pieces=8 if stream is not None else 1
+        size=len(text)//pieces+1
+        for piece in range(pieces):
+            if self.call_count==self.fail_at_call and piece==pieces//2:
+                raise ProviderError(f"Injected mock failure during call {self.call_count}")
+            await self.async_sleep(delay/pieces)
+            if stream is not None:
+                stream.write(text[piece*size:(piece+1)*size])
+        return Generation(text, _input_tokens(system, messages), estimate_tokens(text))
+
+
+PROVIDERS={"gemini": GeminiProvider, "cohere": CohereProvider, "mock": MockProvider}
+
+
+def create_provider(name: str, **kwargs) -> Provider:
+    if name not in PROVIDERS:
+        raise ProviderError(f"Unknown provider: {name} (choose from {', '.join(PROVIDERS)})")
+    return PROVIDERS[name](**kwargs)
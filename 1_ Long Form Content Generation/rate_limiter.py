@@ -0,0 +1,249 @@
+'''
+Token-bucket rate limiting for the generation APIs.
+
+A fixed sleep before every call wastes minutes on tiers whose limits are far higher than the free one, and
+still does not react when a limit is hit anyway. RateLimiter keeps two buckets per provider, one for requests
+per minute and one for tokens per minute, and waits only as long as they require. A call reserves its share of
+both buckets up front (the buckets may go negative, so concurrent callers queue up behind each other instead of
+all waking at once), and the token reservation is corrected with the real usage once the response arrives.
+
+When the API answers 429 anyway, the limiter pauses the whole provider for the Retry-After time, or an
+exponential backoff without one, and retries. Time spent waiting is recorded in the limiter's stats.
+
+The clock and sleep functions are injectable, so limits can be exercised offline with a ManualClock.
+'''
+
+import asyncio
+import email.utils
+import threading
+import time
+
+
+class RateLimitExceeded(Exception):
+    '''
+    Raised when a call is still rate limited after all retries.
+    '''
+
+
+def parse_retry_after(value):
+    '''
+    Parse a Retry-After value given in seconds or as an HTTP date; returns seconds, or None if invalid.
+    '''
+    if value is None or value=="":
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp()-time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def rate_limit_delay(error):
+    '''
+    Check whether an API error is a rate limit response.
+
+    Works with the Cohere (TooManyRequestsError, status_code 429, httpx headers) and Google
+    (ResourceExhausted, code 429, retry_delay in the error details) clients without importing them.
+
+    Returns:
+        tuple: (is rate limited, seconds to wait as hinted by the API or None)
+    '''
+    status=getattr(error, "status_code", None)
+    if status is None:
+        code=getattr(error, "code", None)
+        status=code if isinstance(code, int) else getattr(code, "value", None)
+    if status!=429 and type(error).__name__ not in ("TooManyRequestsError", "ResourceExhausted"):
+        return False, None
+
+    headers=getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None) or {}
+    retry_after=parse_retry_after(headers.get("retry-after", headers.get("Retry-After")))
+    if retry_after is None:
+        retry_after=getattr(error, "retry_after", None)
+    if retry_after is None:
+        # google.rpc.RetryInfo, as attached to ResourceExhausted by the Gemini API
+        for detail in getattr(error, "details", None) or []:
+            delay=getattr(detail, "retry_delay", None)
+            if delay is not None:
+                retry_after=delay.seconds+delay.nanos/1e9
+    return True, retry_after
+
+
+class ManualClock:
+    '''
+    Clock for offline runs: sleeping advances the time instantly. It models one caller at a time; concurrent
+    sleepers would each advance it.
+    '''
+
+    def __init__(self, start: float=0.0):
+        self.now=start
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now+=max(0.0, seconds)
+
+    async def sleep_async(self, seconds: float):
+        self.sleep(seconds)
+        await asyncio.sleep(0)
+
+
+class TokenBucket:
+    '''
+    Bucket holding up to `per_minute` units, refilled continuously at per_minute/60 units a second.
+    '''
+
+    def __init__(self, per_minute: float, now: float):
+        self.capacity=float(per_minute)
+        self.rate=per_minute/60.0
+        self.level=self.capacity
+        self.updated=now
+
+    def refill(self, now: float):
+        self.level=min(self.capacity, self.level+(now-self.updated)*self.rate)
+        self.updated=now
+
+    def reserve(self, amount: float, now: float) -> float:
+        '''
+        Take `amount` units, possibly going negative; returns the seconds until the reservation is covered.
+        '''
+        self.refill(now)
+        # A request larger than the bucket could never be covered; it waits for a full bucket instead
+        self.level-=min(amount, self.capacity)
+        return 0.0 if self.level>=0 else -self.level/self.rate
+
+
+class RateLimiter:
+    '''
+    Requests-per-minute and tokens-per-minute limits of one provider, shared by all of its calls.
+
+    Attributes:
+        name (str): Provider name, used in messages
+        stats (dict): calls, retries, rate_limited (429 responses), throttled_calls and throttled_seconds
+            (time spent waiting for the buckets or a backoff)
+    '''
+
+    def __init__(self, name: str, requests_per_minute: float=None, tokens_per_minute: float=None,
+                 max_retries: int=5, backoff_base: float=2.0, backoff_max: float=120.0,
+                 clock=time.monotonic, sleep=time.sleep, async_sleep=asyncio.sleep):
+        self.name=name
+        self.clock=clock
+        self.sleep=sleep
+        self.async_sleep=async_sleep
+        self.max_retries=max_retries
+        self.backoff_base=backoff_base
+        self.backoff_max=backoff_max
+        now=clock()
+        self.requests=TokenBucket(requests_per_minute, now) if requests_per_minute else None
+        self.tokens=TokenBucket(tokens_per_minute, now) if tokens_per_minute else None
+        self.blocked_until=now
+        self.lock=threading.Lock()
+        self.stats={"calls": 0, "retries": 0, "rate_limited": 0, "throttled_calls": 0, "throttled_seconds": 0.0}
+
+    def reserve(self, tokens: int=0) -> float:
+        '''
+        Reserve one request and `tokens` tokens; returns the seconds to wait before sending it.
+        '''
+        with self.lock:
+            now=self.clock()
+            delay=max(0.0, self.blocked_until-now)
+            if self.requests is not None:
+                delay=max(delay, self.requests.reserve(1, now))
+            if self.tokens is not None:
+                delay=max(delay, self.tokens.reserve(tokens, now))
+            self.stats["calls"]+=1
+            if delay>0:
+                self.stats["throttled_calls"]+=1
+                self.stats["throttled_seconds"]+=delay
+            return delay
+
+    def settle(self, reserved_tokens: int, used_tokens: int):
+        '''
+        Correct a token reservation with the usage the API reported.
+        '''
+        if self.tokens is None or used_tokens is None:
+            return
+        with self.lock:
+            self.tokens.refill(self.clock())
+            # reserve() takes at most a full bucket, so the correction is clamped the same way
+            self.tokens.level+=min(reserved_tokens, self.tokens.capacity)-min(used_tokens, self.tokens.capacity)
+
+    def penalize(self, attempt: int, retry_after: float=None) -> float:
+        '''
+        Pause the provider after a 429; returns the seconds the caller has to wait before retrying.
+        '''
+        delay=retry_after if retry_after is not None else min(self.backoff_max, self.backoff_base*(2**attempt))
+        with self.lock:
+            now=self.clock()
+            self.blocked_until=max(self.blocked_until, now+delay)
+            # The API's view of the budget is emptier than ours; stop counting on any saved-up burst
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.refill(now)
+                    bucket.level=min(bucket.level, 0.0)
+            self.stats["rate_limited"]+=1
+            wait=self.blocked_until-now
+            self.stats["throttled_seconds"]+=wait
+            return wait
+
+    def call(self, function, tokens: int=0, usage=None):
+        '''
+        Call `function()` within the limits, retrying on 429.
+
+        Args:
+            function (callable): Makes the API call
+            tokens (int): Estimated tokens the call counts against the tokens-per-minute limit
+            usage (callable, optional): Gets the tokens actually used from the response
+
+        Returns:
+            The response of `function()`
+        '''
+        for attempt in range(self.max_retries+1):
+            delay=self.reserve(tokens)
+            if delay>0:
+                self.sleep(delay)
+            try:
+                response=function()
+            except Exception as e:
+                rate_limited, retry_after=rate_limit_delay(e)
+                if not rate_limited:
+                    raise
+                if attempt==self.max_retries:
+                    raise RateLimitExceeded(f"{self.name}: still rate limited after {attempt+1} attempts") from e
+                self.stats["retries"]+=1
+                self.sleep(self.penalize(attempt, retry_after))
+                continue
+            if usage is not None:
+                self.settle(tokens, usage(response))
+            return response
+
+    async def call_async(self, function, tokens: int=0, usage=None):
+        '''
+        Await `function()` within the limits, retrying on 429; the async counterpart of call().
+        '''
+        for attempt in range(self.max_retries+1):
+            delay=self.reserve(tokens)
+            if delay>0:
+                await self.async_sleep(delay)
+            try:
+                response=await function()
+            except Exception as e:
+                rate_limited, retry_after=rate_limit_delay(e)
+                if not rate_limited:
+                    raise
+                if attempt==self.max_retries:
+                    raise RateLimitExceeded(f"{self.name}: still rate limited after {attempt+1} attempts") from e
+                self.stats["retries"]+=1
+                await self.async_sleep(self.penalize(attempt, retry_after))
+                continue
+            if usage is not None:
+                self.settle(tokens, usage(response))
+            return response
+
+    def report(self) -> str:
+        stats=self.stats
+        return (f"{self.name}: {stats['calls']} calls, {stats['throttled_calls']} throttled, "
+                f"{stats['rate_limited']} rate limited (429), {stats['throttled_seconds']:.1f} seconds waiting")
@@ -0,0 +1,113 @@
+'''
+Context management for iterative long form generation.
+
+Resending the whole draft on every iteration makes input tokens, cost and latency grow quadratically with the
+output length, and the prompt eventually runs into the model's context window. RollingContext keeps the
+"AI Response generated so far" part of the prompt within a fixed budget instead: the last recent_tokens of the
+draft are sent verbatim, and everything older is folded into a rolling summary, updated incrementally by a
+cheap model call whenever text falls out of the verbatim window.
+
+FullContext has the same interface and sends the whole draft, as the script originally did, so both modes
+can be run and compared with the same loop.
+
+Both can be checkpointed: checkpoint_state() describes the context without the draft itself, and restore() rebuilds
+it from that state and the draft tail of the length it records, read back from the output file.
+'''
+
+# Rough English average; the budget only needs to be approximate, billed token counts come from the API
+CHARS_PER_TOKEN=4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text)+CHARS_PER_TOKEN-1)//CHARS_PER_TOKEN
+
+
+def tail_tokens(text: str, tokens: int) -> str:
+    '''
+    Get about the last `tokens` tokens of text, starting at a paragraph or word boundary where possible.
+    '''
+    max_chars=tokens*CHARS_PER_TOKEN
+    if len(text)<=max_chars:
+        return text
+    tail=text[-max_chars:]
+    # Prefer starting on a paragraph, then on a word, as long as that does not drop more than a fifth of the tail
+    for separator in ("\n\n", "\n", " "):
+        cut=tail.find(separator)
+        if 0<=cut<len(tail)//5:
+            return tail[cut+len(separator):]
+    return tail
+
+
+class FullContext:
+    '''
+    Sends the whole draft generated so far.
+    '''
+    mode="full"
+
+    def __init__(self):
+        self.text=""
+        self.summary_calls=[]
+
+    async def add(self, chunk: str):
+        self.text=self.text+"\n"+chunk
+
+    def render(self) -> str:
+        return self.text
+
+    def checkpoint_state(self) -> dict:
+        return {"recent_bytes": len(self.text.encode("utf-8"))}
+
+    def restore(self, state: dict, recent: str):
+        self.text=recent
+
+
+class RollingContext:
+    '''
+    Sends a rolling summary of the earlier sections plus the most recent text verbatim.
+
+    summarize(previous_summary, new_text, max_tokens) is a coroutine returning the updated summary. It is awaited
+    only when text falls out of the verbatim window, with just that text, so each call costs about one chunk plus
+    the summary. Every call is recorded in summary_calls as a dict with its input tokens and latency, if summarize
+    returns (summary, input tokens, latency) instead of a plain string.
+    '''
+    mode="rolling"
+
+    def __init__(self, summarize, recent_tokens: int=6000, summary_tokens: int=1000):
+        self.summarize=summarize
+        self.recent_tokens=recent_tokens
+        self.summary_tokens=summary_tokens
+        self.summary=""
+        self.recent=""
+        self.summary_calls=[]
+
+    async def add(self, chunk: str):
+        self.recent=self.recent+"\n"+chunk
+        if estimate_tokens(self.recent)<=self.recent_tokens:
+            return
+
+        kept=tail_tokens(self.recent, self.recent_tokens)
+        evicted=self.recent[:len(self.recent)-len(kept)]
+        result=await self.summarize(self.summary, evicted, self.summary_tokens)
+        if isinstance(result, tuple):
+            result, input_tokens, latency=result
+            self.summary_calls.append({"input_tokens": input_tokens, "latency": latency})
+        self.summary=result.strip()
+        self.recent=kept
+
+    def render(self) -> str:
+        if not self.summary:
+            return self.recent
+        return f"\n[Summary of the earlier sections]\n{self.summary}\n\n[Most recent text, verbatim]\n{self.recent}"
+
+    def checkpoint_state(self) -> dict:
+        return {"summary": self.summary, "recent_bytes": len(self.recent.encode("utf-8"))}
+
+    def restore(self, state: dict, recent: str):
+        self.summary=state.get("summary", "")
+        self.recent=recent
+
+    def budget(self) -> int:
+        '''
+        Upper bound, in estimated tokens, of what render() returns.
+        '''
+        return self.recent_tokens+self.summary_tokens+50
@@ -0,0 +1,110 @@
+'''
+The sync wrappers of long_form_content.py each run their own event loop with asyncio.run(), while the providers
+are shared between calls. These tests call two wrappers in a row against the real Gemini and Cohere providers,
+with fake API clients that fail when used on a loop other than the one they were bound to.
+
+    python -m unittest test_providers
+'''
+
+import asyncio
+import os
+import sys
+import types
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import long_form_content
+from providers import CohereProvider, GeminiProvider
+
+
+class LoopBound:
+    '''
+    Binds to the running loop on first use, like the async HTTP and grpc clients do.
+    '''
+
+    def check_loop(self):
+        loop=asyncio.get_running_loop()
+        if getattr(self, "loop", None) is None:
+            self.loop=loop
+        elif loop is not self.loop:
+            raise RuntimeError("client used on a different event loop than the one it is bound to")
+
+
+class FakeCohereClient(LoopBound):
+    def __init__(self, api_key: str):
+        self.check_loop()
+        clients.append(self)
+
+    async def chat(self, **request):
+        self.check_loop()
+        return SimpleNamespace(message=SimpleNamespace(content=[SimpleNamespace(text="research")]), usage=None)
+
+    async def chat_stream(self, **request):
+        self.check_loop()
+        yield SimpleNamespace(type="content-delta", delta=SimpleNamespace(message=SimpleNamespace(content=SimpleNamespace(text="content"))))
+        yield SimpleNamespace(type="message-end", delta=SimpleNamespace(usage=None))
+
+
+class FakeGeminiModel(LoopBound):
+    def __init__(self, model_name: str, system_instruction: str):
+        clients.append(self)
+
+    async def generate_content_async(self, contents, generation_config=None, stream=False):
+        self.check_loop()
+        if not stream:
+            return SimpleNamespace(text="research", usage_metadata=None)
+        return FakeGeminiStream()
+
+
+class FakeGeminiStream:
+    usage_metadata=None
+
+    async def __aiter__(self):
+        yield SimpleNamespace(text="content")
+
+
+clients=[]
+
+fake_cohere=types.ModuleType("cohere")
+fake_cohere.AsyncClientV2=FakeCohereClient
+
+fake_genai=types.ModuleType("google.generativeai")
+fake_genai.configure=lambda api_key: None
+fake_genai.GenerativeModel=FakeGeminiModel
+fake_genai.GenerationConfig=dict
+fake_google=types.ModuleType("google")
+fake_google.generativeai=fake_genai
+
+
+class SyncWrapperLoopTest(unittest.TestCase):
+    def setUp(self):
+        clients.clear()
+        patches=[
+            mock.patch.dict(sys.modules, {"cohere": fake_cohere, "google": fake_google, "google.generativeai": fake_genai}),
+            mock.patch.dict(os.environ, {"COHERE_KEY": "test", "GEMINI_KEY": "test"}),
+            mock.patch.dict(long_form_content.providers, {"cohere": CohereProvider(), "gemini": GeminiProvider()}, clear=True),
+            mock.patch.object(long_form_content, "max_iterations", 2),
+            mock.patch.object(long_form_content, "context_mode", "full")
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_cohere_wrappers_in_a_row(self):
+        research=long_form_content.generate_research_material_cohere("prompt")
+        content=long_form_content.generate_long_form_content_cohere("prompt", research, "")
+        self.assertEqual(research, "research")
+        self.assertEqual(content, "\ncontent\ncontent")
+        # One client per asyncio.run(), each used only on its own loop
+        self.assertEqual(len(clients), 2)
+
+    def test_gemini_wrappers_in_a_row(self):
+        research=long_form_content.generate_research_material_gemini("prompt")
+        content=long_form_content.generate_long_form_content_gemini("prompt", research, "")
+        self.assertEqual(research, "research")
+        self.assertEqual(content, "\ncontent\ncontent")
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Compact storage for ElevenLabs character alignment.
+
+An alignment is saved as a single .npy file holding a structured array with one record per character
+(the character, its start time and its end time). It loads straight into NumPy arrays without any
+parsing and can be memory-mapped.
+"""
+
+import io
+
+import numpy as np
+
+from tts_cache import atomic_write
+
+
+class Alignment:
+    """
+    Character-level timing of a narration.
+
+    Attributes:
+        characters (np.ndarray): One string per character
+        start_times (np.ndarray): Start time of each character in seconds
+        end_times (np.ndarray): End time of each character in seconds
+    """
+
+    def __init__(self, characters, start_times, end_times):
+        self.characters = characters
+        self.start_times = start_times
+        self.end_times = end_times
+
+    @classmethod
+    def from_dict(cls, alignment):
+        """
+        Build an alignment from the dict returned by the ElevenLabs with-timestamps endpoint.
+
+        Args:
+            alignment (dict): Dict with characters, character_start_times_seconds and
+                character_end_times_seconds lists
+
+        Returns:
+            Alignment: Alignment backed by NumPy arrays
+        """
+        return cls(
+            np.array(alignment['characters'], dtype=str),
+            np.array(alignment['character_start_times_seconds'], dtype=np.float32),
+            np.array(alignment['character_end_times_seconds'], dtype=np.float32),
+        )
+
+    def to_dict(self):
+        """Convert back to the ElevenLabs dict layout."""
+        return {
+            'characters': self.characters.tolist(),
+            'character_start_times_seconds': self.start_times.tolist(),
+            'character_end_times_seconds': self.end_times.tolist(),
+        }
+
+    @property
+    def text(self):
+        """The aligned text as one string."""
+        return ''.join(self.characters.tolist())
+
+    def __len__(self):
+        return len(self.characters)
+
+
+def save_alignment(path, alignment):
+    """
+    Save an alignment atomically as a structured .npy file.
+
+    Args:
+        path (str): Destination path, conventionally ending in _alignment.npy
+        alignment (Alignment or dict): Alignment, or the ElevenLabs alignment dict
+    """
+    if isinstance(alignment, dict):
+        alignment = Alignment.from_dict(alignment)
+
+    char_width = max(1, max((len(c) for c in alignment.characters.tolist()), default=1))
+    records = np.empty(len(alignment), dtype=[('char', f'<U{char_width}'), ('start', '<f4'), ('end', '<f4')])
+    records['char'] = alignment.characters
+    records['start'] = alignment.start_times
+    records['end'] = alignment.end_times
+
+    buffer = io.BytesIO()
+    np.save(buffer, records, allow_pickle=False)
+    atomic_write(path, buffer.getvalue())
+
+
+def load_alignment(path, mmap=False):
+    """
+    Load an alignment saved by save_alignment.
+
+    Args:
+        path (str): Path of the .npy file
+        mmap (bool): Memory-map the file instead of reading it into memory
+
+    Returns:
+        Alignment: Alignment whose arrays are views into the stored records
+    """
+    records = np.load(path, mmap_mode='r' if mmap else None, allow_pickle=False)
+    return Alignment(records['char'], records['start'], records['end'])
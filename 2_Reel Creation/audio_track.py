@@ -0,0 +1,180 @@
+"""
+Narration audio helpers that avoid extra ffmpeg work.
+
+mp3_duration reads the duration from the MP3 frame headers (or the Xing/Info header of VBR files) in
+pure Python, so the narration length is known without spawning ffmpeg. padded_narration_track decodes
+the narration once, with the leading silence and trailing pad added by ffmpeg's adelay/apad filters,
+into a NumPy buffer that moviepy can encode directly. decode_pcm and encode_mp3 convert between audio
+files and PCM buffers, e.g. to stitch narration fragments together.
+"""
+
+import struct
+import subprocess
+
+import numpy as np
+
+# Bitrates in kbps by (MPEG-1?, layer)
+BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Sample rates by version bits: 0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1
+SAMPLE_RATES = {0: [11025, 12000, 8000], 2: [22050, 24000, 16000], 3: [44100, 48000, 32000]}
+
+
+def ffmpeg_binary():
+    """Get the ffmpeg executable moviepy is configured with, importing moviepy's config on first use."""
+    from moviepy.config import get_setting
+    return get_setting("FFMPEG_BINARY")
+
+
+def _parse_frame_header(header):
+    """
+    Decode a 4-byte MPEG audio frame header.
+
+    Returns:
+        tuple: (frame length in bytes, samples per frame, sample rate, MPEG-1?, mono?), or None if invalid
+    """
+    if header >> 21 != 0x7FF:
+        return None
+    version = (header >> 19) & 3
+    layer = 4 - ((header >> 17) & 3)
+    bitrate_index = (header >> 12) & 15
+    rate_index = (header >> 10) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (header >> 9) & 1
+    mono = ((header >> 6) & 3) == 3
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate, mpeg1, mono
+    samples = 1152 if (layer == 2 or mpeg1) else 576
+    return samples // 8 * bitrate // sample_rate + padding, samples, sample_rate, mpeg1, mono
+
+
+def mp3_duration(path):
+    """
+    Get the duration of an MP3 file from its frame headers.
+
+    Args:
+        path (str): Path of the MP3 file
+
+    Returns:
+        float: Duration in seconds, or None if no MPEG audio frames were found
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    # Skip an ID3v2 tag; its size is stored as a 28-bit synchsafe integer
+    offset = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9]
+        offset = 10 + size + (10 if data[5] & 0x10 else 0)
+
+    total_samples = 0
+    sample_rate = None
+    first_frame = True
+    while offset + 4 <= len(data):
+        frame = _parse_frame_header(struct.unpack_from(">I", data, offset)[0])
+        if frame is None:
+            # Lost sync, e.g. trailing tags or junk: resync on the next frame header
+            offset = data.find(b"\xff", offset + 1)
+            if offset < 0:
+                break
+            continue
+
+        length, samples, sample_rate, mpeg1, mono = frame
+        if first_frame:
+            first_frame = False
+            # A Xing/Info header in the first frame holds the frame count of the whole stream
+            side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+            tag_offset = offset + 4 + side_info
+            if data[tag_offset:tag_offset + 4] in (b"Xing", b"Info"):
+                flags = struct.unpack_from(">I", data, tag_offset + 4)[0]
+                if flags & 1:
+                    frame_count = struct.unpack_from(">I", data, tag_offset + 8)[0]
+                    return frame_count * samples / sample_rate
+                offset += length
+                continue
+
+        total_samples += samples
+        offset += length
+
+    if sample_rate is None:
+        return None
+    return total_samples / sample_rate
+
+
+def decode_pcm(audio_path, fps=44100, nchannels=2, filters=None):
+    """
+    Decode an audio file to 16-bit PCM with ffmpeg.
+
+    Args:
+        audio_path (str): Audio file
+        fps (int): Sample rate
+        nchannels (int): Number of channels
+        filters (str, optional): ffmpeg audio filter chain applied while decoding
+
+    Returns:
+        np.ndarray: int16 samples of shape (samples, nchannels)
+    """
+    cmd = [ffmpeg_binary(), "-loglevel", "error", "-i", audio_path]
+    if filters:
+        cmd += ["-af", filters]
+    cmd += ["-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(fps), "-ac", str(nchannels), "-"]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', errors='replace')}")
+    return np.frombuffer(result.stdout, dtype=np.int16).reshape(-1, nchannels)
+
+
+def encode_mp3(samples, fps=44100, bitrate="128k"):
+    """
+    Encode 16-bit PCM to a constant-bitrate MP3 with ffmpeg.
+
+    Args:
+        samples (np.ndarray): int16 samples of shape (samples, nchannels)
+        fps (int): Sample rate
+        bitrate (str): MP3 bitrate
+
+    Returns:
+        bytes: MP3 file contents
+    """
+    cmd = [ffmpeg_binary(), "-loglevel", "error", "-f", "s16le", "-ar", str(fps), "-ac", str(samples.shape[1]),
+           "-i", "-", "-c:a", "libmp3lame", "-b:a", bitrate, "-f", "mp3", "-"]
+    result = subprocess.run(cmd, input=np.ascontiguousarray(samples, dtype=np.int16).tobytes(),
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', errors='replace')}")
+    return result.stdout
+
+
+def padded_narration_track(audio_path, delay, duration, fps=44100, nchannels=2):
+    """
+    Decode the narration with leading silence and trailing padding in one ffmpeg pass.
+
+    Args:
+        audio_path (str): Narration audio file
+        delay (float): Silence before the narration starts, in seconds
+        duration (float): Length of the returned track, in seconds
+        fps (int): Sample rate
+        nchannels (int): Number of channels
+
+    Returns:
+        np.ndarray: Float samples in [-1, 1] of shape (round(duration * fps), nchannels)
+    """
+    delay_ms = int(round(delay * 1000))
+    total_samples = int(round(duration * fps))
+    filters = (f"aresample={fps},aformat=sample_fmts=s16:channel_layouts={'stereo' if nchannels == 2 else 'mono'},"
+               f"adelay={'|'.join([str(delay_ms)] * nchannels)},"
+               f"apad=whole_len={total_samples},atrim=end_sample={total_samples}")
+    samples = decode_pcm(audio_path, fps, nchannels, filters)
+    return samples.astype(np.float32) / 32768
@@ -0,0 +1,127 @@
+"""
+Background preparation with an on-disk cache.
+
+Backgrounds are often large camera images reused for many reels. Each one is decoded straight to
+roughly the target resolution (JPEG draft mode, or a fast reducing resample for other formats),
+then cropped ("cover") or letterboxed ("contain") to exactly the frame size in a single resample.
+The prepared frame is saved as an .npy file keyed by the source path, its modification time, the
+frame size and the fit mode, so later reels and other batch workers memory-map it instead of
+decoding the source again.
+"""
+
+import hashlib
+import io
+import json
+import math
+import os
+
+import numpy as np
+from PIL import Image
+
+import instrumentation
+from tts_cache import atomic_write
+
+FIT_MODES = ("cover", "contain")
+
+
+def background_cache_key(image_path, mtime, width, height, fit):
+    """
+    Build the cache key of a prepared background.
+
+    Args:
+        image_path (str): Path to the source image
+        mtime (float): Modification time of the source image
+        width (int): Frame width
+        height (int): Frame height
+        fit (str): "cover" or "contain"
+
+    Returns:
+        str: Hex digest
+    """
+    payload = json.dumps([os.path.abspath(image_path), mtime, width, height, fit])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def fit_background(image, width, height, fit="cover"):
+    """
+    Decode and fit an image to exactly width x height.
+
+    Args:
+        image (PIL.Image.Image): Opened, not yet loaded, source image
+        width (int): Frame width
+        height (int): Frame height
+        fit (str): "cover" fills the frame and crops the overflow evenly; "contain" fits the whole
+            image inside the frame and pads it with black
+
+    Returns:
+        PIL.Image.Image: RGB image of the frame size
+    """
+    if fit not in FIT_MODES:
+        raise ValueError(f"Unknown fit mode: {fit}")
+
+    source_width, source_height = image.size
+    scale_to = max if fit == "cover" else min
+    scale = scale_to(width / source_width, height / source_height)
+
+    # Let the JPEG decoder downscale by 1/2, 1/4 or 1/8 while keeping at least the needed resolution
+    if image.format == "JPEG" and scale < 1:
+        image.draft("RGB", (math.ceil(source_width * scale), math.ceil(source_height * scale)))
+    image = image.convert("RGB")
+
+    # The draft may have shrunk the image; box coordinates are in the decoded image's pixels
+    decoded_scale = image.size[0] / source_width
+    scale /= decoded_scale
+    decoded_width, decoded_height = image.size
+
+    if fit == "cover":
+        # Crop the centered region with the frame's aspect ratio and resample it in one step
+        box_width, box_height = width / scale, height / scale
+        left = (decoded_width - box_width) / 2
+        top = (decoded_height - box_height) / 2
+        return image.resize((width, height), Image.LANCZOS, box=(left, top, left + box_width, top + box_height),
+                            reducing_gap=3.0)
+
+    fitted_width = max(1, round(decoded_width * scale))
+    fitted_height = max(1, round(decoded_height * scale))
+    fitted = image.resize((fitted_width, fitted_height), Image.LANCZOS, reducing_gap=3.0)
+    frame = Image.new("RGB", (width, height), (0, 0, 0))
+    frame.paste(fitted, ((width - fitted_width) // 2, (height - fitted_height) // 2))
+    return frame
+
+
+def prepare_background(image_path, width=1080, height=1920, fit="cover", cache_dir=None):
+    """
+    Get a background frame of exactly the frame size, from the on-disk cache when possible.
+
+    Args:
+        image_path (str): Path to the source image
+        width (int): Frame width
+        height (int): Frame height
+        fit (str): "cover" or "contain"
+        cache_dir (str, optional): Directory of prepared backgrounds; None disables the disk cache
+
+    Returns:
+        np.ndarray: Read-only RGB frame of shape (height, width, 3)
+    """
+    mtime = os.path.getmtime(image_path)
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = os.path.join(cache_dir, background_cache_key(image_path, mtime, width, height, fit) + ".npy")
+        if os.path.exists(cache_path):
+            instrumentation.count("background_cache_hits")
+            return np.load(cache_path, mmap_mode="r")
+
+    instrumentation.count("background_cache_misses")
+    with Image.open(image_path) as image:
+        print(f"Original background size: {image.size}")
+        frame = np.asarray(fit_background(image, width, height, fit))
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        buffer = io.BytesIO()
+        np.save(buffer, frame, allow_pickle=False)
+        atomic_write(cache_path, buffer.getvalue())
+
+    # The frame is shared between reels, so guard it against accidental in-place edits
+    frame.flags.writeable = False
+    return frame
@@ -0,0 +1,164 @@
+"""
+Batch reel generation.
+
+Fans a list of reel specs out across a process pool. Each worker decodes backgrounds and logos once
+(see load_background and load_logo in content.py) and reuses them for every reel it renders.
+A failing job is reported in its result without affecting the other jobs.
+
+With --pipelined, reels are rendered one after another in a single process instead, with the
+narration, asset and layout stages of the next reel running while the current one encodes.
+
+Usage:
+    python batch.py reels.jsonl --workers 4
+    python batch.py reels.jsonl --pipelined
+"""
+
+import argparse
+import os
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import content
+from manifest import load_jobs
+from render_profiles import get_profile
+
+
+def _init_worker(background_paths, logo_paths):
+    # Warm the per-process asset caches before the first job arrives
+    for path in background_paths:
+        try:
+            content.load_background(path)
+        except Exception as e:
+            print(f"Could not preload background {path}: {str(e)}")
+    for path in logo_paths:
+        try:
+            content.load_logo(path)
+        except Exception as e:
+            print(f"Could not preload logo {path}: {str(e)}")
+
+
+def _needs_narration(job):
+    try:
+        return not get_profile(job.get("profile", "final")).thumbnail
+    except ValueError:
+        # An unknown profile fails in its own job
+        return False
+
+
+def _job_result(job, start_time, success, message):
+    return {
+        "title": job.get("title"),
+        "success": success,
+        "message": message,
+        "elapsed": time.time() - start_time,
+        "pid": os.getpid(),
+    }
+
+
+def _run_job(job):
+    start_time = time.time()
+    try:
+        success, message = content.create_reel(**job)
+    except Exception:
+        success, message = False, traceback.format_exc()
+    return _job_result(job, start_time, success, message)
+
+
+def create_reels_batch(jobs, workers=None, prefetch=True):
+    """
+    Create many reels in parallel.
+
+    Args:
+        jobs (list or str): Reel specs (create_reel keyword arguments), or a path to a JSONL/CSV manifest
+        workers (int, optional): Number of worker processes (default: CPU count)
+        prefetch (bool): Fetch all missing narrations concurrently before rendering starts (thumbnails need none)
+
+    Returns:
+        list: One result dict per job, in job order, with title, success, message, elapsed and pid
+    """
+    if isinstance(jobs, str):
+        jobs = load_jobs(jobs)
+    if not jobs:
+        return []
+
+    speech_texts = [job.get("speech_text") or job["display_text"] for job in jobs if _needs_narration(job)]
+    if prefetch and speech_texts:
+        fetched, failed = content.prefetch_narrations(speech_texts)
+        print(f"Prefetched {fetched} narrations ({failed} failed)")
+        # Forked workers would inherit the pooled keep-alive connections and share their sockets with this process
+        content.tts_client.close()
+
+    workers = workers or os.cpu_count() or 1
+    background_paths = sorted({job.get("background_image_path", "background.jpg") for job in jobs})
+    logo_paths = sorted({content.logo_path_for(job.get("text_color", "white")) for job in jobs})
+
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_worker,
+                             initargs=(background_paths, logo_paths)) as executor:
+        futures = {executor.submit(_run_job, job): idx for idx, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                results[idx] = future.result()
+            except Exception as e:
+                # The worker process itself died; only this job is marked as failed
+                results[idx] = {"title": jobs[idx].get("title"), "success": False,
+                                "message": f"Worker failed: {str(e)}", "elapsed": None, "pid": None}
+            status = "OK" if results[idx]["success"] else "FAILED"
+            print(f"[{status}] {results[idx]['title']}: {results[idx]['message']}")
+    return results
+
+
+def create_reels_pipelined(jobs, prep_workers=3, lookahead=1):
+    """
+    Create reels one at a time, preparing upcoming reels while the current one encodes.
+
+    Args:
+        jobs (list or str): Reel specs (create_reel keyword arguments), or a path to a JSONL/CSV manifest
+        prep_workers (int): Threads for the narration, asset and layout stages
+        lookahead (int): Number of reels prepared ahead of the one being encoded
+
+    Returns:
+        list: One result dict per job, in job order, with title, success, message, elapsed and pid
+    """
+    if isinstance(jobs, str):
+        jobs = load_jobs(jobs)
+
+    results = []
+    pending = deque()
+    upcoming = iter(jobs)
+    with ThreadPoolExecutor(max_workers=prep_workers) as executor:
+        def submit_next():
+            job = next(upcoming, None)
+            if job is not None:
+                pending.append((job, time.time(), content.submit_reel_stages(executor, **job)))
+
+        for _ in range(lookahead + 1):
+            submit_next()
+        while pending:
+            job, start_time, stages = pending.popleft()
+            # Start preparing the next reel before this one occupies the encoder
+            submit_next()
+            success, message = content.complete_reel(stages)
+            results.append(_job_result(job, start_time, success, message))
+            print(f"[{'OK' if success else 'FAILED'}] {job.get('title')}: {message}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create reels from a JSONL or CSV manifest")
+    parser.add_argument("manifest", help="Path to a .jsonl or .csv file of reel specs")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="Render in one process, preparing the next reel while the current one encodes")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    if args.pipelined:
+        results = create_reels_pipelined(args.manifest)
+    else:
+        results = create_reels_batch(args.manifest, workers=args.workers)
+    succeeded = sum(result["success"] for result in results)
+    print(f"{succeeded}/{len(results)} reels created in {time.time() - start_time:.2f} seconds")
@@ -0,0 +1,72 @@
+"""
+Micro-benchmark: the reel audio path before and after audio_track.py, for narrations of the lengths
+used by bench_reel.py.
+
+Legacy: the duration is probed with AudioFileClip, the narration is opened again, and a silent
+AudioClip is concatenated in front before moviepy writes the soundtrack.
+Current: the duration is read from the MP3 headers and the padded track is decoded once by ffmpeg
+into a NumPy buffer before moviepy writes it.
+
+Both write the soundtrack the way write_videofile does (AAC at 44.1 kHz).
+
+Usage:
+    python bench_audio.py [--words 10 50 200] [--repeats 3]
+"""
+
+import argparse
+import base64
+import os
+import tempfile
+
+from moviepy.audio.AudioClip import AudioArrayClip
+from moviepy.editor import AudioClip, AudioFileClip, concatenate_audioclips
+
+from audio_track import mp3_duration, padded_narration_track
+from bench_reel import FakeTTSClient
+from bench_word_timing import best_of, synthetic_narration
+
+OFFSET_TIME = 0.5
+
+
+def legacy_audio(audio_path, output_path):
+    audio = AudioFileClip(audio_path)
+    duration = audio.duration
+    audio.close()
+
+    audio = AudioFileClip(audio_path)
+    silent_audio = AudioClip(make_frame=lambda t: 0, duration=OFFSET_TIME)
+    audio = concatenate_audioclips([silent_audio, audio])
+    audio.write_audiofile(output_path, fps=44100, codec="aac", logger=None)
+    return duration
+
+
+def current_audio(audio_path, output_path):
+    duration = mp3_duration(audio_path)
+    track = padded_narration_track(audio_path, OFFSET_TIME, duration + 2 * OFFSET_TIME, fps=44100)
+    AudioArrayClip(track, fps=44100).write_audiofile(output_path, fps=44100, codec="aac", logger=None)
+    return duration
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the narration audio path")
+    parser.add_argument("--words", type=int, nargs="+", default=[10, 50, 200], help="Narration lengths in words")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per implementation (best is reported)")
+    args = parser.parse_args()
+
+    client = FakeTTSClient()
+    with tempfile.TemporaryDirectory(prefix="bench_audio_") as tmp_dir:
+        audio_path = os.path.join(tmp_dir, "narration.mp3")
+        output_path = os.path.join(tmp_dir, "soundtrack.m4a")
+        for word_count in args.words:
+            response = client.synthesize_sync(synthetic_narration(word_count)[0], None, None)
+            with open(audio_path, "wb") as f:
+                f.write(base64.b64decode(response["audio_base64"]))
+
+            legacy_time, legacy_duration = best_of(args.repeats, lambda: legacy_audio(audio_path, output_path))
+            current_time, current_duration = best_of(args.repeats, lambda: current_audio(audio_path, output_path))
+            probe_time, _ = best_of(args.repeats, lambda: mp3_duration(audio_path))
+
+            print(f"{word_count:>4} words ({current_duration:.1f}s audio): legacy {legacy_time * 1000:.0f} ms, "
+                  f"current {current_time * 1000:.0f} ms, saved {(legacy_time - current_time) * 1000:.0f} ms "
+                  f"({legacy_time / current_time:.1f}x); duration probe {probe_time * 1000:.2f} ms "
+                  f"(legacy reported {legacy_duration:.2f}s)")
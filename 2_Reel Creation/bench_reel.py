@@ -0,0 +1,237 @@
+"""
+Offline benchmark of the reel pipeline.
+
+Swaps the ElevenLabs client for a deterministic fake (silent MP3 plus an evenly timed alignment at a
+given speaking rate), then renders reels of several word counts stage by stage and records per-stage
+timings, peak RSS and encoding frames per second. Each case runs in a fresh process so peak memory
+and the asset caches are measured per case. No API key, network access or ImageMagick is needed.
+
+Results are appended to a JSONL file, one record per (word count, backend) case, so runs on the same
+machine can be compared over time.
+
+Usage:
+    python bench_reel.py [--words 10 50 200] [--backends moviepy segments filtergraph chunked] [--output bench_results.jsonl]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from bench_word_timing import synthetic_narration
+from tts_stub_server import fake_tts_response
+
+STAGES = ["narration", "assets", "layout", "timing", "encode"]
+FPS = 30
+
+
+class FakeTTSClient:
+    """
+    Stand-in for ElevenLabsClient that answers instantly with silent audio.
+
+    Attributes:
+        words_per_minute (float): Speaking rate of the fake narration
+        calls (int): Narrations synthesized
+    """
+
+    def __init__(self, words_per_minute=150):
+        self.words_per_minute = words_per_minute
+        self.calls = 0
+
+    def synthesize_sync(self, text, voice_id, voice_settings, model_id=None):
+        self.calls += 1
+        seconds = len(text.split()) * 60.0 / self.words_per_minute
+        return fake_tts_response(text, seconds_per_char=seconds / max(1, len(text)))
+
+    async def synthesize_many(self, texts, voice_id, voice_settings, model_id=None):
+        # Narrations with break tags are synthesized as fragments through this call
+        return [self.synthesize_sync(text, voice_id, voice_settings, model_id) for text in texts]
+
+
+def prepare_workspace(directory):
+    """
+    Create the background and logo files a reel needs, unless they already exist.
+
+    Args:
+        directory (str): Working directory of the benchmark
+
+    Returns:
+        str: Path of the background image, relative to directory
+    """
+    background_path = "background.jpg"
+    if not os.path.exists(os.path.join(directory, background_path)):
+        # Landscape noise so the background is both resized and cropped, as with a real photo
+        rng = np.random.default_rng(0)
+        pixels = rng.integers(0, 256, size=(1280, 1920, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(os.path.join(directory, background_path), quality=90)
+
+    for name, color in [("crackkar_logo_white.png", (255, 255, 255, 255)), ("crackkar_logo_black.png", (0, 0, 0, 255))]:
+        if not os.path.exists(os.path.join(directory, name)):
+            Image.new("RGBA", (400, 400), color).save(os.path.join(directory, name))
+    return background_path
+
+
+def peak_rss_mb():
+    """
+    Get the peak resident set size of this process and of its finished child processes (ffmpeg).
+
+    Returns:
+        tuple: (own peak MB, largest child peak MB), or (None, None) where unsupported
+    """
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return round(own, 1), round(children, 1)
+
+
+def run_case(workspace, word_count, backend, words_per_minute=150, verbose=False):
+    """
+    Render one synthetic reel stage by stage and measure it.
+
+    Args:
+        workspace (str): Working directory holding the background and logos
+        word_count (int): Number of words in the narration and caption
+        backend (str): create_reel backend ("moviepy", "segments", "filtergraph" or "chunked")
+        words_per_minute (float): Speaking rate of the fake narration
+        verbose (bool): Show the pipeline's own output
+
+    Returns:
+        dict: Benchmark record
+    """
+    os.chdir(workspace)
+    import content
+    from tts_cache import TTSCache
+
+    # A private cache directory keeps every case's narration stage cold
+    content.tts_client = FakeTTSClient(words_per_minute)
+    content.tts_cache = TTSCache(tempfile.mkdtemp(prefix="tts_cache_", dir=workspace), max_bytes=64 * 1024 * 1024)
+
+    speech_text = synthetic_narration(word_count)[0]
+    title = f"bench_{word_count}w_{backend}"
+    output_path = os.path.join("reels", "vids", f"{title}_reel.mp4")
+    offset_time = 0.5
+
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "words": word_count,
+        "backend": backend,
+        "words_per_minute": words_per_minute,
+        "stages": {},
+        "success": False,
+        "error": None,
+    }
+
+    def timed(stage, fn, *args):
+        start_time = time.perf_counter()
+        result = fn(*args)
+        record["stages"][stage] = round(time.perf_counter() - start_time, 4)
+        return result
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with output:
+            narration = timed("narration", content.prepare_narration, title, speech_text)
+            base_frame = timed("assets", content.prepare_assets, prepare_workspace(workspace), "white", "white")
+            reveal, position = timed("layout", content.prepare_layout,
+                                     content.clean_text_for_display(speech_text), 80, "white", "white", 0)
+            timeline = timed("timing", content.create_text_clips_from_alignment,
+                             narration["alignment_path"], narration["duration"], reveal, position, offset_time)
+            if timeline is None:
+                raise RuntimeError("Failed to create text animation")
+            timed("encode", content.encode_reel, base_frame, timeline, narration, output_path, offset_time, backend)
+
+        frames = int(math.ceil(timeline.duration * FPS - 1e-9))
+        record.update({
+            "success": True,
+            "video_seconds": round(timeline.duration, 3),
+            "frames": frames,
+            "fps": round(frames / record["stages"]["encode"], 1),
+        })
+    except Exception as e:
+        record["error"] = str(e)
+
+    record["total"] = round(sum(record["stages"].values()), 4)
+    record["peak_rss_mb"], record["peak_child_rss_mb"] = peak_rss_mb()
+    return record
+
+
+def run_benchmark(word_counts=(10, 50, 200), backends=("moviepy", "segments"), words_per_minute=150,
+                  output_path="bench_results.jsonl", workspace=None, in_process=False, verbose=False):
+    """
+    Run every (word count, backend) case and append the records to a results file.
+
+    Args:
+        word_counts (iterable): Narration lengths to render
+        backends (iterable): create_reel backends to compare
+        words_per_minute (float): Speaking rate of the fake narration
+        output_path (str): JSONL file the records are appended to
+        workspace (str, optional): Working directory for inputs and rendered reels (default: a temp dir)
+        in_process (bool): Run cases in this process instead of a fresh process each
+        verbose (bool): Show the pipeline's own output
+
+    Returns:
+        list: Benchmark records
+    """
+    output_path = os.path.abspath(output_path)
+    workspace = os.path.abspath(workspace or tempfile.mkdtemp(prefix="bench_reel_"))
+    os.makedirs(workspace, exist_ok=True)
+    prepare_workspace(workspace)
+    machine = {"platform": platform.platform(), "python": platform.python_version(), "cpu_count": os.cpu_count()}
+
+    records = []
+    for word_count in word_counts:
+        for backend in backends:
+            args = (workspace, word_count, backend, words_per_minute, verbose)
+            if in_process:
+                record = run_case(*args)
+            else:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    record = executor.submit(run_case, *args).result()
+            record.update(machine)
+            records.append(record)
+
+            with open(output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+            stage_times = " ".join(f"{stage}={record['stages'].get(stage, float('nan')):.2f}s" for stage in STAGES)
+            if record["success"]:
+                print(f"{word_count:>4} words {backend:<9} {stage_times} total={record['total']:.2f}s "
+                      f"fps={record['fps']} peak_rss={record['peak_rss_mb']}MB")
+            else:
+                print(f"{word_count:>4} words {backend:<9} FAILED: {record['error']}")
+
+    print(f"Results appended to {output_path}")
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the reel pipeline offline with a fake TTS backend")
+    parser.add_argument("--words", type=int, nargs="+", default=[10, 50, 200], help="Narration lengths in words")
+    parser.add_argument("--backends", nargs="+", default=["moviepy", "segments"], help="Backends to compare")
+    parser.add_argument("--wpm", type=float, default=150, help="Speaking rate of the fake narration")
+    parser.add_argument("--output", default="bench_results.jsonl", help="JSONL file to append results to")
+    parser.add_argument("--workspace", default=None, help="Working directory (default: a temp dir)")
+    parser.add_argument("--in-process", action="store_true", help="Run all cases in this process")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    args = parser.parse_args()
+
+    run_benchmark(args.words, args.backends, args.wpm, args.output, args.workspace, args.in_process, args.verbose)
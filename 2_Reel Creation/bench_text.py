@@ -0,0 +1,67 @@
+"""
+Micro-benchmark: rendering the reel's text layers with ImageMagick's TextClip versus text_render.py.
+
+The static footer texts (website, prompt, disclaimer) and a caption of each requested length are
+rendered with both engines. For text_render the cold time clears the font, metrics and raster caches
+before every run, which is what the first reel of a process pays; the warm time is a later reel reusing
+them. TextClip is skipped with a note when ImageMagick is not available.
+
+Usage:
+    python bench_text.py [--words 10 50 200] [--repeats 5]
+"""
+
+import argparse
+import re
+
+from moviepy.editor import TextClip
+
+import text_render
+from bench_word_timing import best_of, synthetic_narration
+
+STATIC_TEXTS = [("www.crackkar.com", 50), ("(Check caption for options)", 45), ("UPSC-CSE 2025 Prep.", 55)]
+
+
+def textclip_render(text, font_size):
+    clip = TextClip(text, fontsize=font_size, color='white', stroke_color='white', stroke_width=2,
+                    font="Arial-Bold", method='caption', size=(1080, None), align='center')
+    clip.close()
+
+
+def clear_text_caches():
+    text_render.render_text.cache_clear()
+    text_render.text_length.cache_clear()
+    text_render._load_font.cache_clear()
+
+
+def cold_render(text, font_size):
+    clear_text_caches()
+    text_render.render_text(text, font_size)
+
+
+def imagemagick_available():
+    try:
+        textclip_render("test", 50)
+        return True
+    except Exception:
+        print("TextClip unavailable (ImageMagick is not installed or IMAGEMAGICK_BINARY is not set), skipping it")
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark text rendering engines")
+    parser.add_argument("--words", type=int, nargs="+", default=[10, 50, 200], help="Caption lengths in words")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per engine (best is reported)")
+    args = parser.parse_args()
+
+    with_textclip = imagemagick_available()
+    cases = [(f"'{text}'", text, size) for text, size in STATIC_TEXTS]
+    cases += [(f"{n}-word caption", re.sub(r"<break[^>]*>", "", synthetic_narration(n)[0]), 80) for n in args.words]
+
+    for label, text, font_size in cases:
+        cold_time, _ = best_of(args.repeats, lambda: cold_render(text, font_size))
+        warm_time, _ = best_of(args.repeats, lambda: text_render.render_text(text, font_size))
+        line = f"{label:>32}: text_render cold {cold_time * 1000:.2f} ms, warm {warm_time * 1000:.3f} ms"
+        if with_textclip:
+            textclip_time, _ = best_of(args.repeats, lambda: textclip_render(text, font_size))
+            line += f", TextClip {textclip_time * 1000:.1f} ms ({textclip_time / cold_time:.1f}x cold)"
+        print(line)
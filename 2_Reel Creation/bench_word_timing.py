@@ -0,0 +1,166 @@
+"""
+Micro-benchmark: vectorized word timing (word_timing.py) against the original per-character loop
+from create_text_clips_from_alignment, on a synthetic 2,000-word narration with break tags.
+
+Usage:
+    python bench_word_timing.py [--words 2000] [--repeats 5]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import numpy as np
+
+from alignment_store import Alignment
+from content import clean_text_for_display
+from word_timing import alignment_word_timings, word_timings
+
+
+def legacy_word_timings(chars, start_times, end_times, display_words):
+    """The original word timing loop, kept verbatim (including its debug prints) for comparison."""
+    word_start_times = []
+    word_end_times = []
+
+    # Helper function to skip break tag characters
+    def skip_break_tag(index):
+        initial_index = index
+        while index < len(chars) and chars[index] == '<':
+            # Skip until we find '>'
+            while index < len(chars) and chars[index] != '>':
+                index += 1
+                if index - initial_index > 50:  # Safety check
+                    print(f"Warning: Break tag too long or missing closing tag at index {initial_index}")
+                    return initial_index
+            # Skip the '>' character
+            index += 1
+            # Skip any following spaces
+            while index < len(chars) and chars[index] == ' ':
+                index += 1
+        return index
+
+    # Map the alignment timing to cleaned text
+    current_char_index = 0
+
+    print("Starting word timing mapping...")
+    # For each word in display text
+    for word_idx, word in enumerate(display_words):
+        print(f"Processing word {word_idx + 1}/{len(display_words)}: '{word}'")
+
+        # Skip any spaces and break tags before the word
+        while current_char_index < len(chars) and (chars[current_char_index] == ' ' or chars[current_char_index] == '<'):
+            old_index = current_char_index
+            current_char_index = skip_break_tag(current_char_index)
+            if current_char_index == old_index:  # If no progress was made
+                current_char_index += 1  # Force progress
+
+        if current_char_index < len(chars):
+            print(f"  Word starts at char index {current_char_index} ('{chars[current_char_index]}')")
+            # Store start time of first character of word
+            word_start_times.append(start_times[current_char_index])
+
+            # Find corresponding word in original text
+            word_length = len(word)
+            end_char_index = current_char_index
+            chars_matched = 0
+
+            # Match characters until we find all characters of the word
+            safety_counter = 0
+            while end_char_index < len(chars) and chars_matched < word_length:
+                safety_counter += 1
+                if safety_counter > 100:  # Safety check
+                    print(f"Warning: Possible infinite loop while matching word '{word}'")
+                    break
+
+                if chars[end_char_index] != '<':  # Skip break tags
+                    chars_matched += 1
+                else:
+                    # Skip the entire break tag
+                    old_index = end_char_index
+                    end_char_index = skip_break_tag(end_char_index)
+                    if end_char_index == old_index:  # If no progress was made
+                        end_char_index += 1  # Force progress
+                    continue
+                end_char_index += 1
+
+            # Adjust end_char_index to point to last character of word
+            end_char_index = min(end_char_index - 1, len(end_times) - 1)
+            word_end_times.append(end_times[end_char_index])
+            print(f"  Word ends at char index {end_char_index} ('{chars[end_char_index]}')")
+
+            # Move current_char_index to after this word
+            current_char_index = end_char_index + 1
+
+
+    return word_start_times, word_end_times
+
+
+def synthetic_narration(word_count, seed=0):
+    """
+    Build speech text with a break tag every 50 words, plus an evenly timed character alignment.
+
+    Returns:
+        tuple: (speech_text, characters, start_times, end_times)
+    """
+    rng = random.Random(seed)
+    words = []
+    for i in range(word_count):
+        words.append(''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(1, 12))))
+        if i % 50 == 49:
+            words[-1] += "<break time='1.0s'>"
+    speech_text = ' '.join(words)
+    chars = list(speech_text)
+    start_times = [i * 0.05 for i in range(len(chars))]
+    end_times = [t + 0.05 for t in start_times]
+    return speech_text, chars, start_times, end_times
+
+
+def best_of(repeats, fn):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark word timing mapping")
+    parser.add_argument("--words", type=int, default=2000, help="Number of words in the narration")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per implementation (best is reported)")
+    args = parser.parse_args()
+
+    speech_text, chars, start_times, end_times = synthetic_narration(args.words)
+    display_words = clean_text_for_display(speech_text).split()
+
+    def run_legacy():
+        # The legacy loop prints several lines per word; discard them so only the mapping is timed
+        with contextlib.redirect_stdout(io.StringIO()):
+            return legacy_word_timings(chars, start_times, end_times, display_words)
+
+    def run_vectorized():
+        return word_timings(chars, start_times, end_times, display_words)
+
+    # create_reel loads the alignment as NumPy arrays (alignment_store.py), so time that input too
+    alignment = Alignment.from_dict({
+        'characters': chars,
+        'character_start_times_seconds': start_times,
+        'character_end_times_seconds': end_times,
+    })
+
+    def run_vectorized_arrays():
+        return alignment_word_timings(alignment, display_words)
+
+    legacy_time, (legacy_starts, legacy_ends) = best_of(args.repeats, run_legacy)
+    vector_time, (vector_starts, vector_ends) = best_of(args.repeats, run_vectorized)
+    arrays_time, _ = best_of(args.repeats, run_vectorized_arrays)
+
+    # The legacy loop stores float64 lists; the alignment store keeps float32, hence the tolerance
+    same = np.allclose(legacy_starts, vector_starts) and np.allclose(legacy_ends, vector_ends)
+    print(f"Words: {len(display_words)}, characters: {len(chars)}")
+    print(f"Legacy loop:               {legacy_time * 1000:.2f} ms")
+    print(f"Vectorized (Python lists): {vector_time * 1000:.2f} ms ({legacy_time / vector_time:.1f}x faster)")
+    print(f"Vectorized (NumPy arrays): {arrays_time * 1000:.2f} ms ({legacy_time / arrays_time:.1f}x faster)")
+    print(f"Same timings: {same}")
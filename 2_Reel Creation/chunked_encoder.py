@@ -0,0 +1,129 @@
+"""
+Parallel chunked encoder for reels.
+
+A single moviepy pipeline composites and pipes every frame from one Python process, which leaves most
+cores idle on large machines. This encoder splits the timeline into chunks at caption state changes,
+where the picture changes anyway, and renders each chunk in its own process with moviepy's ffmpeg
+writer and the same codec settings as the single-pass encode. The chunks are then joined with a
+stream-copy concat, and the delayed narration is encoded once over the joined video, so there is one
+audio track and no per-chunk audio edges to drift.
+"""
+
+import bisect
+import itertools
+import multiprocessing
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from audio_track import ffmpeg_binary
+from segment_encoder import frame_aligned_segments
+
+# Chunks shorter than this cost more in process startup than they save in encoding
+MIN_CHUNK_SECONDS = 2.0
+
+
+def chunk_ranges(timeline, fps, chunks):
+    """
+    Split the video's frames into about equal chunks, cutting only where the caption changes.
+
+    Args:
+        timeline (RevealTimeline): Caption reveal timeline
+        fps (int): Output frame rate
+        chunks (int): Wanted number of chunks
+
+    Returns:
+        list: (first frame, end frame) of each chunk, end exclusive, covering the whole video
+    """
+    segment_frames = [frames for _, frames in frame_aligned_segments(timeline, fps)]
+    total_frames = sum(segment_frames)
+    # Frames on which a new caption state starts
+    cut_points = list(itertools.accumulate(segment_frames))[:-1]
+
+    cuts = []
+    for k in range(1, chunks):
+        target = total_frames * k / chunks
+        i = bisect.bisect_left(cut_points, target)
+        candidates = cut_points[max(i - 1, 0):i + 1]
+        if not candidates:
+            break
+        cut = min(candidates, key=lambda c: abs(c - target))
+        if not cuts or cut > cuts[-1]:
+            cuts.append(cut)
+
+    bounds = [0] + cuts + [total_frames]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _encode_chunk(compositor, start_frame, end_frame, path, fps, codec, preset, threads):
+    # Runs in a worker process; frames are sampled at i / fps exactly as write_videofile does
+    from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+    height, width = compositor.base_frame.shape[:2]
+    writer = FFMPEG_VideoWriter(path, (width, height), fps, codec=codec, preset=preset, threads=threads)
+    try:
+        for i in range(start_frame, end_frame):
+            writer.write_frame(compositor.make_frame(i / fps))
+    finally:
+        writer.close()
+    return end_frame - start_frame
+
+
+def encode_chunked(compositor, output_path, audio_path=None, audio_delay=0.0, fps=30, codec="libx264",
+                   audio_codec="aac", preset="medium", threads=None, chunks=None):
+    """
+    Encode a reel as chunks in parallel processes, then join them and mux the narration once.
+
+    Args:
+        compositor (FrameCompositor): Produces the frame for each caption state
+        output_path (str): Path of the output MP4
+        audio_path (str, optional): Narration audio to mux in
+        audio_delay (float): Silence before the narration starts, in seconds
+        fps (int): Output frame rate
+        codec (str): Video codec
+        audio_codec (str): Audio codec
+        preset (str): x264 preset
+        threads (int, optional): Total CPU budget, split between the chunk processes (default: CPU count)
+        chunks (int, optional): Number of chunks (default: one per thread, at least MIN_CHUNK_SECONDS long)
+
+    Returns:
+        int: Number of chunks encoded
+    """
+    threads = threads or os.cpu_count() or 1
+    total_frames = sum(frames for _, frames in frame_aligned_segments(compositor.timeline, fps))
+    if chunks is None:
+        chunks = min(threads, int(total_frames // (MIN_CHUNK_SECONDS * fps)))
+    ranges = chunk_ranges(compositor.timeline, fps, max(1, chunks))
+    chunk_threads = max(1, threads // len(ranges))
+
+    with tempfile.TemporaryDirectory(prefix="reel_chunks_") as tmp_dir:
+        paths = [os.path.join(tmp_dir, f"chunk_{i:03d}.mp4") for i in range(len(ranges))]
+        args = [(compositor, start, end, path, fps, codec, preset, chunk_threads)
+                for (start, end), path in zip(ranges, paths)]
+        if len(ranges) == 1:
+            _encode_chunk(*args[0])
+        else:
+            # spawn keeps the workers independent of the threads of the calling process
+            with ProcessPoolExecutor(max_workers=len(ranges), mp_context=multiprocessing.get_context("spawn")) as pool:
+                for future in [pool.submit(_encode_chunk, *chunk_args) for chunk_args in args]:
+                    future.result()
+
+        concat_path = os.path.join(tmp_dir, "chunks.txt")
+        with open(concat_path, "w") as f:
+            f.write("ffconcat version 1.0\n" + "".join(f"file '{path}'\n" for path in paths))
+
+        cmd = [ffmpeg_binary(), "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", concat_path]
+        maps = ["-map", "0:v"]
+        if audio_path is not None:
+            delay_ms = int(round(audio_delay * 1000))
+            cmd += ["-i", audio_path, "-filter_complex", f"[1:a]adelay={delay_ms}|{delay_ms},apad[a]"]
+            # Stereo at 44.1 kHz, like the soundtrack write_videofile produces
+            maps += ["-map", "[a]", "-c:a", audio_codec, "-ac", "2", "-ar", "44100"]
+        cmd += maps + ["-c:v", "copy", "-frames:v", str(total_frames), "-t", f"{total_frames / fps:.6f}", output_path]
+
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', errors='replace')}")
+
+    return len(ranges)
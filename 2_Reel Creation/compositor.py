@@ -0,0 +1,107 @@
+"""
+Frame compositing for reels.
+
+Everything except the word-by-word caption is static for the whole video, so the static layers are
+flattened into one base frame up front. Reel frames then only change when the caption reveals a new
+word, and the last composited frame is reused until that happens.
+"""
+
+import numpy as np
+
+import instrumentation
+
+
+def flatten_static_layers(clips, size):
+    """
+    Composite static clips into a single frame.
+
+    Args:
+        clips (list): Positioned moviepy clips whose content does not change over time
+        size (tuple): (width, height) of the frame
+
+    Returns:
+        np.ndarray: RGB frame of shape (height, width, 3)
+    """
+    # moviepy is imported on first use so that importing this module stays fast
+    from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
+
+    frame = CompositeVideoClip(clips, size=size).get_frame(0)
+    return frame.astype(np.uint8)
+
+
+def blend(base, rgb, alpha, position):
+    """
+    Alpha-blend an image onto a copy of base, clipping it to the frame.
+
+    Args:
+        base (np.ndarray): RGB frame
+        rgb (np.ndarray): RGB image to overlay
+        alpha (np.ndarray): Opacity of the overlay in [0, 1]
+        position (tuple): (x, y) of the overlay's top-left corner on the frame
+
+    Returns:
+        np.ndarray: New RGB frame
+    """
+    frame = base.copy()
+    x, y = int(position[0]), int(position[1])
+    h, w = alpha.shape
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, base.shape[1]), min(y + h, base.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return frame
+
+    a = alpha[y0 - y:y1 - y, x0 - x:x1 - x, None]
+    src = rgb[y0 - y:y1 - y, x0 - x:x1 - x]
+    dst = frame[y0:y1, x0:x1]
+    frame[y0:y1, x0:x1] = (a * src + (1 - a) * dst).astype(np.uint8)
+    return frame
+
+
+class FrameCompositor:
+    """
+    Produces reel frames from a flattened static base frame and a caption reveal timeline.
+
+    Frames are cached per reveal state, so consecutive frames showing the same words are returned
+    without any compositing work.
+    """
+
+    def __init__(self, base_frame, timeline):
+        self.base_frame = base_frame
+        self.timeline = timeline
+        self._cached_count = None
+        self._cached_frame = None
+
+    def frame_for_count(self, count):
+        """
+        Get the frame with the first count caption words visible.
+
+        Args:
+            count (int): Number of visible words
+
+        Returns:
+            np.ndarray: RGB frame
+        """
+        if count != self._cached_count:
+            instrumentation.count("caption_frames_composited")
+            if count == 0:
+                frame = self.base_frame
+            else:
+                reveal = self.timeline.reveal
+                frame = blend(self.base_frame, reveal.rgb, reveal.mask(count), self.timeline.position)
+            self._cached_count = count
+            self._cached_frame = frame
+        return self._cached_frame
+
+    def make_frame(self, t):
+        return self.frame_for_count(self.timeline.count_at(t))
+
+    def clip(self):
+        """
+        Get the reel as a moviepy clip, without audio.
+
+        Returns:
+            VideoClip: Clip lasting the timeline's duration
+        """
+        from moviepy.video.VideoClip import VideoClip
+
+        return VideoClip(self.make_frame).set_duration(self.timeline.duration)
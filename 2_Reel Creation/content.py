@@ -1,23 +1,70 @@
 import os
-import requests
-import json
 import base64
-from moviepy.editor import VideoFileClip, TextClip, ImageClip, CompositeVideoClip, AudioFileClip, ColorClip, AudioClip, concatenate_audioclips
 from dotenv import load_dotenv
-from moviepy.config import change_settings
-import matplotlib.image as mpimg
 import numpy as np
 import datetime
+import time
 import re
-
-# Update this path to where ImageMagick is installed on your system
-IMAGEMAGICK_BINARY = r"C:\Program Files\ImageMagick-7.1.1-Q16-HDRI\magick.exe"
-change_settings({"IMAGEMAGICK_BINARY": IMAGEMAGICK_BINARY})
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from PIL import Image
+from audio_track import mp3_duration, padded_narration_track
+from background_cache import prepare_background
+from render_profiles import FrameGeometry, get_profile
+from text_render import load_font, render_text, wrap_words
+from word_reveal import CaptionLayout, RevealTimeline, WordReveal
+from chunked_encoder import encode_chunked
+from compositor import FrameCompositor, blend, flatten_static_layers
+from filtergraph_encoder import encode_filtergraph
+from segment_encoder import encode_segments
+from tts_cache import TTSCache, tts_cache_key
+from tts_client import ElevenLabsClient
+from alignment_store import load_alignment, save_alignment
+from narration_assembler import BREAK_PATTERN, assemble_narration, fragment_texts, split_fragments
+from word_timing import alignment_word_timings
+from instrumentation import configure_from_env, count, instrumentation, span
 
 load_dotenv()
+
 # ElevenLabs API Key
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_KEY")
 VOICE_ID = "EGQM7bHbTHTb7VUEcOHG"  # Using voice ID from tts.py
+TTS_MODEL_ID = None  # None uses the ElevenLabs default model
+VOICE_SETTINGS = {
+    "stability": 0.4,
+    "similarity_boost": 0.5
+}
+
+# Pooled, retrying ElevenLabs client; ELEVENLABS_BASE_URL can point it at a local stub server
+tts_client = ElevenLabsClient(
+    ELEVENLABS_API_KEY,
+    base_url=os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io"),
+    max_concurrency=int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+)
+
+# Narration cache shared across reel titles, evicting least recently used entries past the budget
+TTS_CACHE_DIR = os.path.join("reels", "tts_cache")
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "512"))
+tts_cache = TTSCache(TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_MB * 1024 * 1024)
+
+# Narrations with break tags are stitched from separately cached fragments; TTS_FRAGMENTS=0 synthesizes them whole
+TTS_FRAGMENTS = os.getenv("TTS_FRAGMENTS", "1") != "0"
+
+# Per-format layout in layout pixels: how far the caption prompt and disclaimer sit above the website URL,
+# and whether the caption is centered in the whole frame or in the space above those footer lines
+FORMAT_LAYOUTS = {
+    "9:16": {"prompt_offset": 200, "disclaimer_offset": 300, "caption_above_footer": False},
+    "1:1": {"prompt_offset": 75, "disclaimer_offset": 150, "caption_above_footer": True},
+    "16:9": {"prompt_offset": 75, "disclaimer_offset": 150, "caption_above_footer": True},
+}
+WEBSITE_MARGIN = 140  # Website URL top, measured from the bottom of the frame
+
+# Backgrounds decoded and fitted to the frame size, shared across reels and batch workers
+BACKGROUND_CACHE_DIR = os.path.join("reels", "background_cache")
+
+# Stage spans and counters go nowhere unless REEL_METRICS_FILE / REEL_METRICS_LOG / REEL_PROFILE are set
+configure_from_env()
 
 def clean_text_for_display(text):
     # Remove break tags from text for display purposes
@@ -55,472 +102,677 @@ def insert_break_at_middle(text, break_time=1.0):
     return f"{text[:insert_pos]}<break time='{break_time}s'>{text[insert_pos:]}"
 
 
-def create_reel(title, display_text, speech_text=None, background_image_path="background.jpg",
-               font_size=80, text_color='white', stroke_color='white', offset_time=0.5, y_offset=0):
+def uses_fragments(text):
+    """Whether a narration is assembled from fragments split at its break tags."""
+    return TTS_FRAGMENTS and BREAK_PATTERN.search(text) is not None
+
+
+async def _prefetch_narrations(speech_texts):
+    # Only probed here; the hits and misses are counted when create_reel is served the narrations
+    missing = []
+    for speech_text in dict.fromkeys(speech_texts):
+        if tts_cache.contains(tts_cache_key(speech_text, VOICE_ID, VOICE_SETTINGS, TTS_MODEL_ID)):
+            continue
+        for text in (fragment_texts(speech_text) if uses_fragments(speech_text) else [speech_text]):
+            if text not in missing and not tts_cache.contains(tts_cache_key(text, VOICE_ID, VOICE_SETTINGS, TTS_MODEL_ID)):
+                missing.append(text)
+
+    results = await tts_client.synthesize_many(missing, VOICE_ID, VOICE_SETTINGS, TTS_MODEL_ID)
+    fetched = 0
+    for text, result in zip(missing, results):
+        if isinstance(result, Exception):
+            print(f"Error prefetching narration '{text[:40]}': {str(result)}")
+            continue
+        key = tts_cache_key(text, VOICE_ID, VOICE_SETTINGS, TTS_MODEL_ID)
+        tts_cache.put(key, base64.b64decode(result["audio_base64"]), result["alignment"])
+        fetched += 1
+    return fetched, len(missing) - fetched
+
+
+def prefetch_narrations(speech_texts):
     """
-    Create an Instagram-style reel with text-to-speech narration
-    
+    Fetch every narration missing from the TTS cache concurrently, before any rendering starts.
+
+    create_reel then finds each narration in the cache instead of waiting on the API. Narrations with
+    break tags are prefetched as their fragments, so shared phrases are fetched once.
+
     Args:
-        title (str): Title of the reel (used for output filenames)
-        display_text (str): Text to display in the reel
-        speech_text (str, optional): Text to use for text-to-speech narration. If None, display_text will be used.
-        background_image_path (str): Path to background image
-        text_color (str): Color of the text (default: 'white')
-        stroke_color (str): Color of the text stroke/outline (default: 'white')
-        offset_time (float): Silent time at start and end of video (default: 0.5)
-        y_offset (int): Vertical offset from center in pixels. Positive moves down, negative moves up (default: 0)
-        
+        speech_texts (list): Speech texts of the reels to be rendered
+
     Returns:
-        tuple: (success (bool), message (str))
+        tuple: (number fetched, number failed)
     """
-    # Create reels directory if it doesn't exist
-    reels_dir = "reels"
-    os.makedirs(reels_dir, exist_ok=True)
-    
-    # Setup output paths
-    output_audio_path = os.path.join(reels_dir,"vids", f"{title}_audio.mp3")
-    output_video_path = os.path.join(reels_dir,"vids", f"{title}_reel.mp4")
-    
-    # If speech_text is not provided, use display_text
-    if speech_text is None:
-        speech_text = display_text
-    
-    # Clean display text for visual display
-    display_text = clean_text_for_display(display_text)
-    
-    # Generate TTS using ElevenLabs
-    def generate_tts(text, output_path):
-        # Check if audio file already exists
-        if os.path.exists(output_path):
-            print(f"Using existing audio file: {output_path}")
+    return asyncio.run(_prefetch_narrations(speech_texts))
+
+
+@lru_cache(maxsize=16)
+def _load_background(image_path, mtime, width, height, fit):
+    # mtime is only part of the cache key, so an edited image is prepared again
+    return prepare_background(image_path, width, height, fit, cache_dir=BACKGROUND_CACHE_DIR)
+
+
+def load_background(image_path, width=1080, height=1920, fit="cover"):
+    """
+    Get a background image decoded and fitted to exactly the frame size.
+
+    Prepared frames are cached on disk (see background_cache.py), so a background is decoded once for
+    all reels and batch workers, and per process, keyed by path and modification time.
+
+    Args:
+        image_path (str): Path to background image
+        width (int): Frame width
+        height (int): Frame height
+        fit (str): "cover" to fill the frame and crop the overflow, "contain" to letterbox on black
+
+    Returns:
+        np.ndarray: Read-only RGB frame of shape (height, width, 3)
+    """
+    return _load_background(image_path, os.path.getmtime(image_path), width, height, fit)
+
+
+def logo_path_for(text_color):
+    """Pick the logo variant that matches the text color."""
+    return "crackkar_logo_white.png" if text_color.lower() == 'white' else "crackkar_logo_black.png"
+
+
+@lru_cache(maxsize=4)
+def load_logo(logo_path, size=(200, 200)):
+    """
+    Load the brand logo as an RGBA frame resized to size, cached per process.
+
+    Args:
+        logo_path (str): Path to logo image
+        size (tuple): (width, height) of the logo
+
+    Returns:
+        np.ndarray: RGBA frame
+    """
+    frame = np.array(Image.open(logo_path).convert("RGBA").resize(size, Image.LANCZOS))
+    frame.flags.writeable = False
+    return frame
+
+
+class ReelError(Exception):
+    """Raised by a reel stage; the message is what create_reel reports."""
+
+
+def fetch_fragments(texts):
+    """
+    Get the audio and alignment of narration fragments, synthesizing the uncached ones concurrently.
+
+    Args:
+        texts (list): Distinct fragment texts
+
+    Returns:
+        tuple: (dict of fragment text -> (MP3 bytes, alignment dict), number of fragments synthesized)
+    """
+    fragment_audio = {}
+    missing = []
+    for text in texts:
+        cached = tts_cache.get(tts_cache_key(text, VOICE_ID, VOICE_SETTINGS, TTS_MODEL_ID), text)
+        if cached is None:
+            missing.append(text)
+        else:
+            fragment_audio[text] = cached
+
+    if missing:
+        results = asyncio.run(tts_client.synthesize_many(missing, VOICE_ID, VOICE_SETTINGS, TTS_MODEL_ID))
+        for text, result in zip(missing, results):
+            if isinstance(result, Exception):
+                raise result
+            audio_bytes = base64.b64decode(result["audio_base64"])
+            tts_cache.put(tts_cache_key(text, VOICE_ID, VOICE_SETTINGS, TTS_MODEL_ID), audio_bytes, result["alignment"])
+            fragment_audio[text] = (audio_bytes, result["alignment"])
+    return fragment_audio, len(missing)
+
+
+# Generate TTS using ElevenLabs
+def generate_tts(text, output_path):
+    alignment_path = output_path.replace(".mp3", "_alignment.npy")
+    cache_key = tts_cache_key(text, VOICE_ID, VOICE_SETTINGS, TTS_MODEL_ID)
+
+    def save_outputs(audio_bytes, alignment):
+        # Save audio file
+        with open(output_path, "wb") as f:
+            f.write(audio_bytes)
+        # Save alignment data for the word-by-word animation
+        save_alignment(alignment_path, alignment)
+
+    with span("tts", characters=len(text)) as tts_span:
+        # Reuse narration generated earlier for the same text and voice, under any title. A fragmented
+        # narration missing from the cache is served from its fragments, so those are counted instead of it
+        fragmented = uses_fragments(text)
+        cached = tts_cache.get(cache_key, text) if not fragmented or tts_cache.contains(cache_key) else None
+        tts_span.set(cache_hit=cached is not None)
+        if cached is not None:
+            count("tts_cache_hits")
+            print(f"Using cached TTS audio: {cache_key[:12]} (cache stats: {tts_cache.stats()})")
+            save_outputs(*cached)
             return True
 
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}/with-timestamps"
-        headers = {
-            "Accept": "audio/mpeg",
-            "xi-api-key": ELEVENLABS_API_KEY,
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "text": text,
-            "voice_settings": {
-                "stability": 0.4,
-                "similarity_boost": 0.5
-            }
-        }
-        
+        if not fragmented:
+            count("tts_cache_misses")
         try:
-            response = requests.post(url, json=payload, headers=headers)
-            if response.status_code == 200:
-                # Parse response and get base64 audio
-                json_string = response.content.decode("utf-8")
-                response_dict = json.loads(json_string)
-                audio_bytes = base64.b64decode(response_dict["audio_base64"])
-                
-                # Save audio file
-                with open(output_path, "wb") as f:
-                    f.write(audio_bytes)
-                print("TTS audio saved successfully.")
-                
-                # Save alignment data for potential future use
-                alignment_path = output_path.replace(".mp3", "_alignment.txt")
-                with open(alignment_path, "w") as f:
-                    f.write(str(response_dict["alignment"]))
-                return True
+            if fragmented:
+                # Only fragments missing from the cache are synthesized; breaks become silence
+                fragment_audio, synthesized = fetch_fragments(fragment_texts(text))
+                audio_bytes, alignment = assemble_narration(split_fragments(text), fragment_audio)
+                tts_span.set(fragments=len(fragment_audio), fragments_synthesized=synthesized)
+                count("tts_cache_hits", len(fragment_audio) - synthesized)
+                count("tts_cache_misses", synthesized)
+                count("tts_fragments_synthesized", synthesized)
+                print(f"Stitched narration from {len(fragment_audio)} fragments ({synthesized} synthesized)")
             else:
-                print(f"Error: {response.status_code}", response.json())
-                return False
+                response_dict = tts_client.synthesize_sync(text, VOICE_ID, VOICE_SETTINGS, TTS_MODEL_ID)
+                audio_bytes = base64.b64decode(response_dict["audio_base64"])
+                alignment = response_dict["alignment"]
+
+            tts_cache.put(cache_key, audio_bytes, alignment)
+            save_outputs(audio_bytes, alignment)
+            print(f"TTS audio saved successfully. (cache stats: {tts_cache.stats()})")
+            return True
         except Exception as e:
+            tts_span.set(error=str(e))
             print(f"Error generating TTS: {str(e)}")
             return False
 
-    # Get Duration of Audio File
-    def get_audio_duration(audio_path):
-        try:
-            audio = AudioFileClip(audio_path)
-            duration = audio.duration
-            audio.close()
-            return duration
-        except Exception as e:
-            print(f"Error getting audio duration: {str(e)}")
-            return None
 
-    # Create Animated Text Clip
-    def create_text_clip(text, duration, fps=30):
-        try:
-            # Use display_text instead of original text
-            text_clip = TextClip(
-                text,
-                fontsize=font_size,
-                color=text_color,
-                stroke_color=stroke_color,
-                stroke_width=2,
-                font="Arial-Bold",
-                method='caption',
-                size=(1080, None),  # Width of 1080, height automatic
-                align='center'
-            )
-            
-            # Calculate text positions
-            video_height = 1920
-            text_height = text_clip.h
-            y_position = (video_height - text_height) // 2 + y_offset  # Add y_offset to center position
-            
-            # Set the text position
-            text_clip = text_clip.set_position(('center', y_position))
-            
-            # Set duration
-            text_clip = text_clip.set_duration(duration)
-            
-            # Add fade effects
-            text_clip = text_clip.fadein(0.5).fadeout(0.5)
-            
-            return text_clip
-        except Exception as e:
-            print(f"Error creating text clip: {str(e)}")
-            return None
+# Get Duration of Audio File
+def get_audio_duration(audio_path, alignment_path=None):
+    """
+    Get the narration duration without decoding it.
 
-    def create_text_clips_from_alignment(alignment_path, duration):
-        try:
-            print("Starting text clip creation...")
-            # Read alignment data
-            with open(alignment_path, 'r') as f:
-                alignment = eval(f.read())
-            
-            # Extract character data
-            chars = alignment['characters']
-            start_times = alignment['character_start_times_seconds']
-            end_times = alignment['character_end_times_seconds']
-            
-            print(f"\nDebug - Audio duration: {duration}")
-            print(f"Debug - Total video duration: {duration + 2*offset_time}")
-            print(f"Debug - First char starts at: {start_times[0]}")
-            print(f"Debug - Last char ends at: {end_times[-1]}")
-            print(f"Debug - Total characters: {len(chars)}")
-            
-            # Get the cleaned display text
-            display_words = display_text.split()
-            print(f"Debug - Display words: {display_words}")
-            
-            # Initialize lists for word timings
-            word_start_times = []
-            word_end_times = []
-            
-            # Helper function to skip break tag characters
-            def skip_break_tag(index):
-                initial_index = index
-                while index < len(chars) and chars[index] == '<':
-                    # Skip until we find '>'
-                    while index < len(chars) and chars[index] != '>':
-                        index += 1
-                        if index - initial_index > 50:  # Safety check
-                            print(f"Warning: Break tag too long or missing closing tag at index {initial_index}")
-                            return initial_index
-                    # Skip the '>' character
-                    index += 1
-                    # Skip any following spaces
-                    while index < len(chars) and chars[index] == ' ':
-                        index += 1
-                return index
-            
-            # Map the alignment timing to cleaned text
-            current_char_index = 0
-            
-            print("Starting word timing mapping...")
-            # For each word in display text
-            for word_idx, word in enumerate(display_words):
-                print(f"Processing word {word_idx + 1}/{len(display_words)}: '{word}'")
-                
-                # Skip any spaces and break tags before the word
-                while current_char_index < len(chars) and (chars[current_char_index] == ' ' or chars[current_char_index] == '<'):
-                    old_index = current_char_index
-                    current_char_index = skip_break_tag(current_char_index)
-                    if current_char_index == old_index:  # If no progress was made
-                        current_char_index += 1  # Force progress
-                
-                if current_char_index < len(chars):
-                    print(f"  Word starts at char index {current_char_index} ('{chars[current_char_index]}')")
-                    # Store start time of first character of word
-                    word_start_times.append(start_times[current_char_index])
-                    
-                    # Find corresponding word in original text
-                    word_length = len(word)
-                    end_char_index = current_char_index
-                    chars_matched = 0
-                    
-                    # Match characters until we find all characters of the word
-                    safety_counter = 0
-                    while end_char_index < len(chars) and chars_matched < word_length:
-                        safety_counter += 1
-                        if safety_counter > 100:  # Safety check
-                            print(f"Warning: Possible infinite loop while matching word '{word}'")
-                            break
-                            
-                        if chars[end_char_index] != '<':  # Skip break tags
-                            chars_matched += 1
-                        else:
-                            # Skip the entire break tag
-                            old_index = end_char_index
-                            end_char_index = skip_break_tag(end_char_index)
-                            if end_char_index == old_index:  # If no progress was made
-                                end_char_index += 1  # Force progress
-                            continue
-                        end_char_index += 1
-                    
-                    # Adjust end_char_index to point to last character of word
-                    end_char_index = min(end_char_index - 1, len(end_times) - 1)
-                    word_end_times.append(end_times[end_char_index])
-                    print(f"  Word ends at char index {end_char_index} ('{chars[end_char_index]}')")
-                    
-                    # Move current_char_index to after this word
-                    current_char_index = end_char_index + 1
-            
-            print("Word timing mapping completed.")
-            print(f"Debug - Display Words: {display_words}")
-            print(f"Debug - Word start times: {word_start_times}")
-            print(f"Debug - Word end times: {word_end_times}")
-            
-            print("Creating text clips...")
-            # Create clips for each word
-            clips = []
-            for i in range(len(display_words)):
-                print(f"Creating clip for word: {display_words[i]}")
-                # Create text with all words up to current word
-                text = ' '.join(display_words[:i+1])
-                word_clip = TextClip(
-                    text,
-                    fontsize=font_size,
-                    color=text_color,
-                    stroke_color=stroke_color,
-                    stroke_width=2,
-                    font="Arial-Bold",
-                    method='caption',
-                    size=(1080, None),
-                    align='center'
-                )
-                
-                # Calculate text positions
-                video_height = 1920
-                text_height = word_clip.h
-                y_position = (video_height - text_height) // 2 + y_offset  # Add y_offset to center position
-                
-                # Set the text position
-                word_clip = word_clip.set_position(('center', y_position))
-                
-                # Set timing for this clip
-                start = word_start_times[i]
-                end = word_start_times[i+1] if i < len(display_words)-1 else word_end_times[i]
-                
-                word_clip = word_clip.set_start(start + offset_time)
-                word_clip = word_clip.set_duration(end - start)
-                
-                print(f"Clip {i} - Text: '{text}' - Start: {start + offset_time:.2f} - End: {end + offset_time:.2f}")
-                clips.append(word_clip)
-            
-            print("Creating final text clip...")
-            # Add a final clip with complete text that stays until the end
-            final_text = ' '.join(display_words)
-            final_clip = TextClip(
-                final_text,
-                fontsize=font_size,
-                color=text_color,
-                stroke_color=stroke_color,
-                stroke_width=2,
-                font="Arial-Bold",
-                method='caption',
-                size=(1080, None),
-                align='center'
-            )
-            
-            # Calculate text positions
-            video_height = 1920
-            text_height = final_clip.h
-            y_position = (video_height - text_height) // 2 + y_offset  # Add y_offset to center position
-            
-            # Set the text position
-            final_clip = final_clip.set_position(('center', y_position))
-            
-            # Calculate timings for final clip
-            total_duration = duration + 2*offset_time  # offset_time before + offset_time after
-            
-            # Start showing final text when last word ends
-            final_start = word_end_times[-1] + offset_time
-            # Show until the very end of video
-            final_duration = total_duration - final_start
-            
-            print("\n=== Final Clip Debug ===")
-            print(f"Total duration: {total_duration:.2f}s")
-            print(f"Last word ends at: {word_end_times[-1]:.2f}s")
-            print(f"Final clip starts at: {final_start:.2f}s")
-            print(f"Final clip duration: {final_duration:.2f}s")
-            print(f"Final clip ends at: {final_start + final_duration:.2f}s")
-            print("=======================\n")
-            
-            # Create the final clip that shows until the end
-            final_clip = final_clip.set_start(final_start)
-            final_clip = final_clip.set_duration(final_duration)
-            
-            # Add both the word clips and the final clip
-            all_clips = clips + [final_clip]
-            
-            return all_clips
-        except Exception as e:
-            print(f"Error creating word clips: {str(e)}")
-            return None
+    The MP3 frame headers are read directly; if they cannot be parsed, the last character end time
+    of the alignment is used, and only then is the file probed with ffmpeg.
 
+    Args:
+        audio_path (str): Narration audio file
+        alignment_path (str, optional): Stored alignment of the narration
+
+    Returns:
+        float: Duration in seconds, or None on error
+    """
     try:
-        # Generate TTS audio
-        if not generate_tts(speech_text, output_audio_path):
-            return False, "Failed to generate audio"
+        with span("duration_probe") as probe_span:
+            duration = mp3_duration(audio_path)
+            probe_span.set(method="mp3_header")
+            if duration is None and alignment_path is not None:
+                duration = float(load_alignment(alignment_path).end_times[-1])
+                probe_span.set(method="alignment")
+            if duration is None:
+                from moviepy.audio.io.AudioFileClip import AudioFileClip
+                audio = AudioFileClip(audio_path)
+                duration = audio.duration
+                audio.close()
+                probe_span.set(method="ffmpeg")
+        return duration
+    except Exception as e:
+        print(f"Error getting audio duration: {str(e)}")
+        return None
+
+
+def create_static_text_clip(text, fontsize, text_color, stroke_color, width=1080, stroke_width=2):
+    """Render static overlay text wrapped to the frame width, each line centered."""
+    from moviepy.video.VideoClip import ImageClip
+    return ImageClip(render_text(text, fontsize, text_color, stroke_color, width, stroke_width))
+
 
-        # Get audio duration
-        duration = get_audio_duration(output_audio_path)
-        if duration is None:
-            return False, "Failed to get audio duration"
+def prepare_narration(title, speech_text):
+    """
+    Narration stage: generate (or reuse) the TTS audio and alignment and probe the audio duration.
+
+    Args:
+        title (str): Title of the reel (used for output filenames)
+        speech_text (str): Text to narrate
+
+    Returns:
+        dict: audio_path, alignment_path and duration (seconds) of the narration
+    """
+    os.makedirs(os.path.join("reels", "vids"), exist_ok=True)
+    audio_path = os.path.join("reels", "vids", f"{title}_audio.mp3")
 
+    # Generate TTS audio
+    if not generate_tts(speech_text, audio_path):
+        raise ReelError("Failed to generate audio")
+
+    # Get audio duration
+    alignment_path = audio_path.replace(".mp3", "_alignment.npy")
+    duration = get_audio_duration(audio_path, alignment_path)
+    if duration is None:
+        raise ReelError("Failed to get audio duration")
+
+    return {
+        "audio_path": audio_path,
+        "alignment_path": alignment_path,
+        "duration": duration,
+    }
+
+
+def prepare_assets(background_image_path, text_color, stroke_color, background_fit="cover", profile="final",
+                   output_format="9:16"):
+    """
+    Assets stage: load the background and logo and flatten them with the static text overlays.
+
+    Args:
+        background_image_path (str): Path to background image
+        text_color (str): Color of the text
+        stroke_color (str): Color of the text stroke/outline
+        background_fit (str): "cover" or "contain", see load_background
+        profile (str or RenderProfile): Render profile whose scale is applied to all sizes and positions
+        output_format (str): Aspect ratio, a key of render_profiles.OUTPUT_FORMATS
+
+    Returns:
+        np.ndarray: RGB base frame holding every layer except the word-by-word caption
+    """
+    # moviepy is imported on first use so that importing this module stays fast
+    from moviepy.video.VideoClip import ImageClip
+
+    # Layout is specified for a 1080-pixel short side and scaled to the output frame
+    geometry = FrameGeometry(profile, output_format)
+    px = geometry.px
+    frame_width, frame_height = geometry.size
+    format_layout = FORMAT_LAYOUTS[output_format]
+
+    try:
         # Load background image
-        try:
-            print(f"Loading background image from: {background_image_path}")
-            background = ImageClip(background_image_path)
-            print(f"Original background size: {background.size}")
-            
-            # Calculate dimensions to fill 1080x1920 while maintaining aspect ratio
-            img_ratio = background.size[0] / background.size[1]
-            target_ratio = 1080 / 1920
-
-            if img_ratio > target_ratio:
-                # Image is wider than needed
-                new_height = 1920
-                new_width = int(new_height * img_ratio)
-            else:
-                # Image is taller than needed
-                new_width = 1080
-                new_height = int(new_width / img_ratio)
-
-            print(f"Resizing to: {new_width}x{new_height}")
-            background = background.resize((new_width, new_height))
-            print(f"After resize: {background.size}")
-            
-            # Create a black background of target size
-            black_bg = ColorClip(size=(1080, 1920), color=(0,0,0))
-            
-            # Center the image on black background
-            x_center = (1080 - new_width) // 2
-            y_center = (1920 - new_height) // 2
-            background = background.set_position((x_center, y_center))
-            
-            # Load audio and get durations
-            audio = AudioFileClip(output_audio_path)
-            audio_duration = audio.duration
-            total_duration = audio_duration + 2*offset_time  # offset_time before + offset_time after
-            
-            # Create silent audio for the offset
-            silent_audio = AudioClip(make_frame=lambda t: 0, duration=offset_time)
-            # Concatenate silent audio at the start
-            audio = concatenate_audioclips([silent_audio, audio])
-            
-            # Set durations for all clips
-            black_bg = black_bg.set_duration(total_duration)
-            background = background.set_duration(total_duration)
-            
-            # Create the background composite (black bg + image)
-            background_composite = CompositeVideoClip([black_bg, background])
-            background_composite = background_composite.set_duration(total_duration)
-            background_composite = background_composite.set_audio(audio)
-            
-            # Load and prepare company logo based on text color
-            logo_path = "crackkar_logo_white.png" if text_color.lower() == 'white' else "crackkar_logo_black.png"
-            logo = ImageClip(logo_path)
-            logo = logo.resize((200, 200))  # Make logo square 200x200
-            # Position at bottom left with some padding (20 pixels from edges)
-            logo = logo.set_position((20, 1920 - 200 - 20))
-            logo = logo.set_duration(total_duration)
-
-            # Website URL
-
-            website_url = "www.crackkar.com"
-            website = TextClip(
-                website_url,
-                fontsize=50,
-                color=text_color,
-                stroke_color=stroke_color,
-                stroke_width=2,
-                font="Arial-Bold",
-                method='caption',
-                size=(1080, None),
-                align='center'
+        print(f"Loading background image from: {background_image_path}")
+        with span("background_load", path=background_image_path, fit=background_fit):
+            # Already cropped or letterboxed to the full frame
+            background = ImageClip(load_background(background_image_path, frame_width, frame_height, background_fit))
+    except Exception as e:
+        raise ReelError(f"Error loading background image: {str(e)}")
+
+    # Load and prepare company logo based on text color
+    logo_path = logo_path_for(text_color)
+    logo = ImageClip(load_logo(logo_path, size=(px(200), px(200))))  # Square 200x200 logo
+    # Position at bottom left with some padding (20 pixels from edges)
+    logo = logo.set_position((px(20), frame_height - px(200) - px(20)))
+
+    with span("text_layout", kind="static"):
+        # Website URL
+        website_url = "www.crackkar.com"
+        website = create_static_text_clip(website_url, px(50), text_color, stroke_color, frame_width, px(2))
+        y_position = frame_height - px(WEBSITE_MARGIN)  # Position at bottom
+        website = website.set_position(('center', y_position))
+
+        # Prompt to check caption for poll
+        caption_text = "(Check caption for options)"
+        caption_clip = create_static_text_clip(caption_text, px(45), text_color, stroke_color, frame_width, px(2))
+        caption_clip = caption_clip.set_position(('center', y_position - px(format_layout["prompt_offset"])))
+
+        # UPSC CSE prep disclaimer
+        disclaimer_text = "UPSC-CSE 2025 Prep."
+        disclaimer_clip = create_static_text_clip(disclaimer_text, px(55), text_color, stroke_color, frame_width, px(2))
+        disclaimer_clip = disclaimer_clip.set_position(('center', y_position - px(format_layout["disclaimer_offset"])))
+
+    # Flatten the static layers once; only the word reveal changes from frame to frame
+    with span("composite", layers=5):
+        return flatten_static_layers(
+            [background, logo, website, caption_clip, disclaimer_clip],
+            size=(frame_width, frame_height)
+        )
+
+
+def prepare_layout(display_text, font_size, text_color, stroke_color, y_offset, profile="final",
+                   output_format="9:16"):
+    """
+    Layout stage: lay out and rasterize the full caption once.
+
+    Args:
+        display_text (str): Caption text, without break tags
+        font_size (int): Caption font size
+        text_color (str): Color of the text
+        stroke_color (str): Color of the text stroke/outline
+        y_offset (int): Vertical offset of the caption from the frame center
+        profile (str or RenderProfile): Render profile whose scale is applied to all sizes and positions
+        output_format (str): Aspect ratio, a key of render_profiles.OUTPUT_FORMATS
+
+    Returns:
+        tuple: (WordReveal, (x, y) position of the caption on the frame)
+    """
+    geometry = FrameGeometry(profile, output_format)
+    video_width, video_height = geometry.size
+
+    display_words = display_text.split()
+    with span("text_layout", kind="caption", words=len(display_words), output_format=output_format):
+        # Wrap at full size so every profile breaks lines in the same places
+        lines = wrap_words(display_words, load_font(font_size), geometry.layout_width, stroke_width=2)
+        layout = CaptionLayout(display_words, load_font(geometry.px(font_size)), video_width,
+                               stroke_width=geometry.px(2), lines=lines)
+        reveal = WordReveal(layout, layout.render(color=text_color, stroke_color=stroke_color))
+
+    # Calculate text positions
+    text_height = layout.size[1]
+    format_layout = FORMAT_LAYOUTS[output_format]
+    if format_layout["caption_above_footer"]:
+        # Short frames have no room below the caption, so center it in the space above the footer lines
+        video_height -= geometry.px(WEBSITE_MARGIN + format_layout["disclaimer_offset"])
+    y_position = (video_height - text_height) // 2 + geometry.offset(y_offset)  # Add y_offset to center position
+    return reveal, ((video_width - layout.size[0]) // 2, y_position)
+
+
+def caption_timing(alignment_path, duration, display_words, offset_time):
+    """
+    Time the word-by-word caption reveal from the narration alignment.
+
+    The timing depends only on the words, so one result serves every output format.
+
+    Args:
+        alignment_path (str): Path of the stored alignment
+        duration (float): Narration duration in seconds
+        display_words (list): Caption words
+        offset_time (float): Silent time at start and end of video
+
+    Returns:
+        tuple: (reveal time of each word, time the full caption is shown, video duration) in seconds
+    """
+    with span("word_timing") as timing_span:
+        # Read alignment data
+        alignment = load_alignment(alignment_path)
+
+        # Map the alignment timing onto the display words
+        word_start_times, word_end_times = alignment_word_timings(alignment, display_words)
+
+        # Calculate timings: words are revealed at their start times and the full caption stays until the end
+        total_duration = duration + 2*offset_time  # offset_time before + offset_time after
+        reveal_times = np.array(word_start_times) + offset_time
+        # Start showing final text when last word ends
+        final_start = word_end_times[-1] + offset_time
+
+        timing_span.set(characters=len(alignment), words=len(display_words), timed_words=len(word_start_times),
+                        audio_duration=duration, video_duration=total_duration, final_start=float(final_start))
+    return reveal_times, final_start, total_duration
+
+
+def create_text_clips_from_alignment(alignment_path, duration, reveal, position, offset_time, timing=None):
+    """
+    Build the word-by-word caption reveal timeline from the narration alignment.
+
+    Args:
+        alignment_path (str): Path of the stored alignment
+        duration (float): Narration duration in seconds
+        reveal (WordReveal): Rasterized caption from prepare_layout
+        position (tuple): (x, y) position of the caption on the frame
+        offset_time (float): Silent time at start and end of video
+        timing (tuple, optional): Result of caption_timing, when it is shared between formats
+
+    Returns:
+        RevealTimeline: Which words are visible at each point of the video, or None on error
+    """
+    try:
+        if timing is None:
+            timing = caption_timing(alignment_path, duration, reveal.layout.words, offset_time)
+        return RevealTimeline(reveal, position, *timing)
+    except Exception as e:
+        print(f"Error creating word clips: {str(e)}")
+        return None
+
+
+def render_thumbnail(base_frame, reveal, position, output_path):
+    """
+    Thumbnail stage: write the final caption state, with every word visible, as a PNG.
+
+    Args:
+        base_frame (np.ndarray): Flattened static layers from prepare_assets
+        reveal (WordReveal): Rasterized caption from prepare_layout
+        position (tuple): (x, y) position of the caption on the frame
+        output_path (str): Path of the output PNG
+    """
+    with span("thumbnail", output=output_path):
+        frame = blend(base_frame, reveal.rgb, reveal.mask(len(reveal.layout.words)), position)
+        Image.fromarray(frame).save(output_path)
+
+
+def encode_reel(base_frame, timeline, narration, output_video_path, offset_time, backend="moviepy",
+                profile="final", threads=None):
+    """
+    Encode stage: write the reel video with its narration.
+
+    Args:
+        base_frame (np.ndarray): Flattened static layers from prepare_assets
+        timeline (RevealTimeline): Caption reveal timeline
+        narration (dict): Output of prepare_narration
+        output_video_path (str): Path of the output MP4
+        offset_time (float): Silent time before the narration starts
+        backend (str): "moviepy", "segments", "filtergraph" or "chunked"
+        profile (str or RenderProfile): Render profile giving the frame rate and encoder settings
+        threads (int, optional): Encoder threads, overriding the profile (e.g. when formats encode in parallel)
+    """
+    profile = get_profile(profile)
+    threads = threads or profile.threads
+    compositor = FrameCompositor(base_frame, timeline)
+    frames = int(np.ceil(timeline.duration * profile.fps - 1e-9))
+    profile_name = "encode_" + os.path.splitext(os.path.basename(output_video_path))[0]
+
+    print("Creating video... This may take a few minutes.")
+    render_start = time.time()
+    with span("encode", backend=backend, profile=profile.name, frames=frames, output=output_video_path) as encode_span, \
+            instrumentation.profile(profile_name):
+        if backend == "segments":
+            # One still image per caption state, encoded with the delayed narration in one ffmpeg pass
+            segment_count = encode_segments(
+                compositor,
+                output_video_path,
+                audio_path=narration["audio_path"],
+                audio_delay=offset_time,
+                fps=profile.fps,
+                preset=profile.preset,
+                threads=threads
             )
-            
-            # Calculate text positions
-            video_height = 1920
-            text_height = website.h
-            y_position = 1920 - 100 - 40  # Position at bottom
-            
-            # Set the text position
-            website = website.set_position(('center', y_position))
-            
-            # Set duration
-            website = website.set_duration(total_duration)
-
-            # Prompt to check caption for poll
-            caption_text = "(Check caption for options)"
-            caption_clip = TextClip(
-                caption_text,
-                fontsize=45,
-                color=text_color,
-                stroke_color=stroke_color,
-                stroke_width=2,
-                font="Arial-Bold",
-                method='caption',
-                size=(1080, None),
-                align='center'
+            encode_span.set(segments=segment_count)
+            print(f"Encoded {segment_count} still segments")
+        elif backend == "filtergraph":
+            # ffmpeg overlays a stream of pre-rendered caption layers onto the static layers and encodes in one pass
+            layer_count = encode_filtergraph(
+                base_frame,
+                timeline,
+                output_video_path,
+                audio_path=narration["audio_path"],
+                audio_delay=offset_time,
+                fps=profile.fps,
+                preset=profile.preset,
+                threads=threads
             )
-            caption_clip = caption_clip.set_position(('center', y_position - 200))
-            caption_clip = caption_clip.set_duration(total_duration)
-
-            # UPSC CSE prep disclaimer
-            disclaimer_text = "UPSC-CSE 2025 Prep."
-            disclaimer_clip = TextClip(
-                disclaimer_text,
-                fontsize=55,
-                color=text_color,
-                stroke_color=stroke_color,
-                stroke_width=2,
-                font="Arial-Bold",
-                method='caption',
-                size=(1080, None),
-                align='center'
+            encode_span.set(caption_layers=layer_count)
+            print(f"Composited {layer_count} caption layers in ffmpeg")
+        elif backend == "chunked":
+            # Chunks cut at caption changes are encoded in parallel processes, joined, and muxed with the narration
+            chunk_count = encode_chunked(
+                compositor,
+                output_video_path,
+                audio_path=narration["audio_path"],
+                audio_delay=offset_time,
+                fps=profile.fps,
+                preset=profile.preset,
+                threads=threads
             )
-            disclaimer_clip = disclaimer_clip.set_position(('center', y_position - 300))
-            disclaimer_clip = disclaimer_clip.set_duration(total_duration)
-            
-            # Create word-by-word text animation
-            alignment_path = output_audio_path.replace(".mp3", "_alignment.txt")
-            text_clips = create_text_clips_from_alignment(alignment_path, audio_duration)
-            if text_clips is None:
-                return False, "Failed to create text animation"
-            
-            # Combine all clips
-            final_clip = CompositeVideoClip(
-                [background_composite, logo, website,caption_clip, disclaimer_clip] + text_clips,
-                size=(1080, 1920)
-            ).set_duration(total_duration)
-            
+            encode_span.set(chunks=chunk_count)
+            print(f"Encoded {chunk_count} chunks in parallel")
+        else:
+            from moviepy.audio.AudioClip import AudioArrayClip
+
+            # Decode the narration once, already delayed by offset_time and padded to the video length
+            track = padded_narration_track(narration["audio_path"], offset_time, timeline.duration, fps=44100)
+            audio = AudioArrayClip(track, fps=44100)
+
             # Export video with progress bar
-            print("Creating video... This may take a few minutes.")
+            final_clip = compositor.clip().set_audio(audio)
             final_clip.write_videofile(
                 output_video_path,
-                fps=30,
+                fps=profile.fps,
                 codec="libx264",
                 audio_codec="aac",
-                threads=4
+                preset=profile.preset,
+                threads=threads
             )
-            print(f"Video successfully created at {output_video_path}")
-            return True, f"Successfully created reel at {output_video_path}"
-        except Exception as e:
-            return False, f"Error loading background image: {str(e)}"
+    count("frames_encoded", frames)
+    print(f"Render time ({backend}, {profile.name}): {time.time() - render_start:.2f} seconds")
+
+
+def reel_output_path(title, profile, output_format):
+    """
+    Get the output path of one render of a reel.
+
+    Final 9:16 renders keep the {title}_reel.mp4 name; drafts, thumbnails and other formats get their own
+    suffixes so they never overwrite it, e.g. {title}_draft_1x1.mp4 or {title}_thumbnail.png.
+    """
+    profile = get_profile(profile)
+    suffix = "reel" if profile.name == "final" else profile.name
+    if output_format != "9:16":
+        suffix += "_" + FrameGeometry(profile, output_format).tag
+    extension = "png" if profile.thumbnail else "mp4"
+    return os.path.join("reels", "vids", f"{title}_{suffix}.{extension}")
+
+
+def submit_reel_stages(executor, title, display_text, speech_text=None, background_image_path="background.jpg",
+                       font_size=80, text_color='white', stroke_color='white', offset_time=0.5, y_offset=0,
+                       backend="moviepy", background_fit="cover", profile="final", formats=("9:16",)):
+    """
+    Start the narration stage and the per-format assets and layout stages of a reel on an executor.
+
+    The stages are independent, so background decode/resize and text rendering run while the
+    TTS request is in flight. Thumbnails need no narration, so that stage is skipped for them.
+    Takes the same arguments as create_reel, plus the executor.
+
+    Returns:
+        dict: Stage futures and the parameters complete_reel needs
+    """
+    # If speech_text is not provided, use display_text
+    if speech_text is None:
+        speech_text = display_text
+
+    # Clean display text for visual display
+    display_text = clean_text_for_display(display_text)
+    profile = get_profile(profile)
+    if isinstance(formats, str):
+        formats = [f.strip() for f in formats.split(",")]
+    formats = list(dict.fromkeys(formats))
+
+    return {
+        "title": title,
+        "display_words": display_text.split(),
+        "offset_time": offset_time,
+        "backend": backend,
+        "profile": profile,
+        "narration": None if profile.thumbnail else executor.submit(prepare_narration, title, speech_text),
+        "formats": {
+            output_format: {
+                "assets": executor.submit(prepare_assets, background_image_path, text_color, stroke_color,
+                                          background_fit, profile, output_format),
+                "layout": executor.submit(prepare_layout, display_text, font_size, text_color, stroke_color,
+                                          y_offset, profile, output_format),
+            }
+            for output_format in formats
+        },
+    }
+
+
+def complete_reel(stages):
+    """
+    Wait for a reel's preparation stages, then time the caption once and encode every format.
+
+    Formats are encoded in parallel, up to one per encoder thread of the profile, splitting the threads
+    between them.
+
+    Args:
+        stages (dict): Output of submit_reel_stages
+
+    Returns:
+        tuple: (success (bool), message (str))
+    """
+    profile = stages["profile"]
+    formats = list(stages["formats"])
+    # On a single core parallel encodes only contend, so at most one encode runs per encoder thread
+    encode_workers = min(len(formats), profile.threads)
+    try:
+        narration = timing = None
+        if not profile.thumbnail:
+            narration = stages["narration"].result()
+            # Create word-by-word text animation timing, shared by all formats
+            try:
+                timing = caption_timing(narration["alignment_path"], narration["duration"],
+                                        stages["display_words"], stages["offset_time"])
+            except Exception as e:
+                print(f"Error creating word clips: {str(e)}")
+                return False, "Failed to create text animation"
+
+        def finish_format(output_format):
+            base_frame = stages["formats"][output_format]["assets"].result()
+            reveal, position = stages["formats"][output_format]["layout"].result()
+            output_path = reel_output_path(stages["title"], profile, output_format)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+            if profile.thumbnail:
+                render_thumbnail(base_frame, reveal, position, output_path)
+                print(f"Thumbnail successfully created at {output_path}")
+            else:
+                timeline = RevealTimeline(reveal, position, *timing)
+                encode_reel(base_frame, timeline, narration, output_path, stages["offset_time"], stages["backend"],
+                            profile, threads=max(1, profile.threads // encode_workers))
+                print(f"Video successfully created at {output_path}")
+            return output_path
+
+        if encode_workers == 1:
+            output_paths = [finish_format(output_format) for output_format in formats]
+        else:
+            with ThreadPoolExecutor(max_workers=encode_workers) as format_executor:
+                output_paths = list(format_executor.map(finish_format, formats))
+
+        kind = "thumbnail" if profile.thumbnail else "reel"
+        plural = "s" if len(output_paths) > 1 else ""
+        return True, f"Successfully created {kind}{plural} at {', '.join(output_paths)}"
+    except ReelError as e:
+        return False, str(e)
     except Exception as e:
         return False, f"Error in video creation process: {str(e)}"
+    finally:
+        # Counters are process-wide, so with reels in flight concurrently they cover all of them
+        instrumentation.flush_counters(reel=stages["title"])
+
+
+def create_reel(title, display_text, speech_text=None, background_image_path="background.jpg",
+               font_size=80, text_color='white', stroke_color='white', offset_time=0.5, y_offset=0,
+               backend="moviepy", background_fit="cover", profile="final", formats=("9:16",), executor=None):
+    """
+    Create an Instagram-style reel with text-to-speech narration
+    
+    Args:
+        title (str): Title of the reel (used for output filenames)
+        display_text (str): Text to display in the reel
+        speech_text (str, optional): Text to use for text-to-speech narration. If None, display_text will be used.
+        background_image_path (str): Path to background image
+        text_color (str): Color of the text (default: 'white')
+        stroke_color (str): Color of the text stroke/outline (default: 'white')
+        offset_time (float): Silent time at start and end of video (default: 0.5)
+        y_offset (int): Vertical offset from center in pixels. Positive moves down, negative moves up (default: 0)
+        backend (str): "moviepy" to encode every frame through moviepy, "segments" to encode one
+            still image per caption state in a single ffmpeg pass, "filtergraph" to let ffmpeg composite
+            a stream of pre-rendered caption layers onto the static layers, or "chunked" to encode chunks of the reel in
+            parallel processes (default: "moviepy")
+        background_fit (str): "cover" fills the frame and crops the background, "contain" shows all of it
+            letterboxed on black (default: "cover")
+        profile (str or RenderProfile): "final" (full quality, encoder threads from the CPU count), "draft"
+            (540x960 at 15 fps with the fastest x264 preset, saved as {title}_draft.mp4) or "thumbnail"
+            (final caption state only, saved as {title}_thumbnail.png, no narration needed) (default: "final")
+        formats (list or str): Output aspect ratios, any of "9:16", "1:1" and "16:9" (or a comma-separated
+            string). All formats share one narration and caption timing; formats other than 9:16 are saved
+            with the ratio in the name, e.g. {title}_reel_1x1.mp4 (default: ("9:16",))
+        executor (Executor, optional): Executor for the preparation stages (default: a private thread pool)
+        
+    Returns:
+        tuple: (success (bool), message (str))
+    """
+    if executor is None:
+        format_count = len(formats.split(",")) if isinstance(formats, str) else len(formats)
+        with ThreadPoolExecutor(max_workers=1 + 2 * format_count) as own_executor:
+            return create_reel(title, display_text, speech_text, background_image_path, font_size, text_color,
+                               stroke_color, offset_time, y_offset, backend, background_fit, profile, formats,
+                               executor=own_executor)
+
+    stages = submit_reel_stages(executor, title, display_text, speech_text, background_image_path, font_size,
+                                text_color, stroke_color, offset_time, y_offset, backend, background_fit, profile,
+                                formats)
+    return complete_reel(stages)
 
 if __name__ == "__main__":
     # Example usage
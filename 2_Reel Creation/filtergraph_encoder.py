@@ -0,0 +1,131 @@
+"""
+ffmpeg filtergraph encoder for reels.
+
+Instead of producing frames in Python, the reel is described as a single ffmpeg filtergraph. The
+flattened static layers are read once as a single image. The caption is one stream: a transparent
+full-frame layer per reveal state, listed with its frame-aligned duration for ffmpeg's concat demuxer.
+The graph overlays that stream onto the static layers once, delays the narration with adelay, and
+ffmpeg composites and encodes natively, with its own filter and encoder threads.
+
+Like the segments backend, the video is written with a variable frame rate, so ffmpeg composites and
+x264 encodes one frame per caption state instead of one per tick. Blending happens in RGB, like moviepy,
+so the frames match the moviepy backend to within rounding before the final YUV conversion.
+"""
+
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from audio_track import ffmpeg_binary
+from segment_encoder import frame_aligned_segments
+
+
+def caption_layer(timeline, count, size):
+    """
+    Render the caption with its first count words visible as a transparent full-frame layer.
+
+    Args:
+        timeline (RevealTimeline): Caption reveal timeline
+        count (int): Number of visible words
+        size (tuple): (width, height) of the frame
+
+    Returns:
+        np.ndarray: RGBA layer of shape (height, width, 4)
+    """
+    width, height = size
+    layer = np.zeros((height, width, 4), dtype=np.uint8)
+    if count == 0:
+        return layer
+
+    reveal = timeline.reveal
+    x, y = int(timeline.position[0]), int(timeline.position[1])
+    h, w = reveal.alpha.shape
+    # The caption can extend past the frame; only the visible part is kept, as blend() does
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, width), min(y + h, height)
+    if x0 >= x1 or y0 >= y1:
+        return layer
+    layer[y0:y1, x0:x1, :3] = reveal.rgb[y0 - y:y1 - y, x0 - x:x1 - x]
+    layer[y0:y1, x0:x1, 3] = np.round(reveal.mask(count)[y0 - y:y1 - y, x0 - x:x1 - x] * 255)
+    return layer
+
+
+def encode_filtergraph(base_frame, timeline, output_path, audio_path=None, audio_delay=0.0, fps=30,
+                       codec="libx264", audio_codec="aac", preset="medium", threads=None):
+    """
+    Composite and encode a reel with a single ffmpeg filtergraph.
+
+    Args:
+        base_frame (np.ndarray): Flattened static layers (background, logo, footer text)
+        timeline (RevealTimeline): Caption reveal timeline
+        output_path (str): Path of the output MP4
+        audio_path (str, optional): Narration audio to mux in
+        audio_delay (float): Silence before the narration starts, in seconds
+        fps (int): Output frame rate
+        codec (str): Video codec
+        audio_codec (str): Audio codec
+        preset (str): x264 preset
+        threads (int, optional): Filter and encoder threads (default: ffmpeg's choice)
+
+    Returns:
+        int: Number of caption layers in the caption stream
+    """
+    segments = frame_aligned_segments(timeline, fps)
+    total_frames = sum(frames for _, frames in segments)
+    size = (base_frame.shape[1], base_frame.shape[0])
+
+    # The duration of the last frame of a stream is lost, so the last layer is listed again one frame
+    # before the end; that repeat carries the final frame and the video keeps its full duration
+    last_count, last_frames = segments[-1]
+    entries = segments[:-1] + [(last_count, last_frames - 1), (last_count, 1)] if last_frames > 1 else segments
+
+    with tempfile.TemporaryDirectory(prefix="reel_filtergraph_") as tmp_dir:
+        # ffmpeg runs inside tmp_dir so the concat list only holds short relative layer names
+        Image.fromarray(np.asarray(base_frame, dtype=np.uint8)).save(os.path.join(tmp_dir, "base.png"),
+                                                                      compress_level=1)
+        concat_lines = ["ffconcat version 1.0"]
+        layer_names = {}
+        for count, frames in entries:
+            # Each distinct state is written once even if it recurs; mostly transparent layers compress well
+            if count not in layer_names:
+                layer_names[count] = f"caption_{count:05d}.png"
+                Image.fromarray(caption_layer(timeline, count, size)).save(os.path.join(tmp_dir, layer_names[count]),
+                                                                           compress_level=1)
+            concat_lines.append(f"file '{layer_names[count]}'")
+            concat_lines.append(f"duration {frames / fps:.6f}")
+        with open(os.path.join(tmp_dir, "captions.txt"), "w") as f:
+            f.write("\n".join(concat_lines) + "\n")
+
+        cmd = [ffmpeg_binary(), "-y", "-loglevel", "error",
+               "-f", "concat", "-safe", "0", "-i", "captions.txt", "-i", "base.png"]
+        filters = [
+            "[0:v]split[timing][caption]",
+            # The static layers are decoded once and stamped onto each caption frame's timestamp
+            "[timing][1:v]overlay=format=rgb:eof_action=repeat[base]",
+            # format=rgb blends in RGB like moviepy
+            "[base][caption]overlay=format=rgb,format=yuv420p[v]",
+        ]
+        maps = ["-map", "[v]"]
+
+        if audio_path is not None:
+            delay_ms = int(round(audio_delay * 1000))
+            cmd += ["-i", os.path.abspath(audio_path)]
+            filters.append(f"[2:a]adelay={delay_ms}|{delay_ms},apad[a]")
+            maps += ["-map", "[a]", "-c:a", audio_codec]
+
+        cmd += ["-filter_complex", ";".join(filters)] + maps
+        # One encoded frame per caption layer, with timestamps rounded onto the output frame grid
+        cmd += ["-fps_mode", "vfr", "-enc_time_base", f"1/{fps}", "-t", f"{total_frames / fps:.6f}",
+                "-c:v", codec, "-preset", preset, "-pix_fmt", "yuv420p"]
+        if threads:
+            cmd += ["-filter_complex_threads", str(threads), "-threads", str(threads)]
+        cmd.append(os.path.abspath(output_path))
+
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=tmp_dir)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', errors='replace')}")
+
+    return len(layer_names)
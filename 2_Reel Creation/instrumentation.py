@@ -0,0 +1,234 @@
+"""
+Structured instrumentation for the reel pipeline.
+
+Stages are wrapped in timing spans and notable events bump named counters. Span and counter events are
+dicts handed to pluggable sinks: a JSONL file, the logging module, or any callable. With no sinks
+configured (the default) span() returns a shared no-op context manager and count() returns at once,
+so instrumented code costs next to nothing.
+
+An optional profiler (cProfile, or pyinstrument if installed) can be wrapped around the encode stage.
+
+Configuration from the environment (see configure_from_env):
+    REEL_METRICS_FILE=metrics.jsonl      append span and counter events to a JSONL file
+    REEL_METRICS_LOG=1                   send events to the "reels" logger
+    REEL_PROFILE=cprofile|pyinstrument   profile the encode stage
+    REEL_PROFILE_DIR=reels/profiles      where profiles are written
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+
+class JSONLSink:
+    """Append each event as one JSON line to a file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class LoggingSink:
+    """Send each event to a logger as a JSON message."""
+
+    def __init__(self, logger="reels", level=logging.INFO):
+        self.logger = logging.getLogger(logger) if isinstance(logger, str) else logger
+        self.level = level
+
+    def __call__(self, event):
+        self.logger.log(self.level, json.dumps(event, default=str))
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("owner", "name", "fields", "start")
+
+    def __init__(self, owner, name, fields):
+        self.owner = owner
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event = {
+            "type": "span",
+            "name": self.name,
+            "duration": round(time.perf_counter() - self.start, 6),
+            "ok": exc_type is None,
+            "thread": threading.current_thread().name,
+        }
+        event.update(self.fields)
+        self.owner.emit(event)
+        return False
+
+    def set(self, **fields):
+        """Attach fields discovered while the span is open, e.g. a cache hit or an item count."""
+        self.fields.update(fields)
+
+
+class Instrumentation:
+    """
+    Spans, counters and an optional profiler, reported to pluggable sinks.
+
+    Attributes:
+        sinks (list): Callables that receive each event dict
+        profiler (str): None, "cprofile" or "pyinstrument"
+        profile_dir (str): Directory profiles are written to
+    """
+
+    def __init__(self, sinks=None, profiler=None, profile_dir=os.path.join("reels", "profiles")):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.configure(sinks, profiler, profile_dir)
+
+    @property
+    def enabled(self):
+        return bool(self.sinks)
+
+    def configure(self, sinks=None, profiler=None, profile_dir=None):
+        """
+        Replace the sinks and profiler.
+
+        Args:
+            sinks (list, optional): Event callables, e.g. JSONLSink, LoggingSink or a plain function.
+                None or an empty list disables instrumentation
+            profiler (str, optional): "cprofile" or "pyinstrument" to profile the encode stage
+            profile_dir (str, optional): Directory profiles are written to
+        """
+        if profiler not in (None, "cprofile", "pyinstrument"):
+            raise ValueError(f"Unknown profiler: {profiler}")
+        self.sinks = list(sinks or [])
+        self.profiler = profiler
+        if profile_dir is not None:
+            self.profile_dir = profile_dir
+
+    def emit(self, event):
+        event.setdefault("time", time.time())
+        for sink in self.sinks:
+            try:
+                sink(event)
+            except Exception as e:
+                print(f"Error writing instrumentation event: {str(e)}")
+
+    def span(self, name, **fields):
+        """
+        Time a block of code.
+
+        Args:
+            name (str): Span name, e.g. "tts" or "encode"
+            **fields: Extra fields for the span event
+
+        Returns:
+            Context manager whose set(**fields) adds fields before the span closes
+        """
+        if not self.sinks:
+            return NULL_SPAN
+        return _Span(self, name, fields)
+
+    def count(self, name, n=1):
+        """Add n to a named counter."""
+        if not self.sinks:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def flush_counters(self, **fields):
+        """Emit the counters accumulated since the last flush and reset them."""
+        if not self.sinks:
+            return
+        with self._lock:
+            counters, self.counters = self.counters, {}
+        event = {"type": "counters", "counters": counters}
+        event.update(fields)
+        self.emit(event)
+
+    def profile(self, name):
+        """
+        Profile a block of code with the configured profiler.
+
+        Args:
+            name (str): Base name of the profile file
+
+        Returns:
+            Context manager; a no-op when no profiler is configured
+        """
+        if self.profiler is None:
+            return NULL_SPAN
+        return _Profile(self, name)
+
+
+class _Profile:
+    def __init__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __enter__(self):
+        if self.owner.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+            self.profiler = Profiler()
+            self.profiler.start()
+        else:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        os.makedirs(self.owner.profile_dir, exist_ok=True)
+        base_path = os.path.join(self.owner.profile_dir, f"{self.name}_{time.strftime('%Y%m%d_%H%M%S')}")
+        if self.owner.profiler == "pyinstrument":
+            self.profiler.stop()
+            path = base_path + ".html"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.profiler.output_html())
+        else:
+            self.profiler.disable()
+            path = base_path + ".prof"
+            self.profiler.dump_stats(path)
+        self.owner.emit({"type": "profile", "name": self.name, "profiler": self.owner.profiler, "path": path})
+        return False
+
+
+instrumentation = Instrumentation()
+span = instrumentation.span
+count = instrumentation.count
+
+
+def configure_from_env():
+    """Enable sinks and the profiler from REEL_METRICS_FILE, REEL_METRICS_LOG and REEL_PROFILE."""
+    sinks = []
+    if os.getenv("REEL_METRICS_FILE"):
+        sinks.append(JSONLSink(os.getenv("REEL_METRICS_FILE")))
+    if os.getenv("REEL_METRICS_LOG"):
+        sinks.append(LoggingSink())
+    instrumentation.configure(
+        sinks,
+        profiler=os.getenv("REEL_PROFILE") or None,
+        profile_dir=os.getenv("REEL_PROFILE_DIR")
+    )
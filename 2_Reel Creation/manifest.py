@@ -0,0 +1,38 @@
+"""
+Reel manifests: JSONL or CSV files of reel specs.
+
+Kept apart from batch.py, which imports the rendering modules, so that submitting a manifest to the
+render worker's spool stays instant.
+"""
+
+import csv
+import json
+
+# Manifest columns that are not strings
+NUMERIC_FIELDS = {"font_size": int, "y_offset": int, "offset_time": float}
+
+
+def load_jobs(manifest_path):
+    """
+    Load reel specs from a JSONL or CSV manifest.
+
+    Each spec holds create_reel keyword arguments, e.g. title, display_text, speech_text,
+    background_image_path, font_size, text_color, stroke_color, offset_time and y_offset.
+
+    Args:
+        manifest_path (str): Path to a .jsonl or .csv file
+
+    Returns:
+        list: Reel specs as dicts
+    """
+    with open(manifest_path, "r", encoding="utf-8", newline="") as f:
+        if manifest_path.lower().endswith(".csv"):
+            jobs = [{key: value for key, value in row.items() if value not in (None, "")} for row in csv.DictReader(f)]
+        else:
+            jobs = [json.loads(line) for line in f if line.strip()]
+
+    for job in jobs:
+        for field, cast in NUMERIC_FIELDS.items():
+            if field in job:
+                job[field] = cast(job[field])
+    return jobs
@@ -0,0 +1,56 @@
+"""
+One-shot migration of legacy _alignment.txt files to the .npy alignment format.
+
+Legacy files hold str() of the ElevenLabs alignment dict. They are parsed with ast.literal_eval
+(never eval) and saved next to the original as _alignment.npy.
+
+Usage:
+    python migrate_alignments.py [reels/vids] [--delete]
+"""
+
+import argparse
+import ast
+import glob
+import os
+
+from alignment_store import save_alignment
+
+
+def migrate_alignments(directory=os.path.join("reels", "vids"), delete=False):
+    """
+    Convert every legacy _alignment.txt file in a directory.
+
+    Args:
+        directory (str): Directory to scan
+        delete (bool): Delete each legacy file after it has been converted
+
+    Returns:
+        tuple: (number converted, number skipped because the .npy already exists, number failed)
+    """
+    converted = skipped = failed = 0
+    for txt_path in sorted(glob.glob(os.path.join(directory, "*_alignment.txt"))):
+        npy_path = txt_path[:-len(".txt")] + ".npy"
+        if os.path.exists(npy_path):
+            skipped += 1
+            continue
+        try:
+            with open(txt_path, "r") as f:
+                alignment = ast.literal_eval(f.read())
+            save_alignment(npy_path, alignment)
+            if delete:
+                os.remove(txt_path)
+            converted += 1
+        except Exception as e:
+            print(f"Error migrating {txt_path}: {str(e)}")
+            failed += 1
+    return converted, skipped, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert legacy _alignment.txt files to .npy")
+    parser.add_argument("directory", nargs="?", default=os.path.join("reels", "vids"), help="Directory to scan")
+    parser.add_argument("--delete", action="store_true", help="Delete legacy files after converting them")
+    args = parser.parse_args()
+
+    converted, skipped, failed = migrate_alignments(args.directory, delete=args.delete)
+    print(f"Converted: {converted}, already migrated: {skipped}, failed: {failed}")
@@ -0,0 +1,105 @@
+"""
+Phrase-level narration assembly.
+
+Reel narrations repeat a lot of text: fixed openers, option phrasing, and the question halves that
+insert_break_at_middle separates with <break> tags. Instead of synthesizing the whole speech text, it is
+split at its break tags into fragments, each fragment is synthesized (or found in the TTS cache) on its
+own, and the narration is stitched together with the requested breaks as silence. The fragment
+alignments are merged into one alignment with each fragment's timestamps offset by where its audio
+starts, so word timing works exactly as with a narration synthesized in one request.
+"""
+
+import os
+import re
+import tempfile
+
+import numpy as np
+
+from audio_track import decode_pcm, encode_mp3
+
+# <break time='1.0s'> tags with the whitespace around them; the group is the duration in seconds
+BREAK_PATTERN = re.compile(r'\s*<break\s+time=[\'"](\d+\.?\d*)s?[\'"]\s*/?>\s*')
+
+
+def split_fragments(speech_text):
+    """
+    Split speech text at its break tags.
+
+    Args:
+        speech_text (str): Text to narrate, possibly with <break time='...'> tags
+
+    Returns:
+        list: (fragment text, pause after it in seconds) pairs. Consecutive breaks are merged into one
+            pause, and a leading break gives a first fragment with empty text
+    """
+    fragments = []
+    position = 0
+    for match in BREAK_PATTERN.finditer(speech_text):
+        fragment = speech_text[position:match.start()].strip()
+        pause = float(match.group(1))
+        if fragment or not fragments:
+            fragments.append([fragment, pause])
+        else:
+            fragments[-1][1] += pause
+        position = match.end()
+
+    tail = speech_text[position:].strip()
+    if tail or not fragments:
+        fragments.append([tail, 0.0])
+    return [(fragment, pause) for fragment, pause in fragments]
+
+
+def fragment_texts(speech_text):
+    """Get the distinct non-empty fragments of speech text, in order of first appearance."""
+    return list(dict.fromkeys(fragment for fragment, _ in split_fragments(speech_text) if fragment))
+
+
+def assemble_narration(fragments, fragment_audio, sample_rate=44100):
+    """
+    Stitch synthesized fragments and pauses into one narration with a merged alignment.
+
+    Args:
+        fragments (list): (fragment text, pause after it in seconds) pairs from split_fragments
+        fragment_audio (dict): Fragment text -> (MP3 bytes, alignment dict) of each non-empty fragment
+        sample_rate (int): Sample rate of the stitched narration
+
+    Returns:
+        tuple: (MP3 bytes, alignment dict in the ElevenLabs layout)
+    """
+    pieces = []
+    offset_samples = 0
+    characters, start_times, end_times = [], [], []
+
+    with tempfile.TemporaryDirectory(prefix="narration_") as tmp_dir:
+        fragment_path = os.path.join(tmp_dir, "fragment.mp3")
+        for fragment, pause in fragments:
+            if fragment:
+                audio_bytes, alignment = fragment_audio[fragment]
+                with open(fragment_path, "wb") as f:
+                    f.write(audio_bytes)
+                samples = decode_pcm(fragment_path, sample_rate, nchannels=1)
+
+                # Offsets come from decoded sample counts, so they match the stitched audio exactly
+                offset = offset_samples / sample_rate
+                if characters:
+                    # A space spanning the pause keeps the fragments' words apart
+                    characters.append(" ")
+                    start_times.append(end_times[-1])
+                    end_times.append(offset)
+                characters.extend(alignment["characters"])
+                start_times.extend(t + offset for t in alignment["character_start_times_seconds"])
+                end_times.extend(t + offset for t in alignment["character_end_times_seconds"])
+
+                pieces.append(samples)
+                offset_samples += len(samples)
+
+            silence = int(round(pause * sample_rate))
+            pieces.append(np.zeros((silence, 1), dtype=np.int16))
+            offset_samples += silence
+
+    audio_bytes = encode_mp3(np.concatenate(pieces), sample_rate)
+    return audio_bytes, {
+        "characters": characters,
+        "character_start_times_seconds": start_times,
+        "character_end_times_seconds": end_times,
+    }
@@ -0,0 +1,108 @@
+"""
+Named render profiles and output formats for create_reel.
+
+A profile sets the output scale, frame rate and encoder settings; an output format sets the aspect
+ratio. Layout sizes and offsets are written for a frame whose short side is 1080 pixels, and
+FrameGeometry scales them to each (profile, format) pair, so every render goes through the same
+layout code and a draft or thumbnail shows the same composition as the final render.
+"""
+
+import os
+
+
+class RenderProfile:
+    """
+    Output settings for one kind of render.
+
+    Attributes:
+        name (str): Profile name, also used as the output filename suffix
+        scale (float): Output size relative to 1080x1920
+        fps (int): Frame rate of the video
+        preset (str): x264 preset
+        threads (int): Encoder threads
+        thumbnail (bool): Render only the final caption state to a PNG, without narration or video
+    """
+
+    def __init__(self, name, scale=1.0, fps=30, preset="medium", threads=None, thumbnail=False):
+        self.name = name
+        self.scale = scale
+        self.fps = fps
+        self.preset = preset
+        self.threads = threads or os.cpu_count() or 1
+        self.thumbnail = thumbnail
+
+
+PROFILES = {
+    # Quarter of the pixels (540x960) at a low frame rate with the fastest x264 preset, for iterating on layout
+    "draft": RenderProfile("draft", scale=0.5, fps=15, preset="ultrafast"),
+    # Final caption state only, written as a PNG
+    "thumbnail": RenderProfile("thumbnail", thumbnail=True),
+    "final": RenderProfile("final"),
+}
+
+
+# Full-quality frame size of each output format
+OUTPUT_FORMATS = {
+    "9:16": (1080, 1920),  # Reels, Shorts
+    "1:1": (1080, 1080),   # Square feed post
+    "16:9": (1920, 1080),  # Landscape video
+}
+
+
+class FrameGeometry:
+    """
+    Frame size and layout scaling for one output format rendered with one profile.
+
+    Attributes:
+        output_format (str): Aspect ratio key of OUTPUT_FORMATS
+        width (int): Frame width in pixels
+        height (int): Frame height in pixels
+        scale (float): Output pixels per layout pixel (layout pixels assume a 1080-pixel short side)
+        layout_width (int): Frame width in layout pixels
+    """
+
+    def __init__(self, profile="final", output_format="9:16"):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format} (expected one of {', '.join(OUTPUT_FORMATS)})")
+        profile = get_profile(profile)
+        full_width, full_height = OUTPUT_FORMATS[output_format]
+        self.output_format = output_format
+        self.scale = profile.scale * min(full_width, full_height) / 1080
+        self.width = int(round(full_width * profile.scale))
+        self.height = int(round(full_height * profile.scale))
+        # Frame width in layout pixels, for wrapping text the same way at every scale
+        self.layout_width = int(round(full_width * 1080 / min(full_width, full_height)))
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    @property
+    def tag(self):
+        """Filesystem-safe format name, e.g. "9x16"."""
+        return self.output_format.replace(":", "x")
+
+    def px(self, value):
+        """Scale a size in layout pixels, keeping it at least 1 pixel."""
+        return max(1, int(round(value * self.scale)))
+
+    def offset(self, value):
+        """Scale a signed offset in layout pixels."""
+        return int(round(value * self.scale))
+
+
+def get_profile(profile):
+    """
+    Look up a render profile.
+
+    Args:
+        profile (str or RenderProfile): Profile name ("draft", "thumbnail" or "final") or a custom profile
+
+    Returns:
+        RenderProfile: The profile
+    """
+    if isinstance(profile, RenderProfile):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown render profile: {profile} (expected one of {', '.join(PROFILES)})")
+    return PROFILES[profile]
@@ -0,0 +1,317 @@
+"""
+Long-lived render worker fed from a local directory spool.
+
+A one-shot run of content.py pays for its imports, fonts, logos and background decoding on every
+invocation. The worker pays for them once: it imports the rendering modules up front, keeps the font,
+text, logo and background caches and its stage thread pool resident, and renders jobs as they appear in
+the spool, preparing the next job while the current one encodes (as batch.py --pipelined does).
+
+Spool layout (default reels/queue):
+    incoming/{job_id}.json     submitted jobs, taken oldest first
+    processing/{job_id}.json   claimed by a worker (claiming is an atomic rename, so workers can share a spool)
+    done/{job_id}.json         job plus its result
+    failed/{job_id}.json       job plus its result or error
+
+The submit and status commands only touch the spool and do not import the rendering modules, so they
+start instantly.
+
+Usage:
+    python render_worker.py serve [--spool reels/queue] [--once]
+    python render_worker.py submit --title T --display-text "..." [--profile draft] [--formats 9:16,1:1] [--wait]
+    python render_worker.py submit --manifest reels.jsonl
+    python render_worker.py status JOB_ID
+"""
+
+import argparse
+import json
+import os
+import signal
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import load_jobs
+from tts_cache import atomic_write
+
+SPOOL_DIR = os.path.join("reels", "queue")
+STATES = ("incoming", "processing", "done", "failed")
+
+
+def spool_path(spool_dir, state, job_id=None):
+    """Get a state directory of the spool, or the path of one job file in it."""
+    directory = os.path.join(spool_dir, state)
+    return directory if job_id is None else os.path.join(directory, f"{job_id}.json")
+
+
+def _write_record(path, record):
+    atomic_write(path, json.dumps(record, indent=2).encode("utf-8"))
+
+
+def submit_job(job, spool_dir=SPOOL_DIR):
+    """
+    Add a reel job to the spool.
+
+    Args:
+        job (dict): create_reel keyword arguments
+        spool_dir (str): Spool directory
+
+    Returns:
+        str: Job id; ids sort in submission order
+    """
+    for state in STATES:
+        os.makedirs(spool_path(spool_dir, state), exist_ok=True)
+    now = time.time_ns()
+    job_id = f"{time.strftime('%Y%m%d_%H%M%S', time.localtime(now // 10 ** 9))}_{now % 10 ** 9:09d}_{uuid.uuid4().hex[:6]}"
+    _write_record(spool_path(spool_dir, "incoming", job_id), {"id": job_id, "submitted_at": time.time(), "job": job})
+    return job_id
+
+
+def job_status(job_id, spool_dir=SPOOL_DIR):
+    """
+    Look up a job in the spool.
+
+    Args:
+        job_id (str): Id returned by submit_job
+        spool_dir (str): Spool directory
+
+    Returns:
+        tuple: (state, record), with state one of STATES, or (None, None) if the job is unknown
+    """
+    # Check the final states first so a job moving between directories is not missed
+    for state in reversed(STATES):
+        path = spool_path(spool_dir, state, job_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return state, json.load(f)
+        except FileNotFoundError:
+            continue
+    return None, None
+
+
+def wait_for_job(job_id, spool_dir=SPOOL_DIR, timeout=None, poll_interval=0.5):
+    """
+    Block until a job is done or failed.
+
+    Args:
+        job_id (str): Id returned by submit_job
+        spool_dir (str): Spool directory
+        timeout (float, optional): Seconds to wait before giving up
+        poll_interval (float): Seconds between checks
+
+    Returns:
+        tuple: (state, record) as returned by job_status; state is still "incoming" or "processing" on timeout
+    """
+    deadline = None if timeout is None else time.time() + timeout
+    while True:
+        state, record = job_status(job_id, spool_dir)
+        if state in ("done", "failed") or (deadline is not None and time.time() >= deadline):
+            return state, record
+        time.sleep(poll_interval)
+
+
+def claim_next_job(spool_dir=SPOOL_DIR):
+    """
+    Move the oldest incoming job to processing.
+
+    Returns:
+        dict: The job record, or None if no job is waiting
+    """
+    incoming = spool_path(spool_dir, "incoming")
+    try:
+        names = sorted(name for name in os.listdir(incoming) if name.endswith(".json"))
+    except FileNotFoundError:
+        return None
+
+    for name in names:
+        job_id = name[:-len(".json")]
+        processing_path = spool_path(spool_dir, "processing", job_id)
+        try:
+            # Another worker may claim the same job first; the rename succeeds for only one of them
+            os.replace(os.path.join(incoming, name), processing_path)
+        except FileNotFoundError:
+            continue
+        try:
+            with open(processing_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            finish_job({"id": job_id, "job": None}, time.time(), False, f"Unreadable job file: {str(e)}", spool_dir)
+    return None
+
+
+def finish_job(record, start_time, success, message, spool_dir=SPOOL_DIR):
+    """Write a job's result to done/ or failed/ and release its processing file."""
+    state = "done" if success else "failed"
+    record = dict(record, status=state, success=success, message=message, started_at=start_time,
+                  finished_at=time.time(), elapsed=time.time() - start_time, pid=os.getpid())
+    _write_record(spool_path(spool_dir, state, record["id"]), record)
+    try:
+        os.remove(spool_path(spool_dir, "processing", record["id"]))
+    except FileNotFoundError:
+        pass
+    print(f"[{'OK' if success else 'FAILED'}] {record['id']}: {message}")
+
+
+def requeue_job(record, spool_dir=SPOOL_DIR):
+    """Move a claimed job back to incoming, e.g. when the worker stops before finishing it."""
+    try:
+        os.replace(spool_path(spool_dir, "processing", record["id"]), spool_path(spool_dir, "incoming", record["id"]))
+    except FileNotFoundError:
+        pass
+
+
+def warm_up():
+    """
+    Import the rendering modules and load the shared assets before the first job arrives.
+
+    Returns:
+        module: The content module
+    """
+    import content
+    import moviepy.audio.AudioClip
+    import moviepy.video.compositing.CompositeVideoClip
+    import moviepy.video.VideoClip
+    from audio_track import ffmpeg_binary
+    from text_render import load_font
+
+    ffmpeg_binary()
+    load_font(80)
+    for text_color in ("white", "black"):
+        logo_path = content.logo_path_for(text_color)
+        if os.path.exists(logo_path):
+            content.load_logo(logo_path)
+    return content
+
+
+def serve(spool_dir=SPOOL_DIR, poll_interval=0.5, once=False, prep_workers=3, lookahead=1):
+    """
+    Render spooled jobs until interrupted.
+
+    Args:
+        spool_dir (str): Spool directory
+        poll_interval (float): Seconds between spool checks while idle
+        once (bool): Exit when the spool is empty instead of waiting for more jobs
+        prep_workers (int): Threads for the narration, asset and layout stages
+        lookahead (int): Number of jobs prepared ahead of the one being encoded
+
+    Returns:
+        int: Number of jobs processed
+    """
+    for state in STATES:
+        os.makedirs(spool_path(spool_dir, state), exist_ok=True)
+
+    start_time = time.time()
+    content = warm_up()
+    print(f"Render worker {os.getpid()} ready in {time.time() - start_time:.2f} seconds, watching {spool_dir}")
+
+    processed = 0
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=prep_workers) as executor:
+        def claim_upcoming():
+            nonlocal processed
+            while len(pending) < lookahead + 1:
+                record = claim_next_job(spool_dir)
+                if record is None:
+                    return
+                job_start = time.time()
+                try:
+                    pending.append((record, job_start, content.submit_reel_stages(executor, **record["job"])))
+                except Exception:
+                    finish_job(record, job_start, False, traceback.format_exc(), spool_dir)
+                    processed += 1
+
+        try:
+            while True:
+                claim_upcoming()
+                if not pending:
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                record, job_start, stages = pending[0]
+                try:
+                    success, message = content.complete_reel(stages)
+                except Exception:
+                    success, message = False, traceback.format_exc()
+                pending.popleft()
+                finish_job(record, job_start, success, message, spool_dir)
+                processed += 1
+        except KeyboardInterrupt:
+            print("Stopping render worker")
+        finally:
+            # Jobs claimed but not finished go back to the spool for the next worker
+            for record, _, _ in pending:
+                requeue_job(record, spool_dir)
+    return processed
+
+
+def _stop_on_sigterm(signum, frame):
+    # Service managers stop the worker with SIGTERM; unwind like Ctrl+C so claimed jobs are requeued
+    raise KeyboardInterrupt
+
+
+def _print_status(state, record):
+    if state is None:
+        print("Unknown job")
+    elif state in ("done", "failed"):
+        print(f"{state}: {record['message']} ({record['elapsed']:.2f} seconds)")
+    else:
+        print(state)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persistent reel render worker and its job queue")
+    parser.add_argument("--spool", default=SPOOL_DIR, help="Spool directory shared by the worker and submitters")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run a worker")
+    serve_parser.add_argument("--once", action="store_true", help="Exit when the spool is empty")
+    serve_parser.add_argument("--poll", type=float, default=0.5, help="Seconds between spool checks while idle")
+
+    submit_parser = commands.add_parser("submit", help="Queue reel jobs")
+    submit_parser.add_argument("--manifest", help="JSONL or CSV manifest of reel specs (see manifest.py)")
+    submit_parser.add_argument("--title", help="Title of the reel")
+    submit_parser.add_argument("--display-text", help="Text to display in the reel")
+    submit_parser.add_argument("--speech-text", help="Text to narrate (default: the display text)")
+    submit_parser.add_argument("--background", help="Path to the background image")
+    submit_parser.add_argument("--profile", help="Render profile: final, draft or thumbnail")
+    submit_parser.add_argument("--formats", help="Comma-separated output formats, e.g. 9:16,1:1")
+    submit_parser.add_argument("--backend", help="Encoding backend: moviepy, segments, filtergraph or chunked")
+    submit_parser.add_argument("--options", help="Other create_reel arguments as a JSON object")
+    submit_parser.add_argument("--wait", action="store_true", help="Wait for the jobs to finish")
+
+    status_parser = commands.add_parser("status", help="Show the state of a job")
+    status_parser.add_argument("job_id")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        signal.signal(signal.SIGTERM, _stop_on_sigterm)
+        serve(args.spool, poll_interval=args.poll, once=args.once)
+
+    elif args.command == "submit":
+        if args.manifest:
+            jobs = load_jobs(args.manifest)
+        else:
+            if not args.title or not args.display_text:
+                parser.error("submit needs --manifest, or --title and --display-text")
+            job = json.loads(args.options) if args.options else {}
+            job.update(title=args.title, display_text=args.display_text)
+            for field, value in (("speech_text", args.speech_text), ("background_image_path", args.background),
+                                 ("profile", args.profile), ("formats", args.formats), ("backend", args.backend)):
+                if value is not None:
+                    job[field] = value
+            jobs = [job]
+
+        job_ids = [submit_job(job, args.spool) for job in jobs]
+        for job_id in job_ids:
+            print(job_id)
+        if args.wait:
+            for job_id in job_ids:
+                print(f"{job_id}: ", end="", flush=True)
+                _print_status(*wait_for_job(job_id, args.spool))
+
+    elif args.command == "status":
+        _print_status(*job_status(args.job_id, args.spool))
@@ -0,0 +1,119 @@
+"""
+Still-segment encoder for reels.
+
+A reel is piecewise constant: the picture only changes when the caption reveals another word. This
+encoder renders one image per visual state, lists the images with their durations for ffmpeg's concat
+demuxer, and encodes them together with the delayed narration in a single ffmpeg pass, instead of
+piping every frame through moviepy.
+
+The video is written with a variable frame rate: x264 gets one frame per visual state, timestamped on
+the output frame grid, instead of the same still repeated on every tick. Players show each state for
+its duration, and decoding at the nominal frame rate gives the frames of the moviepy backend.
+"""
+
+import math
+import os
+import subprocess
+import tempfile
+
+from PIL import Image
+
+from audio_track import ffmpeg_binary
+
+
+def frame_aligned_segments(timeline, fps):
+    """
+    Split the timeline into still segments whose boundaries fall on frame boundaries.
+
+    Args:
+        timeline (RevealTimeline): Caption reveal timeline
+        fps (int): Output frame rate
+
+    Returns:
+        list: (visible word count, number of frames) pairs covering the whole video
+    """
+    # moviepy samples frame i at t = i / fps, so a state starting at t first shows on frame ceil(t * fps)
+    def first_frame(t):
+        return int(math.ceil(t * fps - 1e-9))
+
+    total_frames = first_frame(timeline.duration)
+    segments = []
+    events = timeline.events()
+    for i, (t, count) in enumerate(events):
+        start = first_frame(t)
+        end = first_frame(events[i + 1][0]) if i + 1 < len(events) else total_frames
+        end = min(end, total_frames)
+        if end <= start:
+            continue
+        if segments and segments[-1][0] == count:
+            segments[-1] = (count, segments[-1][1] + end - start)
+        else:
+            segments.append((count, end - start))
+    return segments
+
+
+def encode_segments(compositor, output_path, audio_path=None, audio_delay=0.0, fps=30,
+                    codec="libx264", audio_codec="aac", preset="medium", threads=None):
+    """
+    Encode a reel as a sequence of still segments in a single ffmpeg pass.
+
+    Args:
+        compositor (FrameCompositor): Produces the frame for each caption state
+        output_path (str): Path of the output MP4
+        audio_path (str, optional): Narration audio to mux in
+        audio_delay (float): Silence before the narration starts, in seconds
+        fps (int): Output frame rate
+        codec (str): Video codec
+        audio_codec (str): Audio codec
+        preset (str): x264 preset
+        threads (int, optional): Encoder threads (default: ffmpeg's choice)
+
+    Returns:
+        int: Number of still segments encoded
+    """
+    timeline = compositor.timeline
+    segments = frame_aligned_segments(timeline, fps)
+    total_frames = sum(frames for _, frames in segments)
+
+    with tempfile.TemporaryDirectory(prefix="reel_segments_") as tmp_dir:
+        # The duration of the last frame of a stream is lost, so the last still is listed again one frame
+        # before the end; that repeat carries the final frame and the video keeps its full duration
+        last_count, last_frames = segments[-1]
+        entries = segments[:-1] + [(last_count, last_frames - 1), (last_count, 1)] if last_frames > 1 else segments
+
+        concat_lines = ["ffconcat version 1.0"]
+        image_paths = {}
+        for count, frames in entries:
+            # Each distinct state is written once even if it recurs. Uncompressed PPM costs about 6 MB of
+            # temporary disk per state, but PNG compression and decoding took longer than the encode itself
+            if count not in image_paths:
+                image_paths[count] = os.path.join(tmp_dir, f"state_{count:05d}.ppm")
+                Image.fromarray(compositor.frame_for_count(count)).save(image_paths[count])
+            concat_lines.append(f"file '{image_paths[count]}'")
+            concat_lines.append(f"duration {frames / fps:.6f}")
+
+        concat_path = os.path.join(tmp_dir, "segments.txt")
+        with open(concat_path, "w") as f:
+            f.write("\n".join(concat_lines) + "\n")
+
+        cmd = [ffmpeg_binary(), "-y", "-loglevel", "error",
+               "-f", "concat", "-safe", "0", "-i", concat_path]
+        maps = ["-map", "0:v"]
+        if audio_path is not None:
+            delay_ms = int(round(audio_delay * 1000))
+            cmd += ["-i", audio_path]
+            cmd += ["-filter_complex", f"[1:a]adelay={delay_ms}|{delay_ms},apad[a]"]
+            maps += ["-map", "[a]", "-c:a", audio_codec]
+        cmd += maps
+        # One encoded frame per concat entry, with timestamps rounded onto the output frame grid
+        cmd += ["-fps_mode", "vfr", "-enc_time_base", f"1/{fps}", "-t", f"{total_frames / fps:.6f}",
+                "-c:v", codec, "-preset", preset, "-pix_fmt", "yuv420p"]
+        if threads:
+            cmd += ["-threads", str(threads)]
+        cmd.append(output_path)
+
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', errors='replace')}")
+
+    return len(segments)
@@ -0,0 +1,147 @@
+"""
+In-process text rasterizer built on Pillow/FreeType.
+
+Replaces ImageMagick's TextClip for every text layer of a reel: text is wrapped at a fixed width like
+ImageMagick's caption method, centered, and drawn with a stroke in one Pillow call per line, without
+starting a process or writing temp files. Loaded fonts and measured text widths are kept in LRU caches,
+so wrapping and laying out the same words again (every reel, every output format) only measures new
+strings, and the static footer texts are rasterized once per process.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import instrumentation
+
+# Font files tried in order; the first is the TrueType file behind ImageMagick's "Arial-Bold".
+# Liberation Sans is metric-compatible with Arial, so line wrapping stays the same on Linux.
+FONT_CANDIDATES = ("arialbd.ttf", "Arial Bold.ttf", "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf")
+
+
+def load_font(font_size, font_candidates=FONT_CANDIDATES):
+    """
+    Load the first available font from a list of candidate font files.
+
+    Fonts are cached, so each (size, candidates) pair is opened once per process.
+
+    Args:
+        font_size (int): Font size in pixels
+        font_candidates (list): Font file names or paths, tried in order
+
+    Returns:
+        ImageFont.FreeTypeFont: Loaded font
+    """
+    return _load_font(font_size, tuple(font_candidates))
+
+
+@lru_cache(maxsize=64)
+def _load_font(font_size, font_candidates):
+    for font_path in font_candidates:
+        try:
+            return ImageFont.truetype(font_path, font_size)
+        except OSError:
+            continue
+    raise OSError(f"None of the fonts could be loaded: {list(font_candidates)}")
+
+
+@lru_cache(maxsize=8192)
+def text_length(font, text):
+    """
+    Get the advance width of a string, memoized per font.
+
+    Args:
+        font (ImageFont.FreeTypeFont): Font from load_font
+        text (str): Text to measure
+
+    Returns:
+        float: Width in pixels
+    """
+    return font.getlength(text)
+
+
+def wrap_words(words, font, width, stroke_width=2):
+    """
+    Greedily wrap words into lines no wider than width, like ImageMagick's caption method.
+
+    Args:
+        words (list): Words to wrap
+        font (ImageFont.FreeTypeFont): Font used for measuring
+        width (int): Maximum line width in pixels
+        stroke_width (int): Stroke width, which adds to both sides of a line
+
+    Returns:
+        list: Lines, each a list of word indices
+    """
+    lines = []
+    current = []
+    for i, word in enumerate(words):
+        candidate = ' '.join(words[j] for j in current + [i])
+        if current and text_length(font, candidate) + 2 * stroke_width > width:
+            lines.append(current)
+            current = [i]
+        else:
+            current.append(i)
+    if current:
+        lines.append(current)
+    return lines
+
+
+def draw_lines(size, lines, origins, font, color='white', stroke_color='white', stroke_width=2):
+    """
+    Draw lines of text with a stroke onto a transparent raster.
+
+    Args:
+        size (tuple): (width, height) of the raster
+        lines (list): Text of each line
+        origins (list): (x, y) of each line's top-left corner
+        font (ImageFont.FreeTypeFont): Font to draw with
+        color (str): Text fill color
+        stroke_color (str): Text outline color
+        stroke_width (int): Outline width in pixels
+
+    Returns:
+        np.ndarray: RGBA image of shape (height, width, 4)
+    """
+    image = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for line, origin in zip(lines, origins):
+        draw.text(origin, line, font=font, fill=color, stroke_width=stroke_width, stroke_fill=stroke_color)
+    return np.array(image)
+
+
+@lru_cache(maxsize=64)
+def render_text(text, font_size, color='white', stroke_color='white', width=1080, stroke_width=2,
+                font_candidates=FONT_CANDIDATES):
+    """
+    Rasterize text wrapped to a fixed width, each line centered, as a drop-in for TextClip's caption method.
+
+    Results are cached, so the same text layer is rasterized once per process.
+
+    Args:
+        text (str): Text to render
+        font_size (int): Font size in pixels
+        color (str): Text fill color
+        stroke_color (str): Text outline color
+        width (int): Width of the raster; lines are wrapped to fit it
+        stroke_width (int): Outline width in pixels
+        font_candidates (tuple): Font file names or paths, tried in order
+
+    Returns:
+        np.ndarray: Read-only RGBA image of shape (height, width, 4)
+    """
+    instrumentation.count("text_renders")
+    font = load_font(font_size, font_candidates)
+    words = text.split()
+    lines = [' '.join(words[i] for i in line) for line in wrap_words(words, font, width, stroke_width)]
+
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent
+    size = (width, line_height * len(lines) + 2 * stroke_width)
+    origins = [((width - text_length(font, line)) / 2, stroke_width + i * line_height) for i, line in enumerate(lines)]
+
+    raster = draw_lines(size, lines, origins, font, color, stroke_color, stroke_width)
+    # The raster is shared between reels, so guard it against accidental in-place edits
+    raster.flags.writeable = False
+    return raster
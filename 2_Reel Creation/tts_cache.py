@@ -0,0 +1,236 @@
+"""
+Content-addressed cache for ElevenLabs narration.
+
+Entries are keyed by a hash of everything that determines the audio (text, voice, voice settings
+and model), so the same narration is reused across reel titles and edited text never returns stale
+audio. Each entry is an MP3 plus its alignment JSON, written atomically. The least recently used
+entries are evicted once the cache grows past its disk budget.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Temporary files older than this were left behind by a writer that died; younger ones may still be written
+STALE_TMP_SECONDS = 3600
+# put() evicts down to this share of max_bytes, so a full cache is not scanned again on every write
+EVICTION_TARGET = 0.9
+
+
+def tts_cache_key(text, voice_id, voice_settings, model_id=None):
+    """
+    Hash the parameters that determine the generated narration.
+
+    Args:
+        text (str): Text sent for synthesis
+        voice_id (str): ElevenLabs voice ID
+        voice_settings (dict): Voice settings sent with the request
+        model_id (str, optional): ElevenLabs model ID, None for the API default
+
+    Returns:
+        str: Hex digest identifying the narration
+    """
+    payload = json.dumps(
+        {"text": text, "voice_id": voice_id, "voice_settings": voice_settings, "model_id": model_id},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def atomic_write(path, data):
+    """
+    Write bytes to path so readers never see a partially written file.
+
+    Args:
+        path (str): Destination path
+        data (bytes): File contents
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class TTSCache:
+    """
+    Disk cache of narration audio and alignment, shared across reel titles.
+
+    Attributes:
+        cache_dir (str): Directory holding cache entries
+        max_bytes (int): Disk budget; least recently used entries are evicted past it
+        hits (int): Lookups served from the cache
+        misses (int): Lookups that required an API call
+        characters_saved (int): Characters of text not sent to the API thanks to hits
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.characters_saved = 0
+        # Bytes on disk as of the last eviction scan plus what this process wrote since; None before the first scan
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _paths(self, key):
+        return (
+            os.path.join(self.cache_dir, f"{key}.mp3"),
+            os.path.join(self.cache_dir, f"{key}_alignment.json"),
+        )
+
+    def contains(self, key):
+        """
+        Check whether an entry is cached, without counting a hit or miss or marking it as used.
+
+        Args:
+            key (str): Cache key from tts_cache_key
+
+        Returns:
+            bool: True if both the audio and the alignment are on disk
+        """
+        return all(os.path.exists(path) for path in self._paths(key))
+
+    def get(self, key, text=""):
+        """
+        Look up a cache entry and mark it as recently used.
+
+        Every call counts as a hit or a miss, so use contains() to probe for entries that are not served.
+
+        Args:
+            key (str): Cache key from tts_cache_key
+            text (str): Narration text, used to count the characters saved
+
+        Returns:
+            tuple: (audio_bytes, alignment dict), or None on a miss
+        """
+        audio_path, alignment_path = self._paths(key)
+        try:
+            with open(alignment_path, "r", encoding="utf-8") as f:
+                alignment = json.load(f)
+            with open(audio_path, "rb") as f:
+                audio_bytes = f.read()
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Access time is not reliable on all filesystems, so recency is tracked through mtime
+        for path in (audio_path, alignment_path):
+            try:
+                os.utime(path, None)
+            except OSError:
+                # Evicted by another process after it was read; what was read is still valid
+                pass
+        with self._lock:
+            self.hits += 1
+            self.characters_saved += len(text)
+        return audio_bytes, alignment
+
+    def put(self, key, audio_bytes, alignment):
+        """
+        Store an entry atomically, then evict old entries if it takes the cache past the disk budget.
+
+        The directory is only scanned when a running total of the cache size crosses max_bytes, and then
+        entries are evicted down to EVICTION_TARGET of it. The total counts what this process writes; each scan
+        resets it to what is on disk, including other processes' entries.
+
+        Args:
+            key (str): Cache key from tts_cache_key
+            audio_bytes (bytes): MP3 audio
+            alignment (dict): Character alignment returned by ElevenLabs
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        audio_path, alignment_path = self._paths(key)
+        alignment_bytes = json.dumps(alignment).encode("utf-8")
+        replaced = _file_size(audio_path) + _file_size(alignment_path)
+        # The alignment is written first: an entry only counts once its audio exists too
+        atomic_write(alignment_path, alignment_bytes)
+        atomic_write(audio_path, audio_bytes)
+        with self._lock:
+            if self._size is not None:
+                self._size += len(alignment_bytes) + len(audio_bytes) - replaced
+            over_budget = self._size is None or self._size > self.max_bytes
+        if over_budget:
+            self.evict(int(self.max_bytes * EVICTION_TARGET))
+
+    def evict(self, target_bytes=None):
+        """
+        Delete least recently used entries until the cache fits within target_bytes.
+
+        Temporary files abandoned by interrupted writes are deleted as well.
+
+        Args:
+            target_bytes (int, optional): Size to evict down to (default: max_bytes)
+
+        Returns:
+            int: Number of entries evicted
+        """
+        target_bytes = self.max_bytes if target_bytes is None else target_bytes
+        now = time.time()
+        entries = {}
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith(".tmp"):
+                if now - stat.st_mtime > STALE_TMP_SECONDS:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                continue
+            key = name.split("_", 1)[0].split(".", 1)[0]
+            size, last_used = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(last_used, stat.st_mtime))
+
+        total = sum(size for size, _ in entries.values())
+        evicted = 0
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= target_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Already gone, e.g. evicted by another process
+                    pass
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._size = total
+        return evicted
+
+    def stats(self):
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: hits, misses, hit_rate and characters_saved
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "characters_saved": self.characters_saved,
+        }
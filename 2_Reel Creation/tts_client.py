@@ -0,0 +1,208 @@
+"""
+ElevenLabs text-to-speech client for bulk narration.
+
+Requests share a keep-alive connection pool, run concurrently up to a configurable cap, and are
+retried with exponential backoff on timeouts, 429 and 5xx responses, honouring Retry-After.
+Identical requests that are in flight at the same time share a single API call.
+"""
+
+import asyncio
+import email.utils
+import json
+import random
+import threading
+import time
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tts_cache import tts_cache_key
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TTSError(Exception):
+    """Raised when a narration request fails permanently or runs out of retries."""
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header given either in seconds or as an HTTP date.
+
+    Args:
+        value (str): Header value
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ElevenLabsClient:
+    """
+    Pooled, rate-limited, retrying client for the with-timestamps endpoint.
+
+    Attributes:
+        base_url (str): API root, e.g. https://api.elevenlabs.io or a local stub server
+        max_concurrency (int): Maximum number of requests in flight at once, across all threads and event loops
+        max_retries (int): Retries after the first attempt
+        calls (int): HTTP requests sent, including retries
+        coalesced (int): Requests served by joining an identical in-flight request
+    """
+
+    def __init__(self, api_key, base_url="https://api.elevenlabs.io", max_concurrency=4, max_retries=5,
+                 backoff_base=1.0, backoff_max=30.0, timeout=60.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.calls = 0
+        self.coalesced = 0
+        self._counter_lock = threading.Lock()
+        # Caps requests from every thread and event loop: synthesize_sync and the per-loop semaphores alone
+        # would let reels rendered concurrently send more than max_concurrency requests at once
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept": "audio/mpeg",
+            "xi-api-key": api_key or "",
+            "Content-Type": "application/json"
+        })
+
+        # Semaphores and in-flight maps belong to one event loop each
+        self._loop_state = weakref.WeakKeyDictionary()
+
+    def _request(self, text, voice_id, voice_settings, model_id):
+        url = f"{self.base_url}/v1/text-to-speech/{voice_id}/with-timestamps"
+        payload = {"text": text, "voice_settings": voice_settings}
+        if model_id is not None:
+            payload["model_id"] = model_id
+        return url, payload
+
+    def _backoff(self, attempt, response=None):
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def _attempt(self, url, payload, attempt):
+        """
+        Send one request.
+
+        Returns:
+            tuple: (response dict, None) on success, or (None, seconds to wait) when it should be retried
+        """
+        with self._counter_lock:
+            self.calls += 1
+        try:
+            with self._slots:
+                response = self.session.post(url, data=json.dumps(payload), timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= self.max_retries:
+                raise TTSError(f"Request failed after {attempt + 1} attempts: {str(e)}")
+            return None, self._backoff(attempt)
+
+        if response.status_code == 200:
+            return response.json(), None
+        if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+            return None, self._backoff(attempt, response)
+        raise TTSError(f"Error: {response.status_code} {response.text[:500]}")
+
+    def synthesize_sync(self, text, voice_id, voice_settings, model_id=None):
+        """
+        Synthesize one narration, blocking until it is done.
+
+        Args:
+            text (str): Text to synthesize, may contain break tags
+            voice_id (str): ElevenLabs voice ID
+            voice_settings (dict): Voice settings
+            model_id (str, optional): Model ID, None for the API default
+
+        Returns:
+            dict: Response with audio_base64 and alignment
+        """
+        url, payload = self._request(text, voice_id, voice_settings, model_id)
+        for attempt in range(self.max_retries + 1):
+            result, delay = self._attempt(url, payload, attempt)
+            if result is not None:
+                return result
+            time.sleep(delay)
+
+    async def _synthesize(self, semaphore, text, voice_id, voice_settings, model_id):
+        url, payload = self._request(text, voice_id, voice_settings, model_id)
+        for attempt in range(self.max_retries + 1):
+            # The slot is released while backing off so other requests can use the connection
+            async with semaphore:
+                result, delay = await asyncio.to_thread(self._attempt, url, payload, attempt)
+            if result is not None:
+                return result
+            await asyncio.sleep(delay)
+
+    async def synthesize(self, text, voice_id, voice_settings, model_id=None):
+        """
+        Synthesize one narration; identical concurrent calls share one request.
+
+        Args:
+            text (str): Text to synthesize, may contain break tags
+            voice_id (str): ElevenLabs voice ID
+            voice_settings (dict): Voice settings
+            model_id (str, optional): Model ID, None for the API default
+
+        Returns:
+            dict: Response with audio_base64 and alignment
+        """
+        loop = asyncio.get_running_loop()
+        if loop not in self._loop_state:
+            self._loop_state[loop] = (asyncio.Semaphore(self.max_concurrency), {})
+        semaphore, in_flight = self._loop_state[loop]
+
+        key = tts_cache_key(text, voice_id, voice_settings, model_id)
+        if key in in_flight:
+            with self._counter_lock:
+                self.coalesced += 1
+            return await asyncio.shield(in_flight[key])
+
+        task = asyncio.ensure_future(self._synthesize(semaphore, text, voice_id, voice_settings, model_id))
+        in_flight[key] = task
+        task.add_done_callback(lambda _: in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def synthesize_many(self, texts, voice_id, voice_settings, model_id=None):
+        """
+        Synthesize several narrations concurrently.
+
+        Args:
+            texts (list): Texts to synthesize
+            voice_id (str): ElevenLabs voice ID
+            voice_settings (dict): Voice settings
+            model_id (str, optional): Model ID, None for the API default
+
+        Returns:
+            list: Response dicts, or the TTSError raised for that text, in input order
+        """
+        return await asyncio.gather(
+            *(self.synthesize(text, voice_id, voice_settings, model_id) for text in texts),
+            return_exceptions=True
+        )
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,157 @@
+"""
+Local stand-in for the ElevenLabs with-timestamps endpoint.
+
+Returns silent MP3 audio and an evenly spaced character alignment for the posted text, with
+configurable latency and injected 429/5xx failures, so the TTS client and the reel pipeline can be
+exercised without an API key.
+
+Usage:
+    python tts_stub_server.py --port 8765 --latency 0.5 --fail-every 3
+    ELEVENLABS_BASE_URL=http://127.0.0.1:8765 python content.py
+"""
+
+import argparse
+import base64
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, mono frame with zeroed side info, which decodes as silence
+SILENT_MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0xC4]) + bytes(413)
+MP3_FRAME_SECONDS = 1152 / 44100
+PATH_PATTERN = re.compile(r"^/v1/text-to-speech/[^/]+/with-timestamps$")
+
+
+def silent_mp3(duration):
+    """
+    Build a silent MP3 of at least the given duration.
+
+    Args:
+        duration (float): Duration in seconds
+
+    Returns:
+        bytes: MP3 data
+    """
+    return SILENT_MP3_FRAME * max(1, math.ceil(duration / MP3_FRAME_SECONDS))
+
+
+def fake_alignment(text, seconds_per_char=0.06):
+    """
+    Build an alignment where every character takes the same time.
+
+    Args:
+        text (str): Synthesized text
+        seconds_per_char (float): Duration of each character
+
+    Returns:
+        dict: Alignment in the ElevenLabs layout
+    """
+    start_times = [round(i * seconds_per_char, 3) for i in range(len(text))]
+    return {
+        "characters": list(text),
+        "character_start_times_seconds": start_times,
+        "character_end_times_seconds": [round(t + seconds_per_char, 3) for t in start_times],
+    }
+
+
+def fake_tts_response(text, seconds_per_char=0.06):
+    """
+    Build a with-timestamps response body for the given text.
+
+    Args:
+        text (str): Synthesized text
+        seconds_per_char (float): Duration of each character
+
+    Returns:
+        dict: Response with audio_base64 and alignment
+    """
+    return {
+        "audio_base64": base64.b64encode(silent_mp3(len(text) * seconds_per_char)).decode("ascii"),
+        "alignment": fake_alignment(text, seconds_per_char),
+    }
+
+
+class StubTTSServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server mimicking the with-timestamps endpoint.
+
+    Attributes:
+        latency (float): Seconds to wait before answering each request
+        fail_every (int): Answer every n-th request with fail_status (0 disables failures)
+        fail_status (int): Status code of injected failures
+        retry_after (float): Retry-After sent with injected failures
+        requests_served (int): Number of requests received
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0, fail_every=0, fail_status=429, retry_after=0.1,
+                 seconds_per_char=0.06):
+        super().__init__(address, StubTTSHandler)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.seconds_per_char = seconds_per_char
+        self.requests_served = 0
+        self.texts = []
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self):
+        """Serve requests on a background thread."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class StubTTSHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server._lock:
+            server.requests_served += 1
+            count = server.requests_served
+            server.texts.append(payload.get("text", ""))
+
+        if server.latency:
+            time.sleep(server.latency)
+        if not PATH_PATTERN.match(self.path):
+            self._send_json(404, {"detail": "Not found"})
+        elif server.fail_every and count % server.fail_every == 0:
+            self._send_json(server.fail_status, {"detail": "Injected failure"},
+                            {"Retry-After": str(server.retry_after)})
+        else:
+            self._send_json(200, fake_tts_response(payload.get("text", ""), server.seconds_per_char))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stub of the ElevenLabs with-timestamps endpoint")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response")
+    parser.add_argument("--fail-every", type=int, default=0, help="Fail every n-th request (0 disables)")
+    parser.add_argument("--fail-status", type=int, default=429, help="Status code of injected failures")
+    args = parser.parse_args()
+
+    server = StubTTSServer(("127.0.0.1", args.port), latency=args.latency, fail_every=args.fail_every,
+                           fail_status=args.fail_status)
+    print(f"Stub TTS server listening on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,197 @@
+"""
+Word-by-word caption reveal.
+
+The caption is laid out and rasterized once. Every reveal state (the first k words visible)
+is produced by masking that single raster, instead of rendering a new text image per word prefix.
+"""
+
+import numpy as np
+
+from text_render import draw_lines, text_length, wrap_words
+
+
+class CaptionLayout:
+    """
+    Centered caption layout with one bounding box per word.
+
+    Attributes:
+        words (list): Words of the caption
+        lines (list): Lines, each a list of word indices
+        word_boxes (list): (left, top, right, bottom) of each word in raster coordinates
+        word_lines (list): Line index of each word
+        line_height (int): Height of one line in pixels
+        size (tuple): (width, height) of the caption raster
+    """
+
+    def __init__(self, words, font, width, stroke_width=2, lines=None):
+        self.words = list(words)
+        self.font = font
+        self.stroke_width = stroke_width
+        # Line breaks can be given, e.g. from the full-size layout, so a scaled render wraps identically
+        self.lines = lines if lines is not None else wrap_words(self.words, font, width, stroke_width)
+
+        ascent, descent = font.getmetrics()
+        self.line_height = ascent + descent
+        height = self.line_height * len(self.lines) + 2 * stroke_width
+        self.size = (width, height)
+
+        self.line_origins = []
+        self.word_boxes = [None] * len(self.words)
+        self.word_lines = [0] * len(self.words)
+        for line_idx, line in enumerate(self.lines):
+            line_text = ' '.join(self.words[i] for i in line)
+            x0 = (width - text_length(font, line_text)) / 2
+            y0 = stroke_width + line_idx * self.line_height
+            self.line_origins.append((x0, y0))
+            for pos, word_idx in enumerate(line):
+                prefix = ' '.join(self.words[i] for i in line[:pos])
+                left = x0 + (text_length(font, prefix + ' ') if prefix else 0)
+                right = left + text_length(font, self.words[word_idx])
+                self.word_boxes[word_idx] = (
+                    int(np.floor(left - stroke_width)),
+                    int(y0 - stroke_width),
+                    int(np.ceil(right + stroke_width)),
+                    int(y0 + self.line_height + stroke_width),
+                )
+                self.word_lines[word_idx] = line_idx
+
+    def line_bounds(self, line_idx):
+        """
+        Get the rows covered by a line, extended to the raster edges for the first and last line.
+
+        Args:
+            line_idx (int): Line index
+
+        Returns:
+            tuple: (top, bottom) rows, bottom exclusive
+        """
+        top = 0 if line_idx == 0 else self.stroke_width + line_idx * self.line_height
+        if line_idx == len(self.lines) - 1:
+            bottom = self.size[1]
+        else:
+            bottom = self.stroke_width + (line_idx + 1) * self.line_height
+        return top, bottom
+
+    def render(self, color='white', stroke_color='white'):
+        """
+        Rasterize the full caption.
+
+        Args:
+            color (str): Text fill color
+            stroke_color (str): Text outline color
+
+        Returns:
+            np.ndarray: RGBA image of shape (height, width, 4)
+        """
+        lines = [' '.join(self.words[i] for i in line) for line in self.lines]
+        return draw_lines(self.size, lines, self.line_origins, self.font, color, stroke_color, self.stroke_width)
+
+
+class WordReveal:
+    """
+    Produces reveal states of a caption by masking its single raster.
+
+    State k shows the first k words: all lines above the k-th word's line, and the k-th word's
+    line up to the midpoint of the gap after that word.
+    """
+
+    def __init__(self, layout, rgba):
+        self.layout = layout
+        self.rgb = rgba[:, :, :3]
+        self.alpha = rgba[:, :, 3] / 255.0
+        self._cached_count = None
+        self._cached_mask = None
+
+    def mask(self, count):
+        """
+        Get the opacity mask with the first count words visible.
+
+        Args:
+            count (int): Number of visible words
+
+        Returns:
+            np.ndarray: Float mask in [0, 1] of shape (height, width)
+        """
+        count = max(0, min(count, len(self.layout.words)))
+        if count == self._cached_count:
+            return self._cached_mask
+
+        if count == len(self.layout.words):
+            mask = self.alpha
+        elif count == 0:
+            mask = np.zeros_like(self.alpha)
+        else:
+            last = count - 1
+            line_idx = self.layout.word_lines[last]
+            band_top, band_bottom = self.layout.line_bounds(line_idx)
+            mask = self.alpha.copy()
+            # Hide every line below the current one
+            mask[band_bottom:] = 0
+            # Hide the rest of the current line, cutting halfway into the gap to the next word
+            if self.layout.word_lines[count] == line_idx:
+                cut = (self.layout.word_boxes[last][2] + self.layout.word_boxes[count][0]) // 2
+                mask[band_top:band_bottom, cut:] = 0
+
+        self._cached_count = count
+        self._cached_mask = mask
+        return mask
+
+
+class RevealTimeline:
+    """
+    Places a word reveal on the video timeline.
+
+    No words are visible before the first word starts, then one more word is revealed at each word
+    start time, and the full caption is shown from final_start until the end of the video.
+
+    Attributes:
+        reveal (WordReveal): Caption raster and its reveal masks
+        position (tuple): (x, y) of the caption's top-left corner on the frame
+        word_times (np.ndarray): Video time at which each word is revealed
+        final_start (float): Video time from which the full caption is shown
+        duration (float): Total video duration
+    """
+
+    def __init__(self, reveal, position, word_times, final_start, duration):
+        self.reveal = reveal
+        self.position = position
+        self.word_times = np.asarray(word_times, dtype=float)
+        self.final_start = final_start
+        self.duration = duration
+
+    @property
+    def word_count(self):
+        return len(self.reveal.layout.words)
+
+    def count_at(self, t):
+        """
+        Get the number of words visible at video time t.
+
+        Args:
+            t (float): Video time in seconds
+
+        Returns:
+            int: Number of visible words
+        """
+        if t >= self.final_start:
+            return self.word_count
+        return int(np.searchsorted(self.word_times, t, side='right'))
+
+    def events(self):
+        """
+        Get the times at which the visible caption changes.
+
+        Returns:
+            list: (start_time, visible word count) pairs, starting at time 0, in time order
+        """
+        changes = [(0.0, 0)] + [(float(t), i + 1) for i, t in enumerate(self.word_times)]
+        changes.append((float(self.final_start), self.word_count))
+        events = []
+        for t, _ in sorted(changes):
+            t = min(max(t, 0.0), self.duration)
+            count = self.count_at(t)
+            if events and t == events[-1][0]:
+                events[-1] = (t, count)
+            elif not events or count != events[-1][1]:
+                events.append((t, count))
+        return events
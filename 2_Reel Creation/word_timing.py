@@ -0,0 +1,93 @@
+"""
+Word timings from ElevenLabs character alignment.
+
+The alignment character stream is tokenized once with array operations: break tags such as
+<break time='1.0s'> and whitespace are masked out, and each display word is mapped onto the next
+len(word) remaining characters. This runs in O(n) with no per-character Python loop and has no limit
+on word length or on the number of break tags.
+"""
+
+import re
+
+import numpy as np
+
+# Any <...> tag in the speech text, e.g. <break time='1.0s'>
+TAG_PATTERN = re.compile(r'<[^<>]*>')
+WHITESPACE_CODES = np.array([ord(c) for c in ' \t\n\r\f\v\u00a0'], dtype=np.uint32)
+
+
+def spoken_char_indices(characters):
+    """
+    Get the indices of the characters that belong to words, skipping whitespace and tags.
+
+    Args:
+        characters (list or np.ndarray): Alignment characters, one per entry
+
+    Returns:
+        np.ndarray: Indices into characters, in order
+    """
+    characters = np.asarray(characters)
+    if characters.dtype == np.dtype('<U1'):
+        # A U1 array is already UTF-32, so the text can be decoded from its buffer in one step
+        text = np.ascontiguousarray(characters).tobytes().decode('utf-32-le')
+    else:
+        # Keep one code point per entry so string offsets stay aligned with the timing arrays
+        text = ''.join(c[:1] or '\0' for c in characters.tolist())
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+    # Mark tag spans with a +1/-1 difference array; the running sum is positive inside a tag
+    delta = np.zeros(len(codes) + 1, dtype=np.int32)
+    spans = np.array([m.span() for m in TAG_PATTERN.finditer(text)], dtype=np.int64).reshape(-1, 2)
+    np.add.at(delta, spans[:, 0], 1)
+    np.add.at(delta, spans[:, 1], -1)
+    in_tag = np.cumsum(delta[:-1]) > 0
+
+    keep = ~in_tag & ~np.isin(codes, WHITESPACE_CODES)
+    return np.flatnonzero(keep)
+
+
+def word_timings(characters, start_times, end_times, words):
+    """
+    Map display words onto the alignment and get their start and end times.
+
+    Display word k covers the next len(word k) spoken characters of the alignment. Words that run
+    past the end of the alignment are dropped, and a word cut short by it ends at the last character.
+
+    Args:
+        characters (list or np.ndarray): Alignment characters
+        start_times (list or np.ndarray): Start time of each character in seconds
+        end_times (list or np.ndarray): End time of each character in seconds
+        words (list): Display words, without break tags
+
+    Returns:
+        tuple: (word start times, word end times) as float arrays of equal length
+    """
+    start_times = np.asarray(start_times, dtype=np.float64)
+    end_times = np.asarray(end_times, dtype=np.float64)
+    spoken = spoken_char_indices(characters)
+
+    if not words or not len(spoken):
+        return np.empty(0), np.empty(0)
+
+    lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+    first = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    last = first + np.maximum(lengths, 1) - 1
+
+    matched = first < len(spoken)
+    first = first[matched]
+    last = np.minimum(last[matched], len(spoken) - 1)
+    return start_times[spoken[first]], end_times[spoken[last]]
+
+
+def alignment_word_timings(alignment, words):
+    """
+    Get word start and end times from an Alignment.
+
+    Args:
+        alignment (Alignment): Character alignment
+        words (list): Display words, without break tags
+
+    Returns:
+        tuple: (word start times, word end times) as float arrays
+    """
+    return word_timings(alignment.characters, alignment.start_times, alignment.end_times, words)